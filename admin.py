@@ -7,6 +7,7 @@ from enrollment.models.faction import FactionEnrollment
 from enrollment.models.faculty import FacultyEnrollment
 from enrollment.models.facility_class import FacilityClassEnrollment
 from enrollment.models.faculty_class import FacultyClassEnrollment
+from enrollment.models.preference import ClassPreference
 from enrollment.services import SchedulingService
 
 
@@ -98,3 +99,9 @@ class AttendeeClassEnrollmentAdmin(SchedulingServiceAdminMixin, admin.ModelAdmin
 @admin.register(FacultyClassEnrollment)
 class FacultyClassEnrollmentAdmin(admin.ModelAdmin):
     list_display = ("id", "__str__")
+
+
+@admin.register(ClassPreference)
+class ClassPreferenceAdmin(admin.ModelAdmin):
+    list_display = ("id", "__str__", "period", "rank", "created_at")
+    list_filter = ("period",)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class EnrollmentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "enrollment"
+
+    def ready(self):
+        from enrollment import signals  # noqa: F401
+        from enrollment.local_cache import local_cache
+
+        options = getattr(settings, "ENROLLMENT_LOCAL_CACHE", None)
+        if options:
+            local_cache.configure(**options)
@@ -0,0 +1,212 @@
+"""
+Prefix-search sources for the enrollment autocomplete endpoint.
+
+Each source names the model, the columns matched with ``istartswith``, and
+the scope parameters the endpoint accepts. Every lookup returns at most
+``AUTOCOMPLETE_LIMIT`` rows, so choice lists never load a whole table.
+
+Scopes are also permissions: outside staff, every scope value must name a
+faction or facility the user belongs to or may manage, see ``denied_scope``.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from django.db.models import Q
+
+from core.policies import can_manage_facility, can_manage_faction
+from enrollment.models.attendee import AttendeeEnrollment
+from enrollment.models.facility import FacilityEnrollment
+from enrollment.models.facility_class import FacilityClassEnrollment
+from enrollment.models.faction import FactionEnrollment
+from faction.models.attendee import AttendeeProfile
+from faction.models.faction import Faction
+from faction.models.leader import LeaderProfile
+from facility.models.facility import Facility
+from facility.models.faculty import FacultyProfile
+
+AUTOCOMPLETE_LIMIT = 20
+USER_SEARCH_FIELDS = ("user__last_name", "user__first_name", "user__username")
+
+
+@dataclass(frozen=True)
+class AutocompleteSource:
+    model: type
+    search_fields: Tuple[str, ...]
+    scopes: Dict[str, Callable[[int], Q]]
+    select_related: Tuple[str, ...] = ()
+    # Lookups need a scope unless the caller is staff.
+    requires_scope: bool = True
+    ordering: Tuple[str, ...] = ()
+
+    def queryset(self):
+        queryset = self.model.objects.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        return queryset.order_by(*(self.ordering or self.search_fields), "pk")
+
+    def search(self, term, scope, limit=AUTOCOMPLETE_LIMIT):
+        """Return up to ``limit`` rows whose search fields start with ``term``."""
+        queryset = self.queryset()
+        for param, value in scope.items():
+            queryset = queryset.filter(self.scopes[param](value))
+        term = term.strip()
+        if term:
+            match = Q()
+            for search_field in self.search_fields:
+                match |= Q(**{f"{search_field}__istartswith": term})
+            queryset = queryset.filter(match)
+        return queryset[:limit]
+
+
+def _faction_of_enrollment(value):
+    return Q(
+        faction_id__in=FactionEnrollment.objects.filter(pk=value).values("faction_id")
+    )
+
+
+SOURCES = {
+    "attendees": AutocompleteSource(
+        model=AttendeeProfile,
+        search_fields=USER_SEARCH_FIELDS,
+        select_related=("user",),
+        scopes={
+            "faction": lambda value: Q(faction_id=value),
+            "faction_enrollment": _faction_of_enrollment,
+            "attendee_enrollment": lambda value: Q(attendee_enrollments__pk=value),
+        },
+    ),
+    "leaders": AutocompleteSource(
+        model=LeaderProfile,
+        search_fields=USER_SEARCH_FIELDS,
+        select_related=("user",),
+        scopes={
+            "faction": lambda value: Q(faction_id=value),
+            "faction_enrollment": _faction_of_enrollment,
+        },
+    ),
+    "faculty": AutocompleteSource(
+        model=FacultyProfile,
+        search_fields=USER_SEARCH_FIELDS,
+        select_related=("user",),
+        scopes={
+            "facility": lambda value: Q(facility_id=value),
+            "facility_enrollment": lambda value: Q(
+                facility_id__in=FacilityEnrollment.objects.filter(pk=value).values(
+                    "facility_id"
+                )
+            ),
+        },
+    ),
+    "attendee-enrollments": AutocompleteSource(
+        model=AttendeeEnrollment,
+        search_fields=("name",) + tuple(f"attendee__{f}" for f in USER_SEARCH_FIELDS),
+        select_related=("attendee__user", "faction_enrollment__faction"),
+        scopes={
+            "attendee": lambda value: Q(attendee_id=value),
+            "faction": lambda value: Q(faction_enrollment__faction_id=value),
+            "faction_enrollment": lambda value: Q(faction_enrollment_id=value),
+            "facility_enrollment": lambda value: Q(
+                faction_enrollment__facility_enrollment_id=value
+            ),
+        },
+        ordering=("name",),
+    ),
+    "faction-enrollments": AutocompleteSource(
+        model=FactionEnrollment,
+        search_fields=("name", "faction__name"),
+        select_related=("faction", "week", "quarters"),
+        scopes={
+            "faction": lambda value: Q(faction_id=value),
+            "facility": lambda value: Q(facility_enrollment__facility_id=value),
+            "facility_enrollment": lambda value: Q(facility_enrollment_id=value),
+        },
+        ordering=("name",),
+    ),
+    "class-offerings": AutocompleteSource(
+        model=FacilityClassEnrollment,
+        search_fields=("facility_class__name", "name"),
+        select_related=("facility_class", "period", "department"),
+        scopes={
+            "facility": lambda value: Q(
+                facility_class__facility_enrollment__facility_id=value
+            ),
+            "facility_enrollment": lambda value: Q(
+                facility_class__facility_enrollment_id=value
+            ),
+            "attendee_enrollment": lambda value: Q(
+                facility_class__facility_enrollment_id__in=(
+                    AttendeeEnrollment.objects.filter(pk=value).values(
+                        "faction_enrollment__facility_enrollment_id"
+                    )
+                )
+            ),
+        },
+        ordering=("facility_class__name", "period__start"),
+    ),
+}
+
+
+# Profiles through which a user belongs to a faction or facility.
+PROFILE_MODELS = {
+    "faction": (LeaderProfile, AttendeeProfile),
+    "facility": (FacultyProfile,),
+}
+
+
+def profile_owner_id(user, kind):
+    """Return the id of the faction or facility ``user``'s profile belongs to."""
+    if getattr(user, "pk", None) is None:
+        return None
+    for model in PROFILE_MODELS[kind]:
+        owner_id = (
+            model.objects.filter(user=user)
+            .values_list(f"{kind}_id", flat=True)
+            .first()
+        )
+        if owner_id:
+            return owner_id
+    return None
+
+
+def _owner_of(model, field):
+    def owners(value):
+        return model.objects.filter(pk=value).values(field)
+
+    return owners
+
+
+# The faction or facility each scope parameter reveals people or bookings of.
+SCOPE_OWNERS = {
+    "faction": ("faction", lambda value: [value]),
+    "faction_enrollment": ("faction", _owner_of(FactionEnrollment, "faction_id")),
+    "attendee": ("faction", _owner_of(AttendeeProfile, "faction_id")),
+    "attendee_enrollment": (
+        "faction",
+        _owner_of(AttendeeEnrollment, "faction_enrollment__faction_id"),
+    ),
+    "facility": ("facility", lambda value: [value]),
+    "facility_enrollment": ("facility", _owner_of(FacilityEnrollment, "facility_id")),
+}
+OWNER_POLICIES = {
+    "faction": (Faction, can_manage_faction),
+    "facility": (Facility, can_manage_facility),
+}
+
+
+def denied_scope(user, scope):
+    """
+    Return the first parameter in ``scope`` naming a faction or facility that
+    ``user`` neither belongs to nor may manage, or None. Staff see everything.
+    """
+    if user.is_staff:
+        return None
+    for param, value in scope.items():
+        kind, owners = SCOPE_OWNERS[param]
+        model, may_manage = OWNER_POLICIES[kind]
+        owner = model.objects.filter(pk__in=owners(value)).first()
+        if owner is None:
+            return param
+        if owner.pk != profile_owner_id(user, kind) and not may_manage(user, owner):
+            return param
+    return None
@@ -1,13 +1,344 @@
 """
 Cache key utilities for enrollment-related aggregates.
+
+Writers invalidate through ``invalidate_on_commit``: keys are collected per
+connection and deleted with a single ``delete_many`` once the transaction
+commits, so a concurrent reader cannot re-cache pre-commit values after the
+delete. Hooks requested through ``merge_on_commit`` run once after it.
+Readers use ``cached_unless_pending``, which skips the cache for keys the
+current transaction has already invalidated and lets only one caller at a
+time recompute a missing key.
+
+Keys for whole scopes embed a generation counter per facility enrollment or
+faction enrollment. ``bump_generation`` retires every key in a scope at once,
+so bulk writers do not need to know which keys exist.
 """
 
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
 from django.core.cache import cache
+from django.db import transaction
+
+from enrollment.local_cache import local_cache
+
+_pending = threading.local()
+
+
+@dataclass
+class _PendingWork:
+    flush: Callable
+    registered_in: list
+    keys: set = field(default_factory=set)
+    hooks: dict = field(default_factory=dict)
+
+
+def _live_pending(connection):
+    """
+    The pending work of the connection's current transaction, if any. Each
+    entry registers its flush with ``on_commit`` once, and that registration
+    is its per-transaction token: Django discards it when the transaction,
+    or the savepoint the entry was started in, rolls back, so work left
+    behind is dropped rather than carried into the next transaction. Django
+    also swaps in a new callback list when that happens, so the list only
+    needs searching after it was replaced.
+    """
+    pending = _pending.__dict__.get("entries", {}).get(connection.alias)
+    if pending is None or not connection.in_atomic_block:
+        return None
+    registered = connection.run_on_commit
+    if pending.registered_in is not registered:
+        if not any(entry[1] is pending.flush for entry in registered):
+            return None
+        pending.registered_in = registered
+    return pending
+
+
+def _pending_entry(connection, create=False):
+    """
+    Keys invalidated and hooks merged in the connection's current
+    transaction, as ``(keys, hooks)``.
+    """
+    pending = _live_pending(connection)
+    if pending is None:
+        if not create or not connection.in_atomic_block:
+            return set(), {}
+        flush = partial(_flush_pending, connection.alias)
+        pending = _PendingWork(flush, connection.run_on_commit)
+        _pending.__dict__.setdefault("entries", {})[connection.alias] = pending
+        transaction.on_commit(flush, using=connection.alias)
+    return pending.keys, pending.hooks
+
+
+def _pending_keys(connection, create=False) -> set:
+    return _pending_entry(connection, create)[0]
+
+
+def _flush_pending(alias) -> None:
+    pending = _pending.__dict__.get("entries", {}).pop(alias, None)
+    if pending is None:
+        return
+    if pending.keys:
+        cache.delete_many(list(pending.keys))
+        local_cache.discard(pending.keys)
+    for (func, args), items in pending.hooks.items():
+        if items is None:
+            func(*args)
+        else:
+            func(*args, items)
+
+
+def invalidate_on_commit(keys, using=None) -> None:
+    """
+    Delete ``keys`` when the current transaction commits, de-duplicated with
+    every other key invalidated in it. Outside a transaction the keys are
+    deleted straight away.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        cache.delete_many(list(keys))
+        local_cache.discard(keys)
+        return
+    _pending_keys(connection, create=True).update(keys)
+
+
+def merge_on_commit(func, *args, items=None, using=None) -> None:
+    """
+    Call ``func(*args)`` once when the current transaction commits, after its
+    invalidated keys are deleted, however often it is requested. With
+    ``items``, the items of every request are merged into one set and passed
+    as the last argument. Outside a transaction ``func`` is called straight
+    away.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        if items is None:
+            func(*args)
+        else:
+            func(*args, set(items))
+        return
+    hooks = _pending_entry(connection, create=True)[1]
+    merged = hooks.setdefault((func, args), None if items is None else set())
+    if items is not None:
+        merged.update(items)
+
+
+def is_invalidation_pending(*keys, using=None) -> bool:
+    pending = _pending_keys(transaction.get_connection(using))
+    return any(key in pending for key in keys)
+
+
+def cached_unless_pending(
+    key, ttl, producer, scopes=(), version_key=None, accept_stale=None, using=None
+):
+    """
+    ``core.cache.cached``, except that a key this transaction has invalidated,
+    directly or by bumping one of its ``scopes``, is recomputed without
+    touching the cache: the cached value is stale for this transaction, and
+    the fresh one is not committed yet.
+
+    Keys validated by a counter, either a generation embedded through
+    ``scopes`` or a ``version_key``, are also held in the in-process tier
+    when it is enabled. Misses are recomputed through ``single_flight``.
+    """
+    scope_keys = [generation_key(scope, pk) for scope, pk in scopes]
+    if is_invalidation_pending(key, *scope_keys, using=using):
+        return producer()
+    if not local_cache.enabled or not (scope_keys or version_key):
+        return single_flight(key, ttl, producer, accept_stale=accept_stale)
+
+    def load(report_miss):
+        def produce():
+            report_miss()
+            return producer()
+
+        return single_flight(key, ttl, produce, accept_stale=accept_stale)
+
+    token = _current_counters([version_key])[0] if version_key else None
+    return local_cache.read_through(key, token, load)
+
+
+# A recomputation holding the lock longer than this is presumed dead.
+RECOMPUTE_LOCK_TTL = 10
+RECOMPUTE_WAIT = 1.0
+RECOMPUTE_POLL = 0.02
+STALE_TTL = 300
+
+_MISSING = object()
+
+
+def recompute_lock_key(key) -> str:
+    return f"recompute:{key}"
+
+
+def stale_cache_key(key) -> str:
+    return f"stale:{key}"
+
+
+def single_flight(key, ttl, producer, accept_stale=None):
+    """
+    Read ``key``, recomputing it on a miss in one caller at a time across all
+    workers. The caller that wins the lock runs ``producer``; the others wait
+    up to ``RECOMPUTE_WAIT`` seconds for its result and only then run it
+    themselves.
+
+    With ``accept_stale``, waiters instead get the previous value straight
+    away, if it is at most ``STALE_TTL`` seconds old and ``accept_stale``
+    returns True for it. Capacity pre-checks accept a stale value only when
+    it shows room: the conditional counter updates still refuse overbooking,
+    but nothing would undo a stale rejection.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock = recompute_lock_key(key)
+    if cache.add(lock, 1, RECOMPUTE_LOCK_TTL):
+        try:
+            value = producer()
+            cache.set(key, value, ttl)
+            if accept_stale is not None:
+                cache.set(stale_cache_key(key), value, STALE_TTL)
+        finally:
+            cache.delete(lock)
+        return value
+
+    if accept_stale is not None:
+        value = cache.get(stale_cache_key(key), _MISSING)
+        if value is not _MISSING and accept_stale(value):
+            return value
+    deadline = time.monotonic() + RECOMPUTE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(RECOMPUTE_POLL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return producer()
+
+
+FACILITY_ENROLLMENT = "facility_enrollment"
+FACTION_ENROLLMENT = "faction_enrollment"
+
+
+def generation_key(scope, pk) -> str:
+    return f"generation:{scope}:{pk}"
+
+
+def _current_counters(keys) -> list:
+    """
+    Read counters in one round trip. A missing counter is seeded from the
+    clock, so a flushed or bumped counter never reissues an old value.
+    """
+    if local_cache.enabled:
+        found = local_cache.counters(keys, _load_counters)
+    else:
+        found = _load_counters(keys)
+    return [found[key] for key in keys]
+
+
+def _load_counters(keys) -> dict:
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key) or 0
+    return found
+
+
+def generation(scope, pk) -> int:
+    """
+    Current cache generation of a facility or faction enrollment. Keys built
+    from it go stale together when the generation is bumped.
+    """
+    return _current_counters([generation_key(scope, pk)])[0]
+
+
+def bump_generation(scope, *pks) -> None:
+    """
+    Start a new generation for each of ``pks`` once the transaction commits.
+    The counter is dropped with the rest of the transaction's invalidations
+    and reseeded from the clock on the next read.
+    """
+    invalidate_on_commit(generation_key(scope, pk) for pk in pks if pk is not None)
 
 
 def quarters_usage_cache_key(faction_enrollment_id, quarters_id) -> str:
-    return f"quarters_usage:{faction_enrollment_id}:{quarters_id}"
+    return (
+        f"quarters_usage:{faction_enrollment_id}:"
+        f"{generation(FACTION_ENROLLMENT, faction_enrollment_id)}:{quarters_id}"
+    )
 
 
 def invalidate_quarters_usage_cache(faction_enrollment_id, quarters_id) -> None:
-    cache.delete(quarters_usage_cache_key(faction_enrollment_id, quarters_id))
+    # The generation goes too, so in-process copies held by other workers
+    # stop validating once they re-read it.
+    invalidate_on_commit(
+        [
+            quarters_usage_cache_key(faction_enrollment_id, quarters_id),
+            generation_key(FACTION_ENROLLMENT, faction_enrollment_id),
+        ]
+    )
+
+
+def row_version_key(key) -> str:
+    """
+    Version counter of a single cached row. Invalidate it together with the
+    row's key so in-process copies validated by it go stale with the row
+    only, not with every other write.
+    """
+    return f"version:{key}"
+
+
+def class_availability_id_cache_key(facility_class_enrollment_id) -> str:
+    return f"class_availability_id:{facility_class_enrollment_id}"
+
+
+# Period times feed every attendee's cached period index. Edits to them are
+# rare, so a single generation retires all of the indexes at once.
+PERIOD_TIMES = ("period_times", "all")
+
+
+def attendee_periods_cache_key(attendee_id) -> str:
+    return f"attendee_periods:{generation(*PERIOD_TIMES)}:{attendee_id}"
+
+
+def invalidate_attendee_periods_cache(*attendee_ids) -> None:
+    invalidate_on_commit(attendee_periods_cache_key(pk) for pk in attendee_ids)
+
+
+AVAILABILITY_STATUS_VERSION_KEY = "availability_status:version"
+
+
+def availability_status_version() -> int:
+    """
+    Current version of the availability status report. Seeded from the clock
+    so a cache flush never reissues a version an old snapshot was stored under.
+    """
+    return _current_counters([AVAILABILITY_STATUS_VERSION_KEY])[0]
+
+
+def bump_availability_status_version() -> None:
+    try:
+        cache.incr(AVAILABILITY_STATUS_VERSION_KEY)
+    except ValueError:
+        cache.add(AVAILABILITY_STATUS_VERSION_KEY, time.time_ns(), timeout=None)
+    local_cache.discard([AVAILABILITY_STATUS_VERSION_KEY])
+
+
+def availability_status_cache_key(
+    version, facility_enrollment_id=None, organization_enrollment_id=None
+) -> str:
+    return (
+        f"availability_status:{version}:"
+        f"{facility_enrollment_id or '-'}:{organization_enrollment_id or '-'}"
+    )
+
+
+def booking_choices_cache_key(version, facility_enrollment_id) -> str:
+    return f"booking_choices:{version}:{facility_enrollment_id}"
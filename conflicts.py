@@ -0,0 +1,122 @@
+"""
+Period-overlap detection for attendee class assignments.
+
+An attendee's booked periods are indexed per week as
+``(start, end, facility_class_enrollment_id)`` intervals sorted by start. The
+index is built with one query and cached, so checking a new booking is a
+bisect against the cached intervals.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from enrollment.cache_keys import (
+    PERIOD_TIMES,
+    attendee_periods_cache_key,
+    cached_unless_pending,
+)
+from enrollment.models.attendee_class import AttendeeClassEnrollment
+
+Interval = Tuple[object, object, int]
+
+
+@dataclass
+class PeriodConflict:
+    attendee_id: int
+    week_id: int
+    facility_class_enrollment_id: int
+    conflicting_facility_class_enrollment_id: int
+
+
+def build_period_index(attendee_id) -> Dict[int, List[Interval]]:
+    index = {}
+    rows = AttendeeClassEnrollment.objects.filter(
+        attendee_id=attendee_id, facility_class_enrollment__isnull=False
+    ).values_list(
+        "facility_class_enrollment__period__week_id",
+        "facility_class_enrollment__period__start",
+        "facility_class_enrollment__period__end",
+        "facility_class_enrollment_id",
+    )
+    for week_id, start, end, offering_id in rows:
+        index.setdefault(week_id, []).append((start, end, offering_id))
+    for intervals in index.values():
+        intervals.sort()
+    return index
+
+
+def attendee_period_index(attendee_id) -> Dict[int, List[Interval]]:
+    return cached_unless_pending(
+        attendee_periods_cache_key(attendee_id),
+        ttl=300,
+        producer=lambda: build_period_index(attendee_id),
+        scopes=[PERIOD_TIMES],
+    )
+
+
+def find_overlap(intervals, start, end, ignore=()) -> Optional[int]:
+    """
+    Return the offering id of a booked interval overlapping ``[start, end)``.
+    Intervals are sorted by start, so past the insertion point only the first
+    one counted needs checking. Booked intervals may overlap each other (an
+    existing conflict, or a period whose times were edited), so one that
+    starts earlier can reach past its neighbours, and every earlier interval
+    is checked.
+    """
+    position = bisect_left(intervals, (start,))
+    for booked_start, booked_end, offering_id in reversed(intervals[:position]):
+        if booked_end > start and offering_id not in ignore:
+            return offering_id
+    after = position
+    while after < len(intervals) and intervals[after][2] in ignore:
+        after += 1
+    if after < len(intervals) and intervals[after][0] < end:
+        return intervals[after][2]
+    return None
+
+
+def conflicting_offering(attendee_id, period, ignore=()) -> Optional[int]:
+    intervals = attendee_period_index(attendee_id).get(period.week_id, [])
+    return find_overlap(intervals, period.start, period.end, ignore=ignore)
+
+
+def find_period_conflicts(facility_enrollment) -> List[PeriodConflict]:
+    """
+    Report every overlapping pair of class bookings in a facility enrollment
+    using one query and a sweep over each attendee's weekly bookings.
+    """
+    rows = (
+        AttendeeClassEnrollment.objects.filter(
+            facility_class_enrollment__period__week__facility_enrollment=(
+                facility_enrollment
+            )
+        )
+        .values_list(
+            "attendee_id",
+            "facility_class_enrollment__period__week_id",
+            "facility_class_enrollment__period__start",
+            "facility_class_enrollment__period__end",
+            "facility_class_enrollment_id",
+        )
+        .order_by(
+            "attendee_id",
+            "facility_class_enrollment__period__week_id",
+            "facility_class_enrollment__period__start",
+        )
+    )
+    conflicts = []
+    scope = None
+    latest = None
+    for attendee_id, week_id, start, end, offering_id in rows:
+        if scope != (attendee_id, week_id):
+            scope = (attendee_id, week_id)
+            latest = (end, offering_id)
+            continue
+        if start < latest[0]:
+            conflicts.append(
+                PeriodConflict(attendee_id, week_id, offering_id, latest[1])
+            )
+        if end > latest[0]:
+            latest = (end, offering_id)
+    return conflicts
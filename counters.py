@@ -0,0 +1,35 @@
+"""
+Seat arithmetic shared by availability rows and by reads that only fetch
+their counter columns with ``.values()``.
+"""
+
+from django.utils import timezone
+
+# Every column ``remaining_seats`` needs.
+COUNTER_FIELDS = (
+    "capacity",
+    "reserved",
+    "on_hold",
+    "held",
+    "next_hold_expiry",
+    "next_hold_amount",
+)
+
+
+def live_held(held, next_hold_expiry, next_hold_amount, now=None) -> int:
+    """
+    ``held`` without the earliest holds once they have expired. Expired holds
+    are swept by the next write that needs the seats, so reads should not let
+    them turn callers away. Holds due after the earliest still count until
+    that sweep, which never overstates free seats.
+    """
+    if next_hold_expiry is not None and next_hold_expiry <= (now or timezone.now()):
+        return max(held - next_hold_amount, 0)
+    return held
+
+
+def remaining_seats(
+    capacity, reserved, on_hold, held, next_hold_expiry=None, next_hold_amount=0
+) -> int:
+    held = live_held(held, next_hold_expiry, next_hold_amount)
+    return max(capacity - reserved - on_hold - held, 0)
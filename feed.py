@@ -0,0 +1,162 @@
+"""
+In-process change feed for availability counters.
+
+Committed availability writes are published to ``broker`` as small
+``remaining`` snapshots. The feed view in ``views/availability.py`` serves
+them to the registration desk and dashboard through long-poll or server-sent
+events, so those pages no longer need to re-query the database on a timer.
+
+The broker lives in process memory. Each worker only sees the writes it
+committed itself, plus any it is told about through ``publish``. Writes made
+while nobody listens are not published, but still advance the sequence as a
+gap, so cursors issued before them resynchronise from the database.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from uuid import uuid4
+
+from enrollment.counters import COUNTER_FIELDS, remaining_seats
+
+# Writes are published while a listener is connected or has polled within
+# this many seconds, so long-poll clients do not miss changes between polls.
+SUBSCRIBER_GRACE = 60
+FEED_HISTORY = 2000
+PAYLOAD_FIELDS = ("capacity", "reserved", "on_hold", "held")
+
+
+def change_payload(kind, row):
+    """
+    Build the feed entry for a ``.values()`` row of an availability model,
+    read with ``COUNTER_FIELDS``.
+    """
+    payload = {"kind": kind, "id": row["pk"]}
+    payload.update({field: row[field] for field in PAYLOAD_FIELDS})
+    payload["remaining"] = remaining_seats(
+        **{field: row[field] for field in COUNTER_FIELDS}
+    )
+    return payload
+
+
+class AvailabilityBroker:
+    """
+    A bounded, thread-safe log of availability changes. Every change gets a
+    sequence number; readers keep the last number they saw as their cursor.
+    """
+
+    def __init__(self, history=FEED_HISTORY):
+        self._condition = threading.Condition()
+        self._changes = deque(maxlen=history)
+        self._cursor = 0
+        self._listeners = 0
+        self._last_seen = float("-inf")
+        # Sequence of the latest write that was not published; cursors older
+        # than it have missed a change.
+        self._gap = 0
+        # Sequence numbers restart with the process, so cursors carry the
+        # epoch that issued them; one from another broker forces a resync.
+        self.epoch = uuid4().hex[:12]
+
+    @property
+    def cursor(self):
+        with self._condition:
+            return self._token(self._cursor)
+
+    def _token(self, sequence):
+        return f"{self.epoch}.{sequence}"
+
+    def _sequence(self, cursor):
+        epoch, _, sequence = str(cursor).partition(".")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def is_listened(self):
+        with self._condition:
+            return (
+                self._listeners > 0
+                or time.monotonic() - self._last_seen < SUBSCRIBER_GRACE
+            )
+
+    @contextmanager
+    def listening(self):
+        with self._condition:
+            self._listeners += 1
+        try:
+            yield self
+        finally:
+            with self._condition:
+                self._listeners -= 1
+                self._last_seen = time.monotonic()
+
+    def publish(self, changes):
+        with self._condition:
+            for change in changes:
+                self._cursor += 1
+                self._changes.append((self._cursor, change))
+            self._condition.notify_all()
+
+    def mark_gap(self):
+        """Record that a change was committed without being published."""
+        with self._condition:
+            self._cursor += 1
+            self._gap = self._cursor
+            self._condition.notify_all()
+
+    def changes_since(self, cursor, keys):
+        """
+        Return ``(changes, cursor, complete)`` for ``keys`` ((kind, id)
+        pairs) after ``cursor``, keeping only the latest change per key.
+        ``complete`` is False when the history no longer reaches back to
+        ``cursor``, a change after it went unpublished, or the cursor was not
+        issued by this broker, and the caller has to resynchronise from the
+        database.
+        """
+        with self._condition:
+            self._last_seen = time.monotonic()
+            return self._changes_since(cursor, keys)
+
+    def wait(self, cursor, keys, timeout):
+        """Like ``changes_since``, but block up to ``timeout`` seconds for a change."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._last_seen = time.monotonic()
+            while True:
+                changes, latest, complete = self._changes_since(cursor, keys)
+                remaining = deadline - time.monotonic()
+                if changes or not complete or remaining <= 0:
+                    return changes, latest, complete
+                self._condition.wait(remaining)
+
+    def _changes_since(self, cursor, keys):
+        token = self._token(self._cursor)
+        cursor = self._sequence(cursor)
+        if cursor is None or cursor > self._cursor:
+            return [], token, False
+        oldest = self._changes[0][0] if self._changes else self._cursor + 1
+        complete = cursor >= max(oldest - 1, self._gap)
+        latest = {}
+        if cursor < self._cursor:
+            for sequence, change in reversed(self._changes):
+                if sequence <= cursor:
+                    break
+                key = (change["kind"], change["id"])
+                if key in keys and key not in latest:
+                    latest[key] = change
+        return list(reversed(list(latest.values()))), token, complete
+
+
+broker = AvailabilityBroker()
+
+
+def publish_availability(model, pks):
+    """Read the committed counters for ``pks`` and publish them, if anyone listens."""
+    if not pks:
+        return
+    if not broker.is_listened():
+        broker.mark_gap()
+        return
+    rows = model.objects.filter(pk__in=list(pks)).values("pk", *COUNTER_FIELDS)
+    broker.publish([change_payload(model.kind, row) for row in rows])
@@ -7,6 +7,10 @@ from enrollment.models.faction import FactionEnrollment
 from facility.models.quarters import Quarters
 from faction.models.attendee import AttendeeProfile
 
+from enrollment.autocomplete import profile_owner_id
+
+from .widgets import use_autocomplete
+
 
 class AttendeeEnrollmentForm(forms.ModelForm):
     class Meta:
@@ -14,6 +18,7 @@ class AttendeeEnrollmentForm(forms.ModelForm):
         fields = ["attendee", "faction_enrollment", "quarters", "role"]
 
     def __init__(self, *args, **kwargs):
+        user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
         faction_enrollment = self._selected_faction_enrollment()
         self.fields["faction_enrollment"].queryset = FactionEnrollment.objects.with_related()
@@ -30,6 +35,14 @@ class AttendeeEnrollmentForm(forms.ModelForm):
             )
         else:
             self.fields["quarters"].queryset = Quarters.objects.none()
+        use_autocomplete(
+            self.fields["attendee"], "attendees", forward=("faction_enrollment",)
+        )
+        use_autocomplete(
+            self.fields["faction_enrollment"],
+            "faction-enrollments",
+            scope={"faction": profile_owner_id(user, "faction")},
+        )
         self._apply_form_control_class()
 
     def _selected_faction_enrollment(self):
@@ -62,8 +75,12 @@ class AttendeeClassEnrollmentForm(forms.ModelForm):
         fields = ["attendee", "attendee_enrollment", "facility_class_enrollment"]
 
     def __init__(self, *args, **kwargs):
+        user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
         attendee_enrollment = self._selected_attendee_enrollment()
+        # The people lookups forward each other, so on a blank form they also
+        # need a scope of their own to pass the endpoint's scope requirement.
+        scope = {"faction": self._scope_faction_id(user, attendee_enrollment)}
         self.fields["attendee"].queryset = AttendeeProfile.objects.select_related(
             "user", "faction"
         )
@@ -89,6 +106,23 @@ class AttendeeClassEnrollmentForm(forms.ModelForm):
                     "facility_class", "period", "department"
                 )
             )
+        use_autocomplete(
+            self.fields["attendee"],
+            "attendees",
+            forward=("attendee_enrollment",),
+            scope=scope,
+        )
+        use_autocomplete(
+            self.fields["attendee_enrollment"],
+            "attendee-enrollments",
+            forward=("attendee",),
+            scope=scope,
+        )
+        use_autocomplete(
+            self.fields["facility_class_enrollment"],
+            "class-offerings",
+            forward=("attendee_enrollment",),
+        )
         self._apply_form_control_class()
 
     def _selected_attendee_enrollment(self):
@@ -114,6 +148,12 @@ class AttendeeClassEnrollmentForm(forms.ModelForm):
                 return None
         return None
 
+    @staticmethod
+    def _scope_faction_id(user, attendee_enrollment):
+        if attendee_enrollment:
+            return attendee_enrollment.faction_enrollment.faction_id
+        return profile_owner_id(user, "faction")
+
     def _apply_form_control_class(self):
         for field in self.fields.values():
             field.widget.attrs.setdefault("class", "form-control")
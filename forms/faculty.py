@@ -4,6 +4,7 @@ from core.forms.base import BaseForm
 from facility.models.faculty import FacultyProfile
 
 from ..models.faculty import FacultyEnrollment
+from .widgets import use_autocomplete
 
 
 class FacultyEnrollmentForm(BaseForm):
@@ -16,6 +17,9 @@ class FacultyEnrollmentForm(BaseForm):
 
         # Dynamic filtering of faculty and facilities
         self.fields["faculty"].queryset = FacultyProfile.objects.select_related("user")
+        use_autocomplete(
+            self.fields["faculty"], "faculty", forward=("facility_enrollment",)
+        )
 
         # Add CSS classes
         for field in self.fields.values():
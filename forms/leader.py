@@ -5,6 +5,8 @@ from ..models.leader import LeaderEnrollment
 from ..models.faction import FactionEnrollment
 from facility.models.quarters import Quarters
 
+from .widgets import use_autocomplete
+
 
 class LeaderEnrollmentForm(forms.ModelForm):
     faction_enrollment = forms.ModelChoiceField(
@@ -48,6 +50,9 @@ class LeaderEnrollmentForm(forms.ModelForm):
                 capacity__gt=0,
             )
 
+        use_autocomplete(
+            self.fields["leader"], "leaders", forward=("faction_enrollment",)
+        )
         if leader_profile:
             self.fields["leader"].initial = leader_profile
 
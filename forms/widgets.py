@@ -0,0 +1,77 @@
+from urllib.parse import urlencode
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    A select that renders only the empty choice and the current selection.
+
+    Other options are fetched as the user types from the ``source`` endpoint in
+    ``enrollment.autocomplete``. The values of the ``forward`` form fields are
+    sent along as scope filters, as is the fixed ``scope``, which keeps the
+    lookup narrowed while the forwarded fields are still blank. The field's
+    queryset is still used to validate the submitted pk, which is a
+    single-row lookup.
+    """
+
+    def __init__(self, source, forward=(), scope=None, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+        self.forward = tuple(forward)
+        self.scope = {
+            param: value for param, value in (scope or {}).items() if value
+        }
+
+    class Media:
+        js = ("enrollment/js/autocomplete.js",)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context["widget"]["attrs"]
+        widget_attrs["data-autocomplete-url"] = reverse(
+            "enrollments:autocomplete", kwargs={"source": self.source}
+        )
+        if self.forward:
+            widget_attrs["data-autocomplete-forward"] = ",".join(self.forward)
+        if self.scope:
+            widget_attrs["data-autocomplete-scope"] = urlencode(self.scope)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        self.choices = list(self._selected_choices(choices, value))
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+    def _selected_choices(self, choices, value):
+        field = getattr(choices, "field", None)
+        if field is None:
+            yield from choices
+            return
+        if field.empty_label is not None:
+            yield ("", field.empty_label)
+        selected = [item for item in value if item not in (None, "")]
+        if not selected:
+            return
+        try:
+            rows = list(field.queryset.filter(pk__in=selected))
+        except (TypeError, ValueError, ValidationError):
+            return
+        for obj in rows:
+            yield choices.choice(obj)
+
+
+def use_autocomplete(field, source, forward=(), scope=None):
+    """Swap ``field``'s widget for an ``AutocompleteSelect``, keeping its attrs."""
+    widget = AutocompleteSelect(
+        source, forward=forward, scope=scope, attrs=field.widget.attrs
+    )
+    widget.choices = field.choices
+    widget.is_required = field.widget.is_required
+    field.widget = widget
+    return field
@@ -0,0 +1,47 @@
+"""
+Process-pool entry points for partitioned attendee imports.
+
+Everything Django-related is imported lazily so worker processes started with
+the ``spawn`` method can configure Django before any model module loads.
+"""
+
+
+def init_import_worker():
+    import django
+    from django.db import connections
+
+    django.setup()
+    # Never reuse a connection inherited from the parent process.
+    connections.close_all()
+
+
+def import_partition(rows, chunk_size, commit):
+    """
+    Import one partition of ``(line_number, row)`` pairs in its own transaction.
+    Returns ``(created, errors)``; the transaction is rolled back on any error
+    or when ``commit`` is false.
+    """
+    from django.db import transaction
+
+    from enrollment.services import SchedulingService
+    from enrollment.services.audit import deferred_events
+    from enrollment.services.imports import (
+        AttendeeImportResolver,
+        chunked,
+        import_attendee_chunk,
+    )
+
+    service = SchedulingService()
+    resolver = AttendeeImportResolver()
+    created = 0
+    errors = []
+    with deferred_events(), transaction.atomic():
+        for chunk in chunked(rows, chunk_size):
+            chunk_created, chunk_errors = import_attendee_chunk(
+                service, resolver, chunk
+            )
+            created += chunk_created
+            errors.extend(chunk_errors)
+        if errors or not commit:
+            transaction.set_rollback(True)
+    return created, errors
@@ -0,0 +1,154 @@
+"""
+Optional in-process tier in front of the shared cache for capacity checks.
+
+Every value held here carries the version or generation counter it was read
+under and is only served while that counter is unchanged. Counters are kept
+for ``version_ttl`` seconds before being re-read from the shared cache, so an
+invalidation committed by another process reaches this one within that
+window; the process's own invalidations evict their keys right away.
+
+The tier is off until ``local_cache.configure`` is called, which
+``EnrollmentConfig.ready`` does from the ``ENROLLMENT_LOCAL_CACHE`` setting::
+
+    ENROLLMENT_LOCAL_CACHE = {"max_entries": 2048, "ttl": 30, "version_ttl": 1}
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LocalCache:
+    """A bounded, thread-safe LRU with per-entry expiry and hit counters."""
+
+    def __init__(self, max_entries=0, ttl=30, version_ttl=1):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.configure(max_entries, ttl, version_ttl)
+
+    def configure(self, max_entries=0, ttl=30, version_ttl=1):
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            self.version_ttl = version_ttl
+            self._entries.clear()
+            self._reset_stats()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def counters(self, keys, loader):
+        """
+        Return the values of version counters ``keys``, holding each for
+        ``version_ttl`` seconds. ``loader`` reads the missing ones from the
+        shared cache and returns them as a dict.
+        """
+        found = {}
+        for key in keys:
+            value = self._get(("counter", key))
+            if value is not _MISSING:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        if missing:
+            for key, value in loader(missing).items():
+                self._set(("counter", key), value, self.version_ttl)
+                found[key] = value
+        return found
+
+    def read_through(self, key, token, loader):
+        """
+        Return the value for ``key`` held under ``token``, or call ``loader``
+        (which reads the shared cache and, on a miss there, the database) and
+        keep its result. ``loader`` receives a callback to report that the
+        shared cache missed.
+        """
+        held = self._get(("value", key))
+        if held is not _MISSING and held[0] == token:
+            self._count("local_hits")
+            return held[1]
+
+        shared_missed = []
+        value = loader(lambda: shared_missed.append(True))
+        self._count("misses" if shared_missed else "shared_hits")
+        self._set(("value", key), (token, value), self.ttl)
+        return value
+
+    def constant(self, key, loader):
+        """
+        Return a value that never changes once it exists, such as the id of
+        a related row, or call ``loader`` for it. ``None`` means it does not
+        exist yet and is not kept. These lookups are not counted in ``stats``.
+        """
+        value = self._get(("constant", key))
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self._set(("constant", key), value, self.ttl)
+        return value
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                for kind in ("value", "counter", "constant"):
+                    self._entries.pop((kind, key), None)
+
+    def stats(self):
+        """
+        Lookup counts per tier plus hit rates: the local rate is over all
+        lookups, the shared rate over lookups the local tier missed.
+        """
+        with self._lock:
+            local_hits = self._stats["local_hits"]
+            shared_hits = self._stats["shared_hits"]
+            misses = self._stats["misses"]
+            size = len(self._entries)
+        lookups = local_hits + shared_hits + misses
+        reached_shared = shared_hits + misses
+        return {
+            "lookups": lookups,
+            "local_hits": local_hits,
+            "shared_hits": shared_hits,
+            "misses": misses,
+            "local_hit_rate": local_hits / lookups if lookups else 0.0,
+            "shared_hit_rate": shared_hits / reached_shared if reached_shared else 0.0,
+            "entries": size,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get(self, entry_key):
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[entry_key]
+                return _MISSING
+            self._entries.move_to_end(entry_key)
+            return value
+
+    def _set(self, entry_key, value, ttl):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[entry_key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+local_cache = LocalCache()
@@ -1,6 +1,8 @@
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
 
-from ...models import *
+from enrollment.models.facility_class import FacilityClassEnrollment
+from enrollment.services.balancing import apply_class_balance, plan_class_balance
 
 
 class Command(BaseCommand):
@@ -37,6 +39,11 @@ class Command(BaseCommand):
             type=int,
             help="ID of the Facility Class to balance",
         )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Move attendees. Without this flag the command only prints the diff.",
+        )
 
     def handle(self, *args, **kwargs):
         facility_id = kwargs.get("facility")
@@ -45,38 +52,55 @@ class Command(BaseCommand):
         organization_enrollment_id = kwargs.get("organization_enrollment")
         facility_class_id = kwargs.get("facility_class")
 
-        classes = FacilityClass.objects.all()
+        offerings = FacilityClassEnrollment.objects.all()
 
         if facility_id:
-            classes = classes.filter(facility_id=facility_id)
+            offerings = offerings.filter(
+                facility_class__facility_enrollment__facility_id=facility_id
+            )
         if facility_enrollment_id:
-            classes = classes.filter(facility_enrollment__id=facility_enrollment_id)
+            offerings = offerings.filter(
+                facility_class__facility_enrollment_id=facility_enrollment_id
+            )
         if organization_id:
-            classes = classes.filter(
-                facility_enrollment__organization_enrollment__organization_id=organization_id
+            offerings = offerings.filter(
+                organization_enrollment__organization_id=organization_id
             )
         if organization_enrollment_id:
-            classes = classes.filter(
-                facility_enrollment__organization_enrollment_id=organization_enrollment_id
+            offerings = offerings.filter(
+                organization_enrollment_id=organization_enrollment_id
             )
         if facility_class_id:
-            classes = classes.filter(id=facility_class_id)
+            offerings = offerings.filter(facility_class_id=facility_class_id)
 
-        for facility_class in classes:
-            # Calculate how many students to move/add
-            current_enrollment = facility_class.facilityclassenrollment_set.count()
-            slots_available = desired_class_size - current_enrollment
+        plan = plan_class_balance(offerings)
+        changes = list(plan.diff())
+        if not changes:
+            self.stdout.write(self.style.SUCCESS("Classes are already balanced."))
+            return
 
-            if slots_available > 0:
-                # Logic to add students, ensuring we don't exceed maximum capacities
-                pass  # Implementation depends on how students are assigned to classes
+        for offering in changes:
+            self.stdout.write(
+                f"- {offering.label}: {offering.current} -> {offering.target} "
+                f"(capacity {offering.capacity})"
+            )
 
-            elif slots_available < 0:
-                # Logic to move students to other classes
-                pass  # Implementation details omitted for brevity
+        if not kwargs.get("apply"):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Dry run: {len(plan.moves)} attendee(s) would move. "
+                    "Re-run with --apply to balance."
+                )
+            )
+            return
 
+        try:
+            moved = apply_class_balance(plan)
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages)) from exc
         self.stdout.write(
             self.style.SUCCESS(
-                "Successfully balanced class sizes within specified scope."
+                f"Successfully balanced class sizes within specified scope "
+                f"({moved} attendee(s) moved)."
             )
         )
@@ -0,0 +1,81 @@
+from time import perf_counter
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.test.utils import CaptureQueriesContext
+
+from enrollment.models.availability import FacilityClassAvailability
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure round trips per reserve/release on a class availability row, "
+        "comparing the UPDATE ... RETURNING path with the locking fallback. "
+        "All changes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-a",
+            "--availability",
+            type=int,
+            help="ID of the FacilityClassAvailability row to exercise",
+        )
+        parser.add_argument(
+            "-n",
+            "--iterations",
+            type=int,
+            default=200,
+            help="Reserve/release pairs to run per path",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations <= 0:
+            raise CommandError("--iterations must be greater than zero.")
+        availability = self._availability(options.get("availability"))
+        if availability.remaining <= 0:
+            raise CommandError("The availability row has no remaining capacity.")
+
+        connection = connections[router.db_for_write(FacilityClassAvailability)]
+        self.stdout.write(
+            f"Backend: {connection.vendor}; {iterations} reserve/release pair(s)."
+        )
+        paths = [("locking", False)]
+        if availability._supports_update_returning():
+            paths.insert(0, ("returning", True))
+        else:
+            self.stdout.write("UPDATE ... RETURNING is not supported here.")
+
+        for label, use_returning in paths:
+            availability.use_update_returning = use_returning
+            queries, elapsed = self._run(connection, availability, iterations)
+            operations = iterations * 2
+            self.stdout.write(
+                f"- {label}: {queries / operations:.1f} statement(s) per call, "
+                f"{elapsed / operations * 1_000_000:.0f} us per call"
+            )
+
+    def _availability(self, availability_id):
+        queryset = FacilityClassAvailability.objects.order_by("pk")
+        if availability_id:
+            queryset = queryset.filter(pk=availability_id)
+        availability = queryset.first()
+        if availability is None:
+            raise CommandError("No class availability row to benchmark.")
+        return availability
+
+    def _run(self, connection, availability, iterations):
+        with transaction.atomic(using=connection.alias):
+            with CaptureQueriesContext(connection) as captured:
+                started = perf_counter()
+                try:
+                    for _ in range(iterations):
+                        availability.reserve()
+                        availability.release()
+                except ValidationError as exc:
+                    raise CommandError("; ".join(exc.messages)) from exc
+                elapsed = perf_counter() - started
+            transaction.set_rollback(True, using=connection.alias)
+        return len(captured), elapsed
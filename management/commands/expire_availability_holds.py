@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from enrollment.models.availability import (
+    FacilityClassAvailability,
+    QuartersWeekAvailability,
+)
+
+
+class Command(BaseCommand):
+    help = "Remove expired signup holds and return their seats to availability."
+
+    def handle(self, *args, **options):
+        expired = 0
+        for model in (FacilityClassAvailability, QuartersWeekAvailability):
+            removed = model.expire_holds()
+            if removed:
+                self.stdout.write(f"- {model.__name__}: {removed} hold(s) expired")
+            expired += removed
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} hold(s)."))
@@ -1,11 +1,23 @@
 import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connections, transaction
+
+from enrollment.import_workers import import_partition, init_import_worker
 
 from enrollment.models.faction import FactionEnrollment
 from enrollment.services import SchedulingService
+from enrollment.services.audit import deferred_events
+from enrollment.services.imports import (
+    AttendeeImportResolver,
+    chunked,
+    error_line_number,
+    import_attendee_chunk,
+    partition_by_faction_enrollment,
+)
 from faction.models.attendee import AttendeeProfile
 from facility.models.quarters import Quarters
 
@@ -20,13 +32,32 @@ class Command(BaseCommand):
             action="store_true",
             help="Persist rows. Without this flag the command only validates.",
         )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Resolve lookups and insert rows in batched chunks.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows per chunk in streaming mode (default: 500).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Import partitions of rows grouped by faction enrollment in this "
+                "many worker processes. Implies --stream. With --commit, each "
+                "partition is committed unless it has errors of its own."
+            ),
+        )
 
     def handle(self, *args, **options):
         path = options["csv_path"]
         commit = options["commit"]
         service = SchedulingService()
-        created = 0
-        errors = []
 
         try:
             csv_file = open(path, newline="")
@@ -42,40 +73,127 @@ class Command(BaseCommand):
                     "CSV is missing required column(s): " + ", ".join(sorted(missing))
                 )
 
-            with transaction.atomic():
-                for line_number, row in enumerate(reader, start=2):
-                    try:
-                        attendee = self._get_attendee(row["attendee"])
-                        faction_enrollment = FactionEnrollment.objects.get(
-                            pk=row["faction_enrollment"]
-                        )
-                        quarters = Quarters.objects.get(pk=row["quarters"])
-                        service.schedule_attendee_enrollment(
-                            attendee=attendee,
-                            faction_enrollment=faction_enrollment,
-                            quarters=quarters,
-                            role=row.get("role") or None,
-                        )
-                        created += 1
-                    except (
-                        AttendeeProfile.DoesNotExist,
-                        FactionEnrollment.DoesNotExist,
-                        Quarters.DoesNotExist,
-                        ValidationError,
-                    ) as exc:
-                        errors.append(f"line {line_number}: {exc}")
+            if options["workers"] > 1:
+                created, errors, failure = self._import_parallel(
+                    reader, options["chunk_size"], options["workers"], commit
+                )
+                self._report(created, errors, commit, failure=failure)
+                return
+
+            with deferred_events(), transaction.atomic():
+                if options["stream"]:
+                    created, errors = self._import_streaming(
+                        service, reader, options["chunk_size"]
+                    )
+                else:
+                    created, errors = self._import_rows(service, reader)
                 if errors or not commit:
                     transaction.set_rollback(True)
 
+        self._report(created, errors, commit)
+
+    def _report(self, created, errors, commit, failure="No rows were committed."):
         if errors:
             self.stdout.write(self.style.ERROR(f"Import failed with {len(errors)} error(s):"))
             for error in errors:
                 self.stdout.write(f"- {error}")
-            raise CommandError("No rows were committed.")
+            raise CommandError(failure)
 
         mode = "Imported" if commit else "Validated"
         self.stdout.write(self.style.SUCCESS(f"{mode} {created} attendee enrollment(s)."))
 
+    def _import_rows(self, service, reader):
+        created = 0
+        errors = []
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                attendee = self._get_attendee(row["attendee"])
+                faction_enrollment = FactionEnrollment.objects.get(
+                    pk=row["faction_enrollment"]
+                )
+                quarters = Quarters.objects.get(pk=row["quarters"])
+                service.schedule_attendee_enrollment(
+                    attendee=attendee,
+                    faction_enrollment=faction_enrollment,
+                    quarters=quarters,
+                    role=row.get("role") or None,
+                )
+                created += 1
+            except (
+                AttendeeProfile.DoesNotExist,
+                FactionEnrollment.DoesNotExist,
+                Quarters.DoesNotExist,
+                ValidationError,
+            ) as exc:
+                errors.append(f"line {line_number}: {exc}")
+        return created, errors
+
+    def _import_streaming(self, service, reader, chunk_size):
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be greater than zero.")
+        resolver = AttendeeImportResolver()
+        created = 0
+        errors = []
+        processed = 0
+        started = time.monotonic()
+        for chunk in chunked(enumerate(reader, start=2), chunk_size):
+            chunk_created, chunk_errors = import_attendee_chunk(
+                service, resolver, chunk
+            )
+            created += chunk_created
+            errors.extend(chunk_errors)
+            processed += len(chunk)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"Processed {processed} row(s) ({processed / elapsed:.0f} rows/sec)."
+            )
+        return created, errors
+
+    def _import_parallel(self, reader, chunk_size, workers, commit):
+        """
+        Validate and insert every partition once, in parallel. Each worker
+        uses its own connection and transaction, so a partition is committed
+        whole or not at all, but partitions without errors are committed even
+        when another one fails. Returns ``(created, errors, failure)`` for
+        ``_report``.
+        """
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be greater than zero.")
+        partitions = partition_by_faction_enrollment(
+            enumerate(reader, start=2), workers
+        )
+        if not partitions:
+            return 0, [], "No rows were committed."
+        # Forked workers must not share the parent's database sockets.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=len(partitions), initializer=init_import_worker
+        ) as pool:
+            created, errors = self._run_partitions(pool, partitions, chunk_size, commit)
+        if commit:
+            return created, errors, "Partitions without errors were committed."
+        return created, errors, "No rows were committed."
+
+    def _run_partitions(self, pool, partitions, chunk_size, commit):
+        started = time.monotonic()
+        futures = [
+            pool.submit(import_partition, partition, chunk_size, commit)
+            for partition in partitions
+        ]
+        created = 0
+        errors = []
+        for future in futures:
+            partition_created, partition_errors = future.result()
+            created += partition_created
+            errors.extend(partition_errors)
+        processed = sum(len(partition) for partition in partitions)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"{'Imported' if commit else 'Validated'} {processed} row(s) across "
+            f"{len(partitions)} worker(s) ({processed / elapsed:.0f} rows/sec)."
+        )
+        return created, sorted(errors, key=error_line_number)
+
     def _get_attendee(self, value):
         if value.isdigit():
             return AttendeeProfile.objects.get(pk=value)
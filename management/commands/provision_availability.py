@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollment.models.facility import FacilityEnrollment
+from enrollment.services.provisioning import provision_facility_enrollment
+
+
+class Command(BaseCommand):
+    help = "Create missing quarters and class availability rows ahead of signups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-fe",
+            "--facility-enrollment",
+            type=int,
+            help="ID of the Facility Enrollment to provision (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        facility_enrollments = FacilityEnrollment.objects.order_by("pk")
+        facility_enrollment_id = options.get("facility_enrollment")
+        if facility_enrollment_id:
+            facility_enrollments = facility_enrollments.filter(
+                pk=facility_enrollment_id
+            )
+            if not facility_enrollments.exists():
+                raise CommandError("Facility enrollment not found.")
+
+        quarters_rows = class_rows = 0
+        for facility_enrollment in facility_enrollments:
+            result = provision_facility_enrollment(facility_enrollment)
+            if result.total:
+                self.stdout.write(
+                    f"- {facility_enrollment}: {result.quarters_rows} quarters "
+                    f"row(s), {result.class_rows} class row(s)"
+                )
+            quarters_rows += result.quarters_rows
+            class_rows += result.class_rows
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Provisioned {quarters_rows} quarters row(s) and "
+                f"{class_rows} class row(s)."
+            )
+        )
@@ -1,15 +1,31 @@
-from django.core.management.base import BaseCommand
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
-from enrollment.models.attendee_class import AttendeeClassEnrollment
+from enrollment.cache_keys import (
+    FACTION_ENROLLMENT,
+    bump_availability_status_version,
+    bump_generation,
+)
+from enrollment.models.attendee import AttendeeEnrollment
 from enrollment.models.availability import (
     FacilityClassAvailability,
     FacultyQuartersAvailability,
     QuartersWeekAvailability,
 )
 from enrollment.models.faction import FactionEnrollment
+from enrollment.models.facility import FacilityEnrollment
 from enrollment.models.facility_class import FacilityClassEnrollment
 from enrollment.models.faculty import FacultyEnrollment
+from enrollment.models.leader import LeaderEnrollment
+from enrollment.models.occupancy import FactionQuartersOccupancy
+from enrollment.models.reconcile import ReconcileWatermark
+from enrollment.services.imports import chunked
 
 
 class Command(BaseCommand):
@@ -21,166 +37,405 @@ class Command(BaseCommand):
             action="store_true",
             help="Apply repairs instead of only reporting drift.",
         )
+        parser.add_argument(
+            "-fe",
+            "--facility-enrollment",
+            type=int,
+            help="ID of the Facility Enrollment to reconcile",
+        )
+        parser.add_argument(
+            "-oe",
+            "--organization-enrollment",
+            type=int,
+            help="ID of the Organization Enrollment to reconcile",
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Only revisit resources whose availability row or enrollments "
+                "changed at or after this ISO date/datetime."
+            ),
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Resume from the last clean run of this scope and only revisit "
+                "resources changed since then. The first run is a full scan."
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows repaired per transaction (default: 500).",
+        )
 
     def handle(self, *args, **options):
         fix = options["fix"]
+        self.chunk_size = options["chunk_size"]
+        if self.chunk_size <= 0:
+            raise CommandError("--chunk-size must be greater than zero.")
+        self.facility_enrollment_ids = self._scope(options)
+        self.since = self._parse_since(options.get("since"))
+        watermark_scope = None
+        if options["incremental"]:
+            if self.since is not None:
+                raise CommandError("--incremental and --since cannot be combined.")
+            watermark_scope = self._watermark_scope(options)
+            self.since = ReconcileWatermark.since(watermark_scope)
+            if self.since is None:
+                self.stdout.write(f"No watermark for {watermark_scope}; full scan.")
+            else:
+                self.stdout.write(f"Revisiting changes since {self.since.isoformat()}.")
+        self.scanned = 0
+        self.fixed = 0
+        self.skipped = 0
+
+        run_started_at = timezone.now()
+        started = time.monotonic()
         issues = []
-        with transaction.atomic():
-            issues.extend(self._check_faction_quarters(fix))
-            issues.extend(self._check_faculty_quarters(fix))
-            issues.extend(self._check_class_availability(fix))
+        issues.extend(self._check_faction_quarters(fix))
+        issues.extend(self._check_faculty_quarters(fix))
+        issues.extend(self._check_class_availability(fix))
+        issues.extend(self._check_faction_occupancy(fix))
+        elapsed = max(time.monotonic() - started, 1e-6)
 
         if not issues:
             self.stdout.write(self.style.SUCCESS("Availability is reconciled."))
-            return
+        else:
+            action = "Repaired" if fix else "Found"
+            self.stdout.write(self.style.WARNING(f"{action} {len(issues)} issue(s):"))
+            for issue in issues:
+                self.stdout.write(f"- {issue}")
+        if self.fixed:
+            bump_availability_status_version()
+        if watermark_scope and (fix or not issues):
+            ReconcileWatermark.advance(watermark_scope, run_started_at)
+        self.stdout.write(
+            f"Scanned {self.scanned} row(s) ({self.scanned / elapsed:.0f} rows/sec), "
+            f"fixed {self.fixed} ({self.fixed / elapsed:.0f} rows/sec) "
+            f"in {elapsed:.2f}s."
+        )
+        if self.skipped:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {self.skipped} row(s) that changed during the run; "
+                    "run again to repair them."
+                )
+            )
 
-        action = "Repaired" if fix else "Found"
-        self.stdout.write(self.style.WARNING(f"{action} {len(issues)} issue(s):"))
-        for issue in issues:
-            self.stdout.write(f"- {issue}")
+    def _scope(self, options):
+        facility_enrollment_id = options.get("facility_enrollment")
+        organization_enrollment_id = options.get("organization_enrollment")
+        if not facility_enrollment_id and not organization_enrollment_id:
+            return None
+        facility_enrollments = FacilityEnrollment.objects.all()
+        if facility_enrollment_id:
+            facility_enrollments = facility_enrollments.filter(pk=facility_enrollment_id)
+        if organization_enrollment_id:
+            facility_enrollments = facility_enrollments.filter(
+                organization_enrollment_id=organization_enrollment_id
+            )
+        ids = list(facility_enrollments.values_list("pk", flat=True))
+        if not ids:
+            raise CommandError("No facility enrollments match the given scope.")
+        return ids
+
+    def _watermark_scope(self, options):
+        parts = [
+            f"{name}:{options[name]}"
+            for name in ("facility_enrollment", "organization_enrollment")
+            if options.get(name)
+        ]
+        return "/".join(parts) or "all"
+
+    def _parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError("--since must be an ISO date or datetime.")
+            since = datetime.combine(day, dt_time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def _scoped(self, queryset, field):
+        if self.facility_enrollment_ids is None:
+            return queryset
+        return queryset.filter(**{f"{field}__in": self.facility_enrollment_ids})
+
+    def _changed(self, queryset):
+        if self.since is None:
+            return queryset
+        return queryset.filter(updated_at__gte=self.since)
 
     def _check_faction_quarters(self, fix):
-        issues = []
-        expected = {
-            (
-                enrollment.facility_enrollment_id,
-                enrollment.week_id,
-                enrollment.quarters_id,
-            ): enrollment.quarters.capacity
-            for enrollment in FactionEnrollment.objects.select_related("quarters")
-        }
-        for key, expected_reserved in expected.items():
-            facility_enrollment_id, week_id, quarters_id = key
-            availability = self._get_or_create(
-                QuartersWeekAvailability,
-                fix,
-                {
-                    "facility_enrollment_id": facility_enrollment_id,
-                    "week_id": week_id,
-                    "quarters_id": quarters_id,
-                },
-                {"capacity": expected_reserved},
+        key_fields = ("facility_enrollment_id", "week_id", "quarters_id")
+        enrollments = self._scoped(FactionEnrollment.objects.all(), "facility_enrollment_id")
+        availability = self._scoped(
+            QuartersWeekAvailability.objects.all(), "facility_enrollment_id"
+        )
+        dirty = None
+        if self.since is not None:
+            dirty = set(self._changed(availability).values_list(*key_fields))
+            dirty.update(self._changed(enrollments).values_list(*key_fields))
+            if not dirty:
+                return []
+            enrollments = enrollments.filter(
+                week_id__in={key[1] for key in dirty},
+                quarters_id__in={key[2] for key in dirty},
             )
-            if availability is None:
-                issues.append(f"Missing faction quarters availability {key}")
-                continue
-            if (
-                availability.capacity != expected_reserved
-                or availability.reserved != expected_reserved
-            ):
-                issues.append(
-                    "Faction quarters availability drift "
-                    f"{key}: reserved={availability.reserved}, "
-                    f"capacity={availability.capacity}, expected={expected_reserved}"
-                )
-                if fix:
-                    availability.capacity = expected_reserved
-                    availability.reserved = expected_reserved
-                    availability.save(update_fields=["capacity", "reserved", "updated_at"])
-
-        for availability in QuartersWeekAvailability.objects.exclude(
-            reserved=0
-        ).select_related("quarters"):
-            key = (
-                availability.facility_enrollment_id,
-                availability.week_id,
-                availability.quarters_id,
+            availability = availability.filter(
+                week_id__in={key[1] for key in dirty},
+                quarters_id__in={key[2] for key in dirty},
             )
-            if key not in expected:
-                issues.append(f"Stale faction quarters reservation {key}")
-                if fix:
-                    availability.reserved = 0
-                    availability.save(update_fields=["reserved", "updated_at"])
-        return issues
+        expected = {}
+        for *key, capacity in enrollments.values_list(
+            *key_fields, "quarters__capacity"
+        ).iterator():
+            expected[tuple(key)] = {"capacity": capacity, "reserved": capacity}
+        return self._reconcile(
+            QuartersWeekAvailability,
+            "Faction quarters",
+            key_fields,
+            expected,
+            availability,
+            fix,
+            dirty=dirty,
+        )
 
     def _check_faculty_quarters(self, fix):
-        issues = []
+        key_fields = ("facility_enrollment_id", "quarters_id")
+        enrollments = self._scoped(FacultyEnrollment.objects.all(), "facility_enrollment_id")
+        availability = self._scoped(
+            FacultyQuartersAvailability.objects.all(), "facility_enrollment_id"
+        )
+        dirty = None
+        if self.since is not None:
+            dirty = set(self._changed(availability).values_list(*key_fields))
+            dirty.update(self._changed(enrollments).values_list(*key_fields))
+            if not dirty:
+                return []
+            enrollments = enrollments.filter(quarters_id__in={key[1] for key in dirty})
+            availability = availability.filter(
+                quarters_id__in={key[1] for key in dirty}
+            )
+        grouped = (
+            enrollments.values(*key_fields, "quarters__capacity")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
         expected = {}
-        for enrollment in FacultyEnrollment.objects.select_related("quarters"):
-            key = (enrollment.facility_enrollment_id, enrollment.quarters_id)
-            capacity = enrollment.quarters.capacity or 1
-            if key not in expected:
-                expected[key] = {"reserved": 0, "capacity": capacity}
-            expected[key]["reserved"] += 1
-            expected[key]["capacity"] = capacity
+        for row in grouped.iterator():
+            key = tuple(row[field] for field in key_fields)
+            expected[key] = {
+                "capacity": row["quarters__capacity"] or 1,
+                "reserved": row["total"],
+            }
+        return self._reconcile(
+            FacultyQuartersAvailability,
+            "Faculty quarters",
+            key_fields,
+            expected,
+            availability,
+            fix,
+            dirty=dirty,
+        )
+
+    def _check_class_availability(self, fix):
+        offerings = self._scoped(
+            FacilityClassEnrollment.objects.all(),
+            "facility_class__facility_enrollment_id",
+        )
+        if self.since is not None:
+            changed = FacilityClassAvailability.objects.filter(
+                updated_at__gte=self.since
+            ).values("facility_class_enrollment_id")
+            offerings = offerings.filter(
+                pk__in=changed
+            ) | offerings.filter(updated_at__gte=self.since)
+        grouped = offerings.values("id", "max_enrollment").annotate(
+            total=Count("attendee_class_enrollments")
+        ).order_by()
+        expected = {
+            (row["id"],): {"capacity": row["max_enrollment"], "reserved": row["total"]}
+            for row in grouped.iterator()
+        }
+        availability = FacilityClassAvailability.objects.filter(
+            facility_class_enrollment_id__in=offerings.values("id")
+        )
+        return self._reconcile(
+            FacilityClassAvailability,
+            "Class",
+            ("facility_class_enrollment_id",),
+            expected,
+            availability,
+            fix,
+            report_stale=False,
+        )
+
+    def _reconcile(
+        self, model, label, key_fields, expected, availability, fix, *, dirty=None,
+        report_stale=True,
+    ):
+        """
+        Compare grouped ``expected`` counts with ``availability`` rows and, with
+        ``fix``, repair them in chunks: missing rows with ``bulk_create``, and
+        drifted rows only while they still hold the scanned counts.
+        """
+        issues = []
+        to_create = []
+        to_update = []
+        rows = {}
+        for row in availability.values("pk", *key_fields, "capacity", "reserved").iterator():
+            key = tuple(row[field] for field in key_fields)
+            if dirty is None or key in dirty:
+                rows[key] = row
+        if dirty is not None:
+            expected = {key: values for key, values in expected.items() if key in dirty}
+        self.scanned += len(expected.keys() | rows.keys())
 
         for key, values in expected.items():
-            facility_enrollment_id, quarters_id = key
-            availability = self._get_or_create(
-                FacultyQuartersAvailability,
-                fix,
-                {
-                    "facility_enrollment_id": facility_enrollment_id,
-                    "quarters_id": quarters_id,
-                },
-                {"capacity": values["capacity"]},
-            )
-            if availability is None:
-                issues.append(f"Missing faculty quarters availability {key}")
+            row = rows.get(key)
+            if row is None:
+                issues.append(f"Missing {label.lower()} availability {key}")
+                to_create.append(
+                    model(**dict(zip(key_fields, key)), **values)
+                )
                 continue
-            if (
-                availability.capacity != values["capacity"]
-                or availability.reserved != values["reserved"]
-            ):
+            if row["capacity"] != values["capacity"] or row["reserved"] != values["reserved"]:
                 issues.append(
-                    "Faculty quarters availability drift "
-                    f"{key}: reserved={availability.reserved}, "
-                    f"capacity={availability.capacity}, expected={values}"
+                    f"{label} availability drift {key}: "
+                    f"reserved={row['reserved']}, capacity={row['capacity']}, "
+                    f"expected reserved={values['reserved']}, "
+                    f"capacity={values['capacity']}"
                 )
-                if fix:
-                    availability.capacity = values["capacity"]
-                    availability.reserved = values["reserved"]
-                    availability.save(update_fields=["capacity", "reserved", "updated_at"])
-
-        for availability in FacultyQuartersAvailability.objects.exclude(reserved=0):
-            key = (availability.facility_enrollment_id, availability.quarters_id)
-            if key not in expected:
-                issues.append(f"Stale faculty quarters reservation {key}")
-                if fix:
-                    availability.reserved = 0
-                    availability.save(update_fields=["reserved", "updated_at"])
+                to_update.append((row, values))
+
+        if report_stale:
+            for key, row in rows.items():
+                if row["reserved"] and key not in expected:
+                    issues.append(f"Stale {label.lower()} reservation {key}")
+                    to_update.append(
+                        (row, {"capacity": row["capacity"], "reserved": 0})
+                    )
+
+        if fix:
+            self._apply(model, to_create, to_update)
         return issues
 
-    def _check_class_availability(self, fix):
-        issues = []
-        expected = {
-            enrollment.pk: {
-                "capacity": enrollment.max_enrollment,
-                "reserved": AttendeeClassEnrollment.objects.filter(
-                    facility_class_enrollment=enrollment
-                ).count(),
-            }
-            for enrollment in FacilityClassEnrollment.objects.all()
-        }
-        for enrollment_id, values in expected.items():
-            availability = self._get_or_create(
-                FacilityClassAvailability,
-                fix,
-                {"facility_class_enrollment_id": enrollment_id},
-                {"capacity": values["capacity"]},
+    def _apply(self, model, to_create, to_update):
+        now = timezone.now()
+        for chunk in chunked(to_create, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, ignore_conflicts=True)
+            self.fixed += len(chunk)
+        # A row is only overwritten while it still holds the counts it was
+        # scanned with, so a reserve() or release() that ran since the scan
+        # is kept and the row is left for the next run.
+        for chunk in chunked(to_update, self.chunk_size):
+            repaired = []
+            with transaction.atomic():
+                for row, values in chunk:
+                    if model.objects.filter(
+                        pk=row["pk"], capacity=row["capacity"], reserved=row["reserved"]
+                    ).update(**values, updated_at=now):
+                        repaired.append(row["pk"])
+            if repaired:
+                model.invalidate_cache(repaired)
+            self.fixed += len(repaired)
+            self.skipped += len(chunk) - len(repaired)
+
+    def _check_faction_occupancy(self, fix):
+        occupancy_rows = self._scoped(
+            FactionQuartersOccupancy.objects.all(),
+            "faction_enrollment__facility_enrollment_id",
+        )
+        members = [
+            self._scoped(model.objects.all(), "faction_enrollment__facility_enrollment_id")
+            for model in (AttendeeEnrollment, LeaderEnrollment)
+        ]
+        dirty = None
+        if self.since is not None:
+            key_fields = ("faction_enrollment_id", "quarters_id")
+            dirty = set(self._changed(occupancy_rows).values_list(*key_fields))
+            for queryset in members:
+                dirty.update(self._changed(queryset).values_list(*key_fields))
+            if not dirty:
+                return []
+            faction_enrollment_ids = {key[0] for key in dirty}
+            occupancy_rows = occupancy_rows.filter(
+                faction_enrollment_id__in=faction_enrollment_ids
+            )
+            members = [
+                queryset.filter(faction_enrollment_id__in=faction_enrollment_ids)
+                for queryset in members
+            ]
+
+        expected = {}
+        for queryset in members:
+            grouped = (
+                queryset.values("faction_enrollment_id", "quarters_id")
+                .annotate(total=Count("id"))
+                .order_by()
             )
-            if availability is None:
-                issues.append(f"Missing class availability {enrollment_id}")
+            for row in grouped.iterator():
+                key = (row["faction_enrollment_id"], row["quarters_id"])
+                if dirty is None or key in dirty:
+                    expected[key] = expected.get(key, 0) + row["total"]
+
+        issues = []
+        to_update = []
+        drifted = set()
+        scanned = set(expected)
+        now = timezone.now()
+        for pk, *key, occupied in occupancy_rows.values_list(
+            "pk", "faction_enrollment_id", "quarters_id", "occupied"
+        ).iterator():
+            key = tuple(key)
+            if dirty is not None and key not in dirty:
                 continue
-            if (
-                availability.capacity != values["capacity"]
-                or availability.reserved != values["reserved"]
-            ):
+            scanned.add(key)
+            expected_occupied = expected.pop(key, 0)
+            if occupied != expected_occupied:
                 issues.append(
-                    "Class availability drift "
-                    f"{enrollment_id}: reserved={availability.reserved}, "
-                    f"capacity={availability.capacity}, expected={values}"
+                    "Faction quarters occupancy drift "
+                    f"{key}: occupied={occupied}, expected={expected_occupied}"
                 )
-                if fix:
-                    availability.capacity = values["capacity"]
-                    availability.reserved = values["reserved"]
-                    availability.save(update_fields=["capacity", "reserved", "updated_at"])
-        return issues
+                drifted.add(key[0])
+                to_update.append((pk, occupied, expected_occupied))
+        to_create = []
+        for key, occupied in expected.items():
+            issues.append(f"Missing faction quarters occupancy {key}")
+            drifted.add(key[0])
+            to_create.append(
+                FactionQuartersOccupancy(
+                    faction_enrollment_id=key[0], quarters_id=key[1], occupied=occupied
+                )
+            )
+        self.scanned += len(scanned)
 
-    def _get_or_create(self, model, fix, lookup, defaults):
-        try:
-            return model.objects.get(**lookup)
-        except model.DoesNotExist:
-            if not fix:
-                return None
-            return model.objects.create(**lookup, **defaults)
+        if fix:
+            for chunk in chunked(to_create, self.chunk_size):
+                with transaction.atomic():
+                    FactionQuartersOccupancy.objects.bulk_create(
+                        chunk, ignore_conflicts=True
+                    )
+                self.fixed += len(chunk)
+            for chunk in chunked(to_update, self.chunk_size):
+                repaired = 0
+                with transaction.atomic():
+                    for pk, occupied, expected_occupied in chunk:
+                        repaired += FactionQuartersOccupancy.objects.filter(
+                            pk=pk, occupied=occupied
+                        ).update(occupied=expected_occupied, updated_at=now)
+                self.fixed += repaired
+                self.skipped += len(chunk) - repaired
+            # Occupancy feeds the cached quarters usage of each faction
+            # enrollment; retire those keys a whole scope at a time.
+            bump_generation(FACTION_ENROLLMENT, *drifted)
+        return issues
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollment.conflicts import find_period_conflicts
+from enrollment.models.facility import FacilityEnrollment
+
+
+class Command(BaseCommand):
+    help = "List attendees booked into classes whose periods overlap."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-fe",
+            "--facility-enrollment",
+            type=int,
+            required=True,
+            help="ID of the Facility Enrollment to check",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            facility_enrollment = FacilityEnrollment.objects.get(
+                pk=options["facility_enrollment"]
+            )
+        except FacilityEnrollment.DoesNotExist as exc:
+            raise CommandError("Facility enrollment not found.") from exc
+
+        conflicts = find_period_conflicts(facility_enrollment)
+        if not conflicts:
+            self.stdout.write(self.style.SUCCESS("No overlapping class bookings."))
+            return
+
+        self.stdout.write(
+            self.style.WARNING(f"Found {len(conflicts)} overlapping booking(s):")
+        )
+        for conflict in conflicts:
+            self.stdout.write(
+                f"- attendee {conflict.attendee_id}, week {conflict.week_id}: "
+                f"offering {conflict.facility_class_enrollment_id} overlaps "
+                f"{conflict.conflicting_facility_class_enrollment_id}"
+            )
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollment.models.facility import FacilityEnrollment
+from enrollment.services.lottery import lottery_periods, run_class_lottery
+
+
+class Command(BaseCommand):
+    help = "Assign attendees to classes from ranked preferences in one batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-fe",
+            "--facility-enrollment",
+            type=int,
+            required=True,
+            help="ID of the Facility Enrollment to run the lottery for",
+        )
+        parser.add_argument(
+            "-p",
+            "--period",
+            type=int,
+            help="ID of a single Period to run the lottery for",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed for a reproducible draw.",
+        )
+        parser.add_argument(
+            "--commit",
+            action="store_true",
+            help="Persist assignments. Without this flag the command only draws.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            facility_enrollment = FacilityEnrollment.objects.get(
+                pk=options["facility_enrollment"]
+            )
+        except FacilityEnrollment.DoesNotExist as exc:
+            raise CommandError("Facility enrollment not found.") from exc
+
+        assigned = 0
+        unassigned = 0
+        for period in lottery_periods(facility_enrollment, options.get("period")):
+            result = run_class_lottery(
+                period, seed=options.get("seed"), commit=options["commit"]
+            )
+            assigned += len(result.assigned)
+            unassigned += len(result.unassigned)
+            self.stdout.write(
+                f"- {period}: {len(result.assigned)} assigned, "
+                f"{len(result.unassigned)} without a seat"
+            )
+
+        mode = "Assigned" if options["commit"] else "Drew"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{mode} {assigned} attendee(s); {unassigned} could not be placed."
+            )
+        )
@@ -0,0 +1,88 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollment", "0024_class_assignment_uniqueness"),
+        ("faction", "0014_attendeeprofile_slug_leaderprofile_slug"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassPreference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "attendee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="class_preferences",
+                        to="faction.attendeeprofile",
+                        verbose_name="Attendee",
+                    ),
+                ),
+                (
+                    "attendee_enrollment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="class_preferences",
+                        to="enrollment.attendeeenrollment",
+                        verbose_name="Attendee Enrollment",
+                    ),
+                ),
+                (
+                    "facility_class_enrollment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="preferences",
+                        to="enrollment.facilityclassenrollment",
+                        verbose_name="Facility Class Enrollment",
+                    ),
+                ),
+                (
+                    "period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="class_preferences",
+                        to="enrollment.period",
+                        verbose_name="Period",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Class Preference",
+                "verbose_name_plural": "Class Preferences",
+                "ordering": ["period", "attendee", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "attendee", "rank"],
+                        name="class_pref_period_rank_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("attendee", "period", "rank"),
+                        name="unique_class_preference_rank",
+                    ),
+                    models.UniqueConstraint(
+                        fields=("attendee", "facility_class_enrollment"),
+                        name="unique_class_preference_offering",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_occupancy(apps, schema_editor):
+    AttendeeEnrollment = apps.get_model("enrollment", "AttendeeEnrollment")
+    LeaderEnrollment = apps.get_model("enrollment", "LeaderEnrollment")
+    FactionQuartersOccupancy = apps.get_model("enrollment", "FactionQuartersOccupancy")
+    totals = {}
+    for model in (AttendeeEnrollment, LeaderEnrollment):
+        grouped = (
+            model.objects.values("faction_enrollment_id", "quarters_id")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        for row in grouped:
+            key = (row["faction_enrollment_id"], row["quarters_id"])
+            totals[key] = totals.get(key, 0) + row["total"]
+    FactionQuartersOccupancy.objects.bulk_create(
+        [
+            FactionQuartersOccupancy(
+                faction_enrollment_id=faction_enrollment_id,
+                quarters_id=quarters_id,
+                occupied=occupied,
+            )
+            for (faction_enrollment_id, quarters_id), occupied in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollment", "0025_classpreference"),
+        (
+            "facility",
+            "0015_alter_facultyprofile_options_alter_facility_address_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FactionQuartersOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("occupied", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "faction_enrollment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quarters_occupancy",
+                        to="enrollment.factionenrollment",
+                    ),
+                ),
+                (
+                    "quarters",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="faction_occupancy",
+                        to="facility.quarters",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("faction_enrollment", "quarters")},
+            },
+        ),
+        migrations.RunPython(seed_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hold_fields():
+    return [
+        (
+            "id",
+            models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        (
+            "token",
+            models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        ("amount", models.PositiveIntegerField(default=1)),
+        ("expires_at", models.DateTimeField()),
+        ("created_at", models.DateTimeField(auto_now_add=True)),
+        (
+            "user",
+            models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollment", "0026_factionquartersoccupancy"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facilityclassavailability",
+            name="held",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="facilityclassavailability",
+            name="next_hold_expiry",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="facultyquartersavailability",
+            name="held",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="facultyquartersavailability",
+            name="next_hold_expiry",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="quartersweekavailability",
+            name="held",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="quartersweekavailability",
+            name="next_hold_expiry",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="FacilityClassHold",
+            fields=hold_fields()
+            + [
+                (
+                    "availability",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="enrollment.facilityclassavailability",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["availability", "expires_at"],
+                        name="class_hold_expiry_idx",
+                    ),
+                    models.Index(fields=["expires_at"], name="class_hold_sweep_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="QuartersWeekHold",
+            fields=hold_fields()
+            + [
+                (
+                    "availability",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="enrollment.quartersweekavailability",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["availability", "expires_at"],
+                        name="quarters_hold_expiry_idx",
+                    ),
+                    models.Index(
+                        fields=["expires_at"], name="quarters_hold_sweep_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollment", "0027_availability_holds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconcileWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=100, unique=True)),
+                ("reconciled_through", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="quartersweekavailability",
+            index=models.Index(
+                fields=["updated_at"], name="quarters_week_avail_upd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="facilityclassavailability",
+            index=models.Index(fields=["updated_at"], name="class_avail_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="facultyquartersavailability",
+            index=models.Index(fields=["updated_at"], name="faculty_quarters_upd_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="factionquartersoccupancy",
+            index=models.Index(
+                fields=["updated_at"], name="faction_occupancy_upd_idx"
+            ),
+        ),
+    ]
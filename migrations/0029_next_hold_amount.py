@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def seed_next_hold_amount(apps, schema_editor):
+    for availability_name, hold_name in (
+        ("FacilityClassAvailability", "FacilityClassHold"),
+        ("QuartersWeekAvailability", "QuartersWeekHold"),
+    ):
+        Availability = apps.get_model("enrollment", availability_name)
+        Hold = apps.get_model("enrollment", hold_name)
+        rows = Availability.objects.filter(next_hold_expiry__isnull=False)
+        for pk, expiry in rows.values_list("pk", "next_hold_expiry").iterator():
+            amount = Hold.objects.filter(
+                availability_id=pk, expires_at=expiry
+            ).aggregate(total=Sum("amount"))["total"]
+            Availability.objects.filter(pk=pk).update(next_hold_amount=amount or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("enrollment", "0028_reconcile_watermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facilityclassavailability",
+            name="next_hold_amount",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="facultyquartersavailability",
+            name="next_hold_amount",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="quartersweekavailability",
+            name="next_hold_amount",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(seed_next_hold_amount, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,14 @@
 # enrollment/models/attendee.py
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 
+from .occupancy import FactionQuartersOccupancy, QuartersOccupancyMixin
 from .temporal import AbstractTemporalHierarchy
 from ..querysets import AttendeeEnrollmentQuerySet
-from django.apps import apps
 from enrollment.cache_keys import invalidate_quarters_usage_cache
 
-class AttendeeEnrollment(AbstractTemporalHierarchy):
+class AttendeeEnrollment(QuartersOccupancyMixin, AbstractTemporalHierarchy):
     """Attendee Enrollment Model."""
 
     start = models.DateField(null=True, blank=True)
@@ -57,7 +57,11 @@ class AttendeeEnrollment(AbstractTemporalHierarchy):
     def delete(self, *args, **kwargs):
         faction_id = getattr(self.faction_enrollment, "id", None)
         quarters_id = getattr(self.quarters, "id", None)
-        result = super().delete(*args, **kwargs)
+        scope = self._loaded_scope()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if scope:
+                FactionQuartersOccupancy.decrement(*scope)
         invalidate_quarters_usage_cache(faction_id, quarters_id)
         return result
 
@@ -69,41 +73,27 @@ class AttendeeEnrollment(AbstractTemporalHierarchy):
             raise ValidationError("Attendee enrollments require faction and quarters.")
         capacity = quarters.capacity or 0
         if capacity > 0:
-            attendee_count = (
-                AttendeeEnrollment.objects.filter(
-                    faction_enrollment=faction, quarters=quarters
-                )
-                .exclude(pk=self.pk)
-                .count()
-            )
-            LeaderEnrollment = apps.get_model("enrollment", "LeaderEnrollment")
-            leader_count = LeaderEnrollment.objects.filter(
-                faction_enrollment=faction, quarters=quarters
-            ).count()
-            if attendee_count + leader_count >= capacity:
+            if self._occupancy_excluding_self(faction, quarters) >= capacity:
                 raise ValidationError("Selected quarters are already full.")
 
     def save(self, *args, **kwargs):
         """
-        Keep start/end aligned with the faction enrollment and clear quarters cache.
+        Keep start/end aligned with the faction enrollment, maintain the quarters
+        occupancy counter and clear the quarters cache.
         """
-        previous = None
-        if self.pk:
-            previous = (
-                AttendeeEnrollment.objects.only("faction_enrollment", "quarters")
-                .get(pk=self.pk)
-            )
+        previous_scope = self._loaded_scope()
         if self.faction_enrollment and not self.start:
             self.start = self.faction_enrollment.start
         if self.faction_enrollment and not self.end:
             self.end = self.faction_enrollment.end
 
-        result = super().save(*args, **kwargs)
-        if previous:
-            invalidate_quarters_usage_cache(
-                getattr(previous, "faction_enrollment_id", None),
-                getattr(previous, "quarters_id", None),
-            )
+        with transaction.atomic():
+            self._seed_occupancy(previous_scope)
+            result = super().save(*args, **kwargs)
+            self._sync_occupancy(previous_scope)
+        self._original_scope = self._occupancy_scope()
+        if previous_scope:
+            invalidate_quarters_usage_cache(*previous_scope)
         invalidate_quarters_usage_cache(
             getattr(self.faction_enrollment, "id", None),
             getattr(self.quarters, "id", None),
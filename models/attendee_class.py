@@ -54,3 +54,12 @@ class AttendeeClassEnrollment(models.Model):
     def __str__(self):
         """String representation."""
         return f"{self.attendee} - {self.facility_class_enrollment}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a move can mark the offering it left as changed.
+        instance._original_offering_id = instance.__dict__.get(
+            "facility_class_enrollment_id"
+        )
+        return instance
@@ -1,43 +1,112 @@
-from django.core.cache import cache
+from django.apps import apps
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
-from django.db.models import F
+from django.db import connections, models, router, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from enrollment.cache_keys import (
+    FACILITY_ENROLLMENT,
+    bump_availability_status_version,
+    bump_generation,
+    invalidate_on_commit,
+    merge_on_commit,
+    row_version_key,
+)
+from enrollment.counters import COUNTER_FIELDS, live_held, remaining_seats
+from enrollment.feed import publish_availability
+from enrollment.models.holds import HOLD_TTL, FacilityClassHold, QuartersWeekHold
+
+# Slug of the QuartersType whose quarters are booked per week by factions.
+FACTION_QUARTERS_TYPE = "faction"
+
+
+class CapacityExceeded(ValidationError):
+    """
+    Raised by ``reserve_many`` when one or more rows lack capacity. ``failed``
+    maps each failing pk to its remaining capacity, or None when the row does
+    not exist.
+    """
+
+    def __init__(self, failed, message="Capacity exceeded for this resource."):
+        self.failed = failed
+        super().__init__(message, code="capacity")
+
 
 class BaseAvailability(models.Model):
+    # Backends that accept UPDATE ... RETURNING apply counter changes in one
+    # statement; set to False to force the locking fallback.
+    use_update_returning = True
+    # Ledger model for expiring per-user holds; None disables holds.
+    hold_model = None
+    # Label used by the status report, the hold view and the change feed.
+    kind = None
+
     capacity = models.PositiveIntegerField()
     reserved = models.PositiveIntegerField(default=0)
     on_hold = models.PositiveIntegerField(default=0)
+    # Running total and earliest expiry of the rows in the hold ledger, and
+    # the seats held by the rows that expire at that time.
+    held = models.PositiveIntegerField(default=0)
+    next_hold_expiry = models.DateTimeField(null=True, blank=True)
+    next_hold_amount = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         abstract = True
 
+    @property
+    def live_held(self):
+        return live_held(self.held, self.next_hold_expiry, self.next_hold_amount)
+
     @property
     def remaining(self):
-        return max(self.capacity - self.reserved - self.on_hold, 0)
+        return remaining_seats(
+            **{field: getattr(self, field) for field in COUNTER_FIELDS}
+        )
 
     def reserve(self, amount=1):
         if amount <= 0:
             return
+        # Expired holds are swept lazily, only when they stand in the way.
+        if not self._try_reserve(amount) and not (
+            self.expire_holds(pks=[self.pk]) and self._try_reserve(amount)
+        ):
+            raise ValidationError("Capacity exceeded for this resource.")
+        self.invalidate_cache([self.pk])
+
+    def _try_reserve(self, amount):
+        if self._supports_update_returning():
+            return self._update_returning(
+                "{reserved} = {reserved} + %s",
+                [amount],
+                "{capacity} >= {reserved} + {on_hold} + {held} + %s",
+                [amount],
+            )
         with transaction.atomic():
             updated = (
                 self.__class__.objects.select_for_update()
                 .filter(
                     pk=self.pk,
-                    capacity__gte=F("reserved") + F("on_hold") + amount,
+                    capacity__gte=F("reserved") + F("on_hold") + F("held") + amount,
                 )
                 .update(reserved=F("reserved") + amount, updated_at=timezone.now())
             )
-        if not updated:
-            raise ValidationError("Capacity exceeded for this resource.")
-        cache.delete(self.cache_key())
-        self.refresh_from_db(fields=["reserved", "updated_at"])
+        if updated:
+            self.refresh_from_db(fields=["reserved", "updated_at"])
+        return bool(updated)
 
     def release(self, amount=1):
         if amount <= 0:
             return
+        if self._supports_update_returning():
+            self._update_returning(
+                "{reserved} = CASE WHEN {reserved} < %s THEN 0 "
+                "ELSE {reserved} - %s END",
+                [amount, amount],
+            )
+            self.invalidate_cache([self.pk])
+            return
         with transaction.atomic():
             self.__class__.objects.select_for_update().filter(pk=self.pk).update(
                 reserved=models.Case(
@@ -47,19 +116,360 @@ class BaseAvailability(models.Model):
                 ),
                 updated_at=timezone.now(),
             )
-        cache.delete(self.cache_key())
+        self.invalidate_cache([self.pk])
         self.refresh_from_db(fields=["reserved", "updated_at"])
 
+    @classmethod
+    def reserve_many(cls, amounts, release=None, whole=()):
+        """
+        Reserve ``amounts`` ({pk: amount}) and release ``release`` ({pk:
+        amount}) with a single capacity-checked UPDATE. Rows are locked in pk
+        order first so concurrent multi-row callers cannot deadlock. Nothing is
+        applied unless every reservation fits; ``CapacityExceeded.failed``
+        names the rows that did not.
+
+        Rows in ``whole`` are booked outright, as ``reserve_full`` does: they
+        need ``reserved < capacity`` and no signup hold, and ``reserved`` is
+        set to ``capacity``.
+        """
+        whole = set(whole)
+        deltas = {}
+        for pk, amount in amounts.items():
+            deltas[pk] = deltas.get(pk, 0) + amount
+        for pk, amount in (release or {}).items():
+            deltas[pk] = deltas.get(pk, 0) - amount
+        deltas = {
+            pk: delta for pk, delta in deltas.items() if delta and pk not in whole
+        }
+        if not deltas and not whole:
+            return
+        with transaction.atomic():
+            rows = cls._lock_many(deltas.keys() | whole)
+            failed = cls._failed_reservations(deltas, rows, whole)
+            if failed and cls.expire_holds(pks=failed.keys()):
+                rows = cls._lock_many(deltas.keys() | whole)
+                failed = cls._failed_reservations(deltas, rows, whole)
+            if failed:
+                raise CapacityExceeded(failed)
+            whens = []
+            guard = Q()
+            for pk in whole:
+                whens.append(models.When(pk=pk, then=F("capacity")))
+                guard |= Q(pk=pk, reserved__lt=F("capacity"), held=0)
+            for pk, delta in deltas.items():
+                if pk not in rows:
+                    continue
+                if delta > 0:
+                    whens.append(models.When(pk=pk, then=F("reserved") + delta))
+                    guard |= Q(
+                        pk=pk,
+                        capacity__gte=F("reserved") + F("on_hold") + F("held") + delta,
+                    )
+                else:
+                    whens.append(models.When(pk=pk, reserved__lt=-delta, then=0))
+                    whens.append(models.When(pk=pk, then=F("reserved") + delta))
+                    guard |= Q(pk=pk)
+            updated = cls.objects.filter(guard).update(
+                reserved=models.Case(
+                    *whens,
+                    default=F("reserved"),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(rows):
+                # Only reachable on backends where the lock above is a no-op.
+                raise CapacityExceeded(
+                    cls._failed_reservations(
+                        deltas, cls._lock_many(rows.keys()), whole
+                    )
+                )
+        cls.invalidate_cache(rows)
+
+    @classmethod
+    def release_many(cls, amounts):
+        """Release ``amounts`` ({pk: amount}); counters never drop below zero."""
+        cls.reserve_many({}, release=amounts)
+
+    @classmethod
+    def _lock_many(cls, pks):
+        rows = (
+            cls.objects.select_for_update()
+            .filter(pk__in=list(pks))
+            .order_by("pk")
+            .values_list("pk", "capacity", "reserved", "on_hold", "held")
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    @staticmethod
+    def _failed_reservations(deltas, rows, whole=()):
+        failed = {}
+        for pk in whole:
+            if pk not in rows:
+                failed[pk] = None
+                continue
+            capacity, reserved, on_hold, held = rows[pk]
+            if reserved >= capacity or held:
+                failed[pk] = max(capacity - reserved - on_hold - held, 0)
+        for pk, delta in deltas.items():
+            if delta <= 0:
+                continue
+            if pk not in rows:
+                failed[pk] = None
+                continue
+            capacity, reserved, on_hold, held = rows[pk]
+            remaining = max(capacity - reserved - on_hold - held, 0)
+            if remaining < delta:
+                failed[pk] = remaining
+        return failed
+
+    def place_hold(self, amount=1, *, user=None, ttl=None):
+        """
+        Set ``amount`` seats aside for ``user`` until the hold expires (after
+        ``HOLD_TTL`` by default). Returns the ledger row; pass it to
+        ``convert_hold`` to turn it into a reservation.
+        """
+        if self.hold_model is None:
+            raise ValidationError("Holds are not supported for this resource.")
+        if amount <= 0:
+            raise ValidationError("Hold amount must be greater than zero.")
+        expires_at = timezone.now() + (HOLD_TTL if ttl is None else ttl)
+        with transaction.atomic():
+            if not self._try_hold(amount, expires_at) and not (
+                self.expire_holds(pks=[self.pk])
+                and self._try_hold(amount, expires_at)
+            ):
+                raise ValidationError("Capacity exceeded for this resource.")
+            hold = self.hold_model.objects.create(
+                availability=self, user=user, amount=amount, expires_at=expires_at
+            )
+        self.invalidate_cache([self.pk])
+        self.refresh_from_db(
+            fields=["held", "next_hold_expiry", "next_hold_amount", "updated_at"]
+        )
+        return hold
+
+    def _try_hold(self, amount, expires_at):
+        return bool(
+            self.__class__.objects.filter(
+                pk=self.pk,
+                capacity__gte=F("reserved") + F("on_hold") + F("held") + amount,
+            ).update(
+                held=F("held") + amount,
+                next_hold_expiry=models.Case(
+                    models.When(
+                        next_hold_expiry__lt=expires_at, then=F("next_hold_expiry")
+                    ),
+                    default=models.Value(expires_at),
+                    output_field=models.DateTimeField(),
+                ),
+                next_hold_amount=models.Case(
+                    models.When(
+                        next_hold_expiry__lt=expires_at, then=F("next_hold_amount")
+                    ),
+                    models.When(
+                        next_hold_expiry=expires_at,
+                        then=F("next_hold_amount") + amount,
+                    ),
+                    default=models.Value(amount),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+        )
+
+    def convert_hold(self, hold):
+        """
+        Turn a live hold into a reservation in one atomic step. An expired
+        hold falls back to a regular capacity-checked reservation.
+        """
+        with transaction.atomic():
+            self._lock_many([self.pk])
+            converted, _ = self.hold_model.objects.filter(
+                pk=hold.pk, availability_id=self.pk, expires_at__gt=timezone.now()
+            ).delete()
+            if converted:
+                self._settle_holds({self.pk: hold.amount}, reserve=True)
+            else:
+                self.reserve(hold.amount)
+        self.refresh_from_db(
+            fields=[
+                "reserved",
+                "held",
+                "next_hold_expiry",
+                "next_hold_amount",
+                "updated_at",
+            ]
+        )
+
+    def release_hold(self, hold):
+        with transaction.atomic():
+            self._lock_many([self.pk])
+            released, _ = self.hold_model.objects.filter(
+                pk=hold.pk, availability_id=self.pk
+            ).delete()
+            if released:
+                self._settle_holds({self.pk: hold.amount})
+        self.refresh_from_db(
+            fields=["held", "next_hold_expiry", "next_hold_amount", "updated_at"]
+        )
+
+    @classmethod
+    def expire_holds(cls, pks=None, now=None):
+        """
+        Drop expired ledger rows and subtract them from ``held`` with
+        set-based statements. Limit the sweep to ``pks`` when given. Returns
+        the number of holds removed.
+        """
+        if cls.hold_model is None:
+            return 0
+        expired = cls.hold_model.objects.filter(expires_at__lte=now or timezone.now())
+        if pks is not None:
+            expired = expired.filter(availability_id__in=list(pks))
+        with transaction.atomic():
+            affected = cls._lock_many(
+                expired.values_list("availability_id", flat=True).distinct()
+            )
+            if not affected:
+                return 0
+            expired = expired.filter(availability_id__in=list(affected))
+            totals = dict(
+                expired.values("availability_id")
+                .annotate(total=Sum("amount"))
+                .order_by()
+                .values_list("availability_id", "total")
+            )
+            removed, _ = expired.delete()
+            cls._settle_holds(totals)
+        return removed
+
+    @classmethod
+    def _settle_holds(cls, totals, reserve=False):
+        """
+        Subtract ``totals`` ({pk: amount}) from ``held`` in one UPDATE, moving
+        the amounts into ``reserved`` when ``reserve`` is set, and recompute
+        ``next_hold_expiry`` and ``next_hold_amount`` from the remaining
+        ledger rows.
+        """
+        ledger = cls.hold_model.objects
+        earliest = (
+            ledger.filter(availability=OuterRef("availability"))
+            .order_by("expires_at")
+            .values("expires_at")[:1]
+        )
+        held = []
+        reserved = []
+        for pk, amount in totals.items():
+            held.append(models.When(pk=pk, held__lt=amount, then=0))
+            held.append(models.When(pk=pk, then=F("held") - amount))
+            reserved.append(models.When(pk=pk, then=F("reserved") + amount))
+        updates = {
+            "held": models.Case(
+                *held, default=F("held"), output_field=models.PositiveIntegerField()
+            ),
+            "next_hold_expiry": Subquery(
+                ledger.filter(availability=OuterRef("pk"))
+                .order_by("expires_at")
+                .values("expires_at")[:1]
+            ),
+            "next_hold_amount": Coalesce(
+                Subquery(
+                    ledger.filter(
+                        availability=OuterRef("pk"), expires_at=Subquery(earliest)
+                    )
+                    .values("availability")
+                    .annotate(total=Sum("amount"))
+                    .values("total")
+                ),
+                0,
+            ),
+            "updated_at": timezone.now(),
+        }
+        if reserve:
+            updates["reserved"] = models.Case(
+                *reserved,
+                default=F("reserved"),
+                output_field=models.PositiveIntegerField(),
+            )
+        cls.objects.filter(pk__in=list(totals)).update(**updates)
+        cls.invalidate_cache(totals)
+
+    def _supports_update_returning(self):
+        if not self.use_update_returning:
+            return False
+        connection = connections[router.db_for_write(type(self))]
+        if connection.vendor == "postgresql":
+            return True
+        # SQLite gained RETURNING in 3.35, the same release Django keys this
+        # feature flag on. MySQL/MariaDB have no UPDATE ... RETURNING.
+        return (
+            connection.vendor == "sqlite"
+            and connection.features.can_return_columns_from_insert
+        )
+
+    def _update_returning(self, assignment, params, condition="", condition_params=()):
+        """
+        Run one ``UPDATE ... RETURNING`` against this row and copy the new
+        ``reserved``/``updated_at`` onto the instance. ``assignment`` and
+        ``condition`` are SQL fragments whose ``{column}`` placeholders are
+        replaced by quoted column names. Returns False when no row matched.
+        """
+        model = self.__class__
+        connection = connections[router.db_for_write(model)]
+        quote = connection.ops.quote_name
+        columns = {
+            name: quote(model._meta.get_field(name).column)
+            for name in ("capacity", "reserved", "on_hold", "held", "updated_at")
+        }
+        now = timezone.now()
+        where = f"{quote(model._meta.pk.column)} = %s"
+        if condition:
+            where = f"{where} AND {condition.format(**columns)}"
+        sql = (
+            f"UPDATE {quote(model._meta.db_table)} "
+            f"SET {assignment.format(**columns)}, {columns['updated_at']} = %s "
+            f"WHERE {where} RETURNING {columns['reserved']}"
+        )
+        updated_at = model._meta.get_field("updated_at").get_db_prep_value(
+            now, connection
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, updated_at, self.pk, *condition_params])
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        self.reserved = row[0]
+        self.updated_at = now
+        return True
+
     def cache_key(self):
         return f"availability:{self.__class__.__name__}:{self.pk}"
 
+    @classmethod
+    def invalidate_cache(cls, pks):
+        """
+        Once the surrounding transaction commits, drop the cached counters for
+        ``pks`` and their row versions, move the availability status report
+        to a new version so cached snapshots and ETags go stale, and publish
+        the new counters to the change feed. The version bump and the publish
+        run once per transaction, for every row invalidated in it.
+        """
+        pks = list(pks)
+        keys = [cls(pk=pk).cache_key() for pk in pks]
+        invalidate_on_commit(keys + [row_version_key(key) for key in keys])
+        merge_on_commit(bump_availability_status_version)
+        merge_on_commit(publish_availability, cls, items=pks)
+
     def save(self, *args, **kwargs):
         result = super().save(*args, **kwargs)
-        cache.delete(self.cache_key())
+        self.invalidate_cache([self.pk])
         return result
 
 
 class QuartersWeekAvailability(BaseAvailability):
+    hold_model = QuartersWeekHold
+    kind = "faction_quarters"
+
     facility_enrollment = models.ForeignKey(
         "enrollment.FacilityEnrollment",
         on_delete=models.CASCADE,
@@ -78,35 +488,152 @@ class QuartersWeekAvailability(BaseAvailability):
 
     class Meta:
         unique_together = ("week", "quarters")
-        indexes = [models.Index(fields=["facility_enrollment", "week"])]
+        indexes = [
+            models.Index(fields=["facility_enrollment", "week"]),
+            models.Index(fields=["updated_at"], name="quarters_week_avail_upd_idx"),
+        ]
 
     @property
     def is_reserved(self):
         return self.reserved >= self.capacity
 
+    @classmethod
+    def invalidate_cache(cls, pks):
+        """
+        Also start a new generation for the facility enrollments of ``pks``,
+        so their cached booking choices go stale with the counters.
+        """
+        pks = list(pks)
+        super().invalidate_cache(pks)
+        bump_generation(
+            FACILITY_ENROLLMENT,
+            *cls.objects.filter(pk__in=pks)
+            .values_list("facility_enrollment_id", flat=True)
+            .distinct(),
+        )
+
+    @classmethod
+    def provision(cls, weeks, quarters) -> int:
+        """
+        Create the missing rows for every (week, quarters) pair in one
+        ``bulk_create`` and return how many were missing. Existing rows are
+        left untouched, including ones inserted concurrently.
+        """
+        weeks = [week for week in weeks if week.pk]
+        quarters = list(quarters)
+        if not weeks or not quarters:
+            return 0
+        existing = set(
+            cls.objects.filter(
+                week_id__in=[week.pk for week in weeks],
+                quarters_id__in=[item.pk for item in quarters],
+            ).values_list("week_id", "quarters_id")
+        )
+        rows = [
+            cls(
+                facility_enrollment_id=week.facility_enrollment_id,
+                week=week,
+                quarters=item,
+                capacity=item.capacity or 0,
+            )
+            for week in weeks
+            for item in quarters
+            if (week.pk, item.pk) not in existing
+        ]
+        if rows:
+            cls.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+            merge_on_commit(bump_availability_status_version)
+            bump_generation(
+                FACILITY_ENROLLMENT, *{row.facility_enrollment_id for row in rows}
+            )
+        return len(rows)
+
+    @classmethod
+    def provision_weeks(cls, weeks) -> int:
+        """Provision rows for the faction quarters of each week's facility."""
+        weeks = [week for week in weeks if week.pk]
+        if not weeks:
+            return 0
+        FacilityEnrollment = apps.get_model("enrollment", "FacilityEnrollment")
+        Quarters = apps.get_model("facility", "Quarters")
+        facilities = dict(
+            FacilityEnrollment.objects.filter(
+                pk__in={week.facility_enrollment_id for week in weeks}
+            ).values_list("pk", "facility_id")
+        )
+        quarters_by_facility = {}
+        for item in Quarters.objects.filter(
+            facility_id__in=set(facilities.values()),
+            type__slug=FACTION_QUARTERS_TYPE,
+        ).only("id", "capacity", "facility_id"):
+            quarters_by_facility.setdefault(item.facility_id, []).append(item)
+        weeks_by_facility = {}
+        for week in weeks:
+            facility_id = facilities.get(week.facility_enrollment_id)
+            weeks_by_facility.setdefault(facility_id, []).append(week)
+        return sum(
+            cls.provision(facility_weeks, quarters_by_facility.get(facility_id, []))
+            for facility_id, facility_weeks in weeks_by_facility.items()
+        )
+
+    @classmethod
+    def provision_week(cls, week) -> int:
+        return cls.provision_weeks([week])
+
+    @classmethod
+    def provision_quarters(cls, quarters):
+        if getattr(quarters.type, "slug", None) != FACTION_QUARTERS_TYPE:
+            return
+        Week = apps.get_model("enrollment", "Week")
+        cls.provision(
+            Week.objects.filter(facility_enrollment__facility_id=quarters.facility_id),
+            [quarters],
+        )
+
     def reserve_full(self):
+        if not self._try_reserve_full() and not (
+            self.expire_holds(pks=[self.pk]) and self._try_reserve_full()
+        ):
+            raise ValidationError(
+                "These quarters are already reserved for the selected week."
+            )
+        self.invalidate_cache([self.pk])
+
+    def _try_reserve_full(self):
+        if self._supports_update_returning():
+            return self._update_returning(
+                "{reserved} = {capacity}", [], "{reserved} < {capacity} AND {held} = 0"
+            )
         with transaction.atomic():
             updated = (
                 QuartersWeekAvailability.objects.select_for_update()
-                .filter(pk=self.pk, reserved__lt=F("capacity"))
+                .filter(pk=self.pk, reserved__lt=F("capacity"), held=0)
                 .update(reserved=F("capacity"), updated_at=timezone.now())
             )
-        if not updated:
-            raise ValidationError(
-                "These quarters are already reserved for the selected week."
-            )
-        cache.delete(self.cache_key())
-        self.refresh_from_db(fields=["reserved", "updated_at"])
+        if updated:
+            self.refresh_from_db(fields=["reserved", "updated_at"])
+        return bool(updated)
+
+    def place_hold(self, amount=None, **kwargs):
+        """Quarters are booked whole, so a hold always covers full capacity."""
+        return super().place_hold(self.capacity, **kwargs)
 
     def release_full(self):
+        if self._supports_update_returning():
+            self._update_returning("{reserved} = 0", [])
+            self.invalidate_cache([self.pk])
+            return
         QuartersWeekAvailability.objects.filter(pk=self.pk).update(
             reserved=0, updated_at=timezone.now()
         )
-        cache.delete(self.cache_key())
+        self.invalidate_cache([self.pk])
         self.refresh_from_db(fields=["reserved", "updated_at"])
 
 
 class FacilityClassAvailability(BaseAvailability):
+    hold_model = FacilityClassHold
+    kind = "class"
+
     facility_class_enrollment = models.OneToOneField(
         "enrollment.FacilityClassEnrollment",
         on_delete=models.CASCADE,
@@ -114,7 +641,10 @@ class FacilityClassAvailability(BaseAvailability):
     )
 
     class Meta:
-        indexes = [models.Index(fields=["facility_class_enrollment"])]
+        indexes = [
+            models.Index(fields=["facility_class_enrollment"]),
+            models.Index(fields=["updated_at"], name="class_avail_updated_idx"),
+        ]
 
     def ensure_capacity(self, capacity):
         if capacity <= 0:
@@ -125,6 +655,30 @@ class FacilityClassAvailability(BaseAvailability):
                 self.reserved = self.capacity
             self.save(update_fields=["capacity", "reserved", "updated_at"])
 
+    @classmethod
+    def provision(cls, offerings) -> int:
+        """
+        Create the missing rows for ``offerings`` in one ``bulk_create`` and
+        return how many were missing.
+        """
+        offerings = [offering for offering in offerings if offering.pk]
+        if not offerings:
+            return 0
+        existing = set(
+            cls.objects.filter(
+                facility_class_enrollment_id__in=[offering.pk for offering in offerings]
+            ).values_list("facility_class_enrollment_id", flat=True)
+        )
+        rows = [
+            cls(facility_class_enrollment=offering, capacity=offering.max_enrollment)
+            for offering in offerings
+            if offering.pk not in existing
+        ]
+        if rows:
+            cls.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+            merge_on_commit(bump_availability_status_version)
+        return len(rows)
+
     @classmethod
     def for_enrollment(cls, enrollment):
         availability, _ = cls.objects.get_or_create(
@@ -136,6 +690,7 @@ class FacilityClassAvailability(BaseAvailability):
 
 
 class FacultyQuartersAvailability(BaseAvailability):
+    kind = "faculty_quarters"
     facility_enrollment = models.ForeignKey(
         "enrollment.FacilityEnrollment",
         on_delete=models.CASCADE,
@@ -149,7 +704,10 @@ class FacultyQuartersAvailability(BaseAvailability):
 
     class Meta:
         unique_together = ("facility_enrollment", "quarters")
-        indexes = [models.Index(fields=["facility_enrollment", "quarters"])]
+        indexes = [
+            models.Index(fields=["facility_enrollment", "quarters"]),
+            models.Index(fields=["updated_at"], name="faculty_quarters_upd_idx"),
+        ]
 
     def reserve_slot(self):
         if self.remaining <= 0:
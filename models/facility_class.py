@@ -8,6 +8,7 @@ from core.mixins import settings as stgs
 from .organization import OrganizationEnrollment
 from .temporal import Period
 from .availability import FacilityClassAvailability
+from ..querysets import FacilityClassEnrollmentQuerySet
 
 
 class FacilityClassEnrollment(
@@ -29,6 +30,8 @@ class FacilityClassEnrollment(
     )
     max_enrollment = models.PositiveIntegerField(default=30)
 
+    objects = FacilityClassEnrollmentQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Facility Class Enrollment"
         verbose_name_plural = "Facility Class Enrollments"
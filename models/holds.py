@@ -0,0 +1,73 @@
+"""Short-lived seat holds placed while a user completes a signup."""
+
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+HOLD_TTL = timedelta(minutes=5)
+
+
+class BaseAvailabilityHold(models.Model):
+    """
+    One ledger entry per hold. The owning availability row keeps the running
+    total in ``held``, the earliest ``expires_at`` in ``next_hold_expiry`` and
+    the amount due then in ``next_hold_amount``, so reads never have to scan
+    the ledger.
+    """
+
+    token = models.UUIDField(default=uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    amount = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.amount} held on {self.availability_id} until {self.expires_at}"
+
+    @property
+    def is_live(self):
+        return self.expires_at > timezone.now()
+
+
+class FacilityClassHold(BaseAvailabilityHold):
+    availability = models.ForeignKey(
+        "enrollment.FacilityClassAvailability",
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["availability", "expires_at"], name="class_hold_expiry_idx"
+            ),
+            models.Index(fields=["expires_at"], name="class_hold_sweep_idx"),
+        ]
+
+
+class QuartersWeekHold(BaseAvailabilityHold):
+    availability = models.ForeignKey(
+        "enrollment.QuartersWeekAvailability",
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["availability", "expires_at"], name="quarters_hold_expiry_idx"
+            ),
+            models.Index(fields=["expires_at"], name="quarters_hold_sweep_idx"),
+        ]
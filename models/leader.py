@@ -1,15 +1,15 @@
 # enrollment/models/leader.py
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
-from django.apps import apps
 
+from .occupancy import FactionQuartersOccupancy, QuartersOccupancyMixin
 from .temporal import AbstractTemporalHierarchy
 
 from ..querysets import LeaderEnrollmentQuerySet
 from enrollment.cache_keys import invalidate_quarters_usage_cache
 
-class LeaderEnrollment(AbstractTemporalHierarchy):
+class LeaderEnrollment(QuartersOccupancyMixin, AbstractTemporalHierarchy):
     """Leader Enrollment Model."""
 
     start = models.DateField(null=True, blank=True)
@@ -55,7 +55,11 @@ class LeaderEnrollment(AbstractTemporalHierarchy):
     def delete(self, *args, **kwargs):
         faction_id = getattr(self.faction_enrollment, "id", None)
         quarters_id = getattr(self.quarters, "id", None)
-        result = super().delete(*args, **kwargs)
+        scope = self._loaded_scope()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if scope:
+                FactionQuartersOccupancy.decrement(*scope)
         invalidate_quarters_usage_cache(faction_id, quarters_id)
         return result
 
@@ -67,41 +71,27 @@ class LeaderEnrollment(AbstractTemporalHierarchy):
             raise ValidationError("Leader enrollments require faction and quarters.")
         capacity = quarters.capacity or 0
         if capacity > 0:
-            AttendeeEnrollment = apps.get_model("enrollment", "AttendeeEnrollment")
-            attendee_count = AttendeeEnrollment.objects.filter(
-                faction_enrollment=faction, quarters=quarters
-            ).count()
-            leader_count = (
-                LeaderEnrollment.objects.filter(
-                    faction_enrollment=faction, quarters=quarters
-                )
-                .exclude(pk=self.pk)
-                .count()
-            )
-            if attendee_count + leader_count >= capacity:
+            if self._occupancy_excluding_self(faction, quarters) >= capacity:
                 raise ValidationError("Selected quarters are already full.")
 
     def save(self, *args, **kwargs):
         """
-        Keep start/end aligned with the faction enrollment and clear quarters cache.
+        Keep start/end aligned with the faction enrollment, maintain the quarters
+        occupancy counter and clear the quarters cache.
         """
-        previous = None
-        if self.pk:
-            previous = (
-                LeaderEnrollment.objects.only("faction_enrollment", "quarters")
-                .get(pk=self.pk)
-            )
+        previous_scope = self._loaded_scope()
         if self.faction_enrollment and not self.start:
             self.start = self.faction_enrollment.start
         if self.faction_enrollment and not self.end:
             self.end = self.faction_enrollment.end
 
-        result = super().save(*args, **kwargs)
-        if previous:
-            invalidate_quarters_usage_cache(
-                getattr(previous, "faction_enrollment_id", None),
-                getattr(previous, "quarters_id", None),
-            )
+        with transaction.atomic():
+            self._seed_occupancy(previous_scope)
+            result = super().save(*args, **kwargs)
+            self._sync_occupancy(previous_scope)
+        self._original_scope = self._occupancy_scope()
+        if previous_scope:
+            invalidate_quarters_usage_cache(*previous_scope)
         invalidate_quarters_usage_cache(
             getattr(self.faction_enrollment, "id", None),
             getattr(self.quarters, "id", None),
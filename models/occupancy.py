@@ -0,0 +1,186 @@
+"""Faction quarters occupancy counters."""
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class FactionQuartersOccupancy(models.Model):
+    """
+    Persisted attendee + leader headcount for a faction enrollment's quarters.
+
+    Counters are seeded from the enrollment tables the first time a scope is
+    touched and then maintained with conditional UPDATEs, mirroring
+    ``BaseAvailability.reserve``, so capacity checks are a single indexed read.
+    """
+
+    faction_enrollment = models.ForeignKey(
+        "enrollment.FactionEnrollment",
+        on_delete=models.CASCADE,
+        related_name="quarters_occupancy",
+    )
+    quarters = models.ForeignKey(
+        "facility.Quarters",
+        on_delete=models.CASCADE,
+        related_name="faction_occupancy",
+    )
+    occupied = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("faction_enrollment", "quarters")
+        indexes = [models.Index(fields=["updated_at"], name="faction_occupancy_upd_idx")]
+
+    def __str__(self):
+        return f"{self.faction_enrollment_id}/{self.quarters_id}: {self.occupied}"
+
+    @staticmethod
+    def count_scope(faction_enrollment_id, quarters_id) -> int:
+        AttendeeEnrollment = apps.get_model("enrollment", "AttendeeEnrollment")
+        LeaderEnrollment = apps.get_model("enrollment", "LeaderEnrollment")
+        lookup = {
+            "faction_enrollment_id": faction_enrollment_id,
+            "quarters_id": quarters_id,
+        }
+        return (
+            AttendeeEnrollment.objects.filter(**lookup).count()
+            + LeaderEnrollment.objects.filter(**lookup).count()
+        )
+
+    @classmethod
+    def ensure_scope(cls, faction_enrollment_id, quarters_id, lock=False):
+        """
+        Return the counter row for a scope, seeding it on first use. The seed
+        counts the rows already in the scope, so seed before inserting into it.
+        With ``lock`` the row is locked until the surrounding transaction ends.
+        """
+        lookup = {
+            "faction_enrollment_id": faction_enrollment_id,
+            "quarters_id": quarters_id,
+        }
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        row = queryset.filter(**lookup).first()
+        if row is not None:
+            return row
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    occupied=cls.count_scope(faction_enrollment_id, quarters_id),
+                    **lookup,
+                )
+        except IntegrityError:
+            return queryset.get(**lookup)
+
+    @classmethod
+    def occupied_for(cls, faction_enrollment_id, quarters_id) -> int:
+        return cls.ensure_scope(faction_enrollment_id, quarters_id).occupied
+
+    @classmethod
+    def peek(cls, faction_enrollment_id, quarters_id) -> int:
+        """Read a scope's headcount without seeding a counter row."""
+        occupied = (
+            cls.objects.filter(
+                faction_enrollment_id=faction_enrollment_id, quarters_id=quarters_id
+            )
+            .values_list("occupied", flat=True)
+            .first()
+        )
+        if occupied is None:
+            return cls.count_scope(faction_enrollment_id, quarters_id)
+        return occupied
+
+    @classmethod
+    def increment(cls, faction_enrollment_id, quarters_id, capacity, amount=1):
+        """
+        Atomically add ``amount`` occupants, refusing to exceed ``capacity``.
+        A capacity of zero means the quarters are not capacity-limited.
+        """
+        if amount <= 0:
+            return
+        row = cls.ensure_scope(faction_enrollment_id, quarters_id)
+        queryset = cls.objects.filter(pk=row.pk)
+        if capacity and capacity > 0:
+            queryset = queryset.filter(occupied__lte=capacity - amount)
+        updated = queryset.update(
+            occupied=F("occupied") + amount, updated_at=timezone.now()
+        )
+        if not updated:
+            raise ValidationError("Selected quarters are already full.")
+
+    @classmethod
+    def decrement(cls, faction_enrollment_id, quarters_id, amount=1):
+        if amount <= 0 or not faction_enrollment_id or not quarters_id:
+            return
+        cls.objects.filter(
+            faction_enrollment_id=faction_enrollment_id, quarters_id=quarters_id
+        ).update(
+            occupied=models.Case(
+                models.When(occupied__lt=amount, then=0),
+                default=F("occupied") - amount,
+                output_field=models.PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+class QuartersOccupancyMixin:
+    """
+    Keeps ``FactionQuartersOccupancy`` in step with attendee/leader enrollments.
+
+    The scope an instance was loaded with is remembered so moves can be
+    detected without re-reading the row.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_scope = instance._occupancy_scope()
+        return instance
+
+    def _occupancy_scope(self):
+        faction_enrollment_id = self.__dict__.get("faction_enrollment_id")
+        quarters_id = self.__dict__.get("quarters_id")
+        if not faction_enrollment_id or not quarters_id:
+            return None
+        return (faction_enrollment_id, quarters_id)
+
+    def _loaded_scope(self):
+        if not self.pk:
+            return None
+        if hasattr(self, "_original_scope"):
+            return self._original_scope
+        previous = (
+            type(self)
+            .objects.filter(pk=self.pk)
+            .values_list("faction_enrollment_id", "quarters_id")
+            .first()
+        )
+        return tuple(previous) if previous else None
+
+    def _occupancy_excluding_self(self, faction_enrollment, quarters) -> int:
+        occupied = FactionQuartersOccupancy.peek(faction_enrollment.pk, quarters.pk)
+        if self.pk and self._loaded_scope() == (faction_enrollment.pk, quarters.pk):
+            occupied -= 1
+        return max(occupied, 0)
+
+    def _seed_occupancy(self, previous_scope):
+        """
+        Seed and lock the counter of the scope being entered before the row is
+        written, so the seed does not already include this enrollment.
+        """
+        scope = self._occupancy_scope()
+        if scope and scope != previous_scope:
+            FactionQuartersOccupancy.ensure_scope(*scope, lock=True)
+
+    def _sync_occupancy(self, previous_scope):
+        scope = self._occupancy_scope()
+        if scope == previous_scope:
+            return
+        if scope:
+            FactionQuartersOccupancy.increment(
+                *scope, capacity=getattr(self.quarters, "capacity", 0) or 0
+            )
+        if previous_scope:
+            FactionQuartersOccupancy.decrement(*previous_scope)
@@ -0,0 +1,67 @@
+# enrollment/models/preference.py
+
+from django.db import models
+
+
+class ClassPreference(models.Model):
+    """Class Preference Model.
+
+    A ranked class request an attendee submits for a period ahead of the class
+    lottery. Rank 1 is the attendee's first choice.
+    """
+
+    attendee = models.ForeignKey(
+        "faction.AttendeeProfile",
+        on_delete=models.CASCADE,
+        related_name="class_preferences",
+        verbose_name="Attendee",
+    )
+    attendee_enrollment = models.ForeignKey(
+        "enrollment.AttendeeEnrollment",
+        on_delete=models.CASCADE,
+        related_name="class_preferences",
+        verbose_name="Attendee Enrollment",
+        null=True,
+        blank=True,
+    )
+    period = models.ForeignKey(
+        "enrollment.Period",
+        on_delete=models.CASCADE,
+        related_name="class_preferences",
+        verbose_name="Period",
+    )
+    facility_class_enrollment = models.ForeignKey(
+        "enrollment.FacilityClassEnrollment",
+        on_delete=models.CASCADE,
+        related_name="preferences",
+        verbose_name="Facility Class Enrollment",
+    )
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = "Class Preference"
+        verbose_name_plural = "Class Preferences"
+        ordering = ["period", "attendee", "rank"]
+        indexes = [
+            models.Index(
+                fields=["period", "attendee", "rank"],
+                name="class_pref_period_rank_idx",
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["attendee", "period", "rank"],
+                name="unique_class_preference_rank",
+            ),
+            models.UniqueConstraint(
+                fields=["attendee", "facility_class_enrollment"],
+                name="unique_class_preference_offering",
+            ),
+        ]
+
+    def __str__(self):
+        """String representation."""
+        return f"{self.attendee} - #{self.rank} {self.facility_class_enrollment}"
@@ -6,6 +6,10 @@ from django.core.exceptions import ValidationError
 
 from core.mixins import models as mixins
 
+from .availability import QuartersWeekAvailability
+from ..cache_keys import FACILITY_ENROLLMENT, PERIOD_TIMES, bump_generation
+from ..querysets import WeekQuerySet
+
 
 class AbstractTemporalHierarchy(
     mixins.NameDescriptionMixin,
@@ -59,6 +63,8 @@ class Week(AbstractTemporalHierarchy):
 
     context_field = "facility_enrollment"
 
+    objects = WeekQuerySet.as_manager()
+
     class Meta:
         """Metadata."""
 
@@ -67,6 +73,21 @@ class Week(AbstractTemporalHierarchy):
         ordering = ["start"]
         unique_together = ("slug", "facility_enrollment")
 
+    def save(self, *args, **kwargs):
+        """Save the week and provision its faction quarters availability."""
+        created = self._state.adding
+        result = super().save(*args, **kwargs)
+        if created:
+            QuartersWeekAvailability.provision_week(self)
+        bump_generation(FACILITY_ENROLLMENT, self.facility_enrollment_id)
+        return result
+
+    def delete(self, *args, **kwargs):
+        facility_enrollment_id = self.facility_enrollment_id
+        result = super().delete(*args, **kwargs)
+        bump_generation(FACILITY_ENROLLMENT, facility_enrollment_id)
+        return result
+
     def get_periods(self):
         """Return all periods associated with this week."""
         return self.periods.all()
@@ -99,6 +120,31 @@ class Period(AbstractTemporalHierarchy):
         ordering = ["start"]
         unique_together = ("slug", "week")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save that moves the period can retire the cached
+        # period indexes of the attendees booked into it.
+        instance._original_slot = instance._slot()
+        return instance
+
+    def _slot(self):
+        return tuple(self.__dict__.get(name) for name in ("week_id", "start", "end"))
+
+    def save(self, *args, **kwargs):
+        """Save the period, retiring cached period indexes if its times moved."""
+        moved = getattr(self, "_original_slot", None) not in (None, self._slot())
+        result = super().save(*args, **kwargs)
+        if moved:
+            bump_generation(*PERIOD_TIMES)
+        self._original_slot = self._slot()
+        return result
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_generation(*PERIOD_TIMES)
+        return result
+
     def __str__(self):
         """String representation."""
         return f"Period: {self.name} ({self.start} - {self.end})"
@@ -5,6 +5,11 @@ from __future__ import annotations
 from pages.querysets import AbstractBaseQuerySet
 from django.db import models
 
+from enrollment.models.availability import (
+    FacilityClassAvailability,
+    QuartersWeekAvailability,
+)
+
 
 class LeaderEnrollmentQuerySet(AbstractBaseQuerySet):
     def by_faction_enrollment(self, faction_enrollment_id) -> "LeaderEnrollmentQuerySet":
@@ -93,3 +98,57 @@ class FacultyEnrollmentQuerySet(AbstractBaseQuerySet):
             "facility_enrollment__facility_classes__name",
             "facility_enrollment__facility_classes__id",
         )
+
+
+def _inserted_rows(model, objs, key_fields):
+    """
+    ``objs`` after a ``bulk_create``, with a pk. Backends that return no pks
+    (MySQL, or any backend with ``ignore_conflicts=True``) leave them unset,
+    so those rows are read back by ``key_fields``.
+    """
+    saved = [obj for obj in objs if obj.pk is not None]
+    keys = {
+        tuple(getattr(obj, field) for field in key_fields)
+        for obj in objs
+        if obj.pk is None
+    }
+    if not keys:
+        return saved
+    candidates = model._base_manager.filter(
+        **{
+            f"{field}__in": {key[index] for key in keys}
+            for index, field in enumerate(key_fields)
+        }
+    )
+    saved.extend(
+        row
+        for row in candidates
+        if tuple(getattr(row, field) for field in key_fields) in keys
+    )
+    return saved
+
+
+class WeekQuerySet(AbstractBaseQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk insert weeks and provision their faction quarters rows."""
+        weeks = super().bulk_create(objs, *args, **kwargs)
+        QuartersWeekAvailability.provision_weeks(
+            _inserted_rows(
+                self.model, weeks, ("facility_enrollment_id", "name", "start", "end")
+            )
+        )
+        return weeks
+
+
+class FacilityClassEnrollmentQuerySet(AbstractBaseQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk insert offerings and provision their availability rows."""
+        offerings = super().bulk_create(objs, *args, **kwargs)
+        FacilityClassAvailability.provision(
+            _inserted_rows(
+                self.model,
+                offerings,
+                ("facility_class_id", "period_id", "department_id"),
+            )
+        )
+        return offerings
@@ -1,6 +1,17 @@
 from django.shortcuts import get_object_or_404
 
+from core.cache import cached
+from enrollment.cache_keys import (
+    FACILITY_ENROLLMENT,
+    booking_choices_cache_key,
+    generation,
+)
+from enrollment.counters import COUNTER_FIELDS, live_held, remaining_seats
 from enrollment.models.attendee import AttendeeEnrollment
+from enrollment.models.availability import (
+    FACTION_QUARTERS_TYPE,
+    QuartersWeekAvailability,
+)
 from enrollment.models.facility import FacilityEnrollment
 from enrollment.models.faction import FactionEnrollment
 from enrollment.models.leader import LeaderEnrollment
@@ -13,6 +24,10 @@ from facility.models.faculty import FacultyProfile
 from facility.models.quarters import Quarters, QuartersType
 from facility.tables.faculty import FacultyTable
 
+# Choices are keyed by version, so the TTL only bounds how long unused
+# entries linger.
+BOOKING_CHOICES_TTL = 600
+
 
 def weeks_for_facility_enrollment(facility_enrollment):
     return Week.objects.filter(facility_enrollment=facility_enrollment)
@@ -37,7 +52,7 @@ def faction_enrollments_for_week(week):
 
 
 def available_faction_quarters_for_week(*, week_id, facility_enrollment):
-    faction_quarters_type = QuartersType.objects.get(slug="faction")
+    faction_quarters_type = QuartersType.objects.get(slug=FACTION_QUARTERS_TYPE)
     used_quarters = FactionEnrollment.objects.filter(
         week_id=week_id,
         week__facility_enrollment=facility_enrollment,
@@ -48,6 +63,80 @@ def available_faction_quarters_for_week(*, week_id, facility_enrollment):
     ).exclude(id__in=used_quarters)
 
 
+def faction_booking_choices(facility_enrollment_id):
+    """
+    Weeks of a facility enrollment, each with the faction quarters still open
+    that week and their remaining capacity, read in five queries.
+
+    Quarters are booked whole, so quarters are open when no faction holds
+    them for the week and their availability row shows no reservation, staff
+    hold or pending signup hold.
+    """
+    facility_id = (
+        FacilityEnrollment.objects.filter(pk=facility_enrollment_id)
+        .values_list("facility_id", flat=True)
+        .first()
+    )
+    if facility_id is None:
+        return None
+    weeks = list(
+        weeks_for_facility_enrollment_id(facility_enrollment_id)
+        .order_by("start", "pk")
+        .values("id", "name", "start", "end")
+    )
+    quarters = list(
+        Quarters.objects.filter(
+            facility_id=facility_id, type__slug=FACTION_QUARTERS_TYPE
+        )
+        .order_by("name", "pk")
+        .values("id", "name", "capacity")
+    )
+    used = set(
+        FactionEnrollment.objects.filter(
+            week__facility_enrollment_id=facility_enrollment_id
+        ).values_list("week_id", "quarters_id")
+    )
+    remaining = {}
+    rows = QuartersWeekAvailability.objects.filter(
+        facility_enrollment_id=facility_enrollment_id
+    ).values_list("week_id", "quarters_id", *COUNTER_FIELDS)
+    for week_id, quarters_id, *counters in rows:
+        counters = dict(zip(COUNTER_FIELDS, counters))
+        booked = counters["reserved"] or live_held(
+            counters["held"],
+            counters["next_hold_expiry"],
+            counters["next_hold_amount"],
+        )
+        remaining[(week_id, quarters_id)] = (
+            0 if booked else remaining_seats(**counters)
+        )
+    for week in weeks:
+        week["quarters"] = []
+        for item in quarters:
+            key = (week["id"], item["id"])
+            left = remaining.get(key, item["capacity"] or 0)
+            if key in used or not left:
+                continue
+            week["quarters"].append({**item, "remaining": left})
+    return {"facility_enrollment": facility_enrollment_id, "weeks": weeks}
+
+
+def cached_faction_booking_choices(facility_enrollment_id):
+    """
+    ``faction_booking_choices`` cached under the facility enrollment's
+    generation, which its week, faction enrollment, quarters and quarters
+    availability writes bump, so writes elsewhere leave the entry valid.
+    Returns ``(version, choices)``.
+    """
+    version = generation(FACILITY_ENROLLMENT, facility_enrollment_id)
+    choices = cached(
+        booking_choices_cache_key(version, facility_enrollment_id),
+        ttl=BOOKING_CHOICES_TTL,
+        producer=lambda: faction_booking_choices(facility_enrollment_id),
+    )
+    return version, choices
+
+
 def week_manage_tables_config(week):
     return {
         "periods": {
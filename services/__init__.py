@@ -1,9 +1,15 @@
 from .scheduling import SchedulingService
 from .class_assignments import ClassAssignmentSchedulingMixin
+from .bulk import BulkAttendeeSchedulingMixin, BulkScheduleResult
 from .enrollment import ActiveEnrollmentService
+from .provisioning import ProvisioningResult, provision_facility_enrollment
 
 __all__ = [
     "SchedulingService",
     "ClassAssignmentSchedulingMixin",
+    "BulkAttendeeSchedulingMixin",
+    "BulkScheduleResult",
     "ActiveEnrollmentService",
+    "ProvisioningResult",
+    "provision_facility_enrollment",
 ]
@@ -0,0 +1,159 @@
+"""
+Buffered sink for scheduling audit events.
+
+``SchedulingService._log`` hands events to ``scheduling_events`` instead of
+writing them inline:
+
+* Inside a transaction, events are collected per savepoint level and each
+  batch is queued with a single ``transaction.on_commit`` hook. A batch only
+  reaches the buffer if the transaction, and every savepoint around it,
+  commits. Events for rolled-back work are dropped.
+* Inside a ``deferred_events()`` block, the buffer is written in one batch
+  when the outermost block exits or when it reaches ``FLUSH_SIZE``.
+  Outside such a block, committed events are written straight away.
+* With ``start_background_writer()``, batches are handed to a daemon thread
+  instead of being written on the calling thread. The thread closes its
+  database connection after each batch.
+"""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import close_old_connections, transaction
+
+from core.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 500
+
+
+class SchedulingEventSink:
+    def __init__(self, flush_size=FLUSH_SIZE):
+        self.flush_size = flush_size
+        self._local = threading.local()
+        self._queue = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def record(self, name, actor_id=None, extra=None):
+        event = (name, actor_id, extra or {})
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            self._pending(connection).append(event)
+        else:
+            self._committed([event])
+
+    def _pending(self, connection):
+        """
+        Events recorded at the connection's current savepoint level, flushed
+        by one ``on_commit`` hook. Django discards the hook if the savepoint
+        or the transaction rolls back and swaps in a new hook list when it
+        does, so a batch is reused only while the list it was registered in
+        is still current.
+        """
+        batches = self._local.__dict__.setdefault("batches", {})
+        hooks = connection.run_on_commit
+        key = (connection.alias, tuple(connection.savepoint_ids))
+        batch = batches.get(key)
+        if batch is None or batch[0] is not hooks:
+            for stale in [
+                other
+                for other, (registered_in, _) in batches.items()
+                if other[0] == connection.alias and registered_in is not hooks
+            ]:
+                del batches[stale]
+            batch = batches[key] = (hooks, [])
+            transaction.on_commit(
+                partial(self._committed, batch[1], key), using=connection.alias
+            )
+        return batch[1]
+
+    def _committed(self, batch, key=None):
+        batches = getattr(self._local, "batches", {})
+        if key in batches and batches[key][1] is batch:
+            del batches[key]
+        events = self._events()
+        events.extend(batch)
+        if not self._depth() or len(events) >= self.flush_size:
+            self.flush()
+
+    @contextmanager
+    def deferred(self):
+        """Hold committed events until the outermost block exits."""
+        self._local.depth = self._depth() + 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if not self._local.depth:
+                self.flush()
+
+    def flush(self):
+        batch = self._events()
+        if not batch:
+            return
+        self._local.events = []
+        if self._queue is not None:
+            self._queue.put(batch)
+        else:
+            write_events(batch)
+
+    def start_background_writer(self):
+        """Write batches on a daemon thread from now on. Safe to call twice."""
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(
+                target=self._drain,
+                name="scheduling-audit-writer",
+                daemon=True,
+            )
+            self._writer.start()
+
+    def stop_background_writer(self, timeout=None):
+        """Write everything queued so far, then go back to inline writes."""
+        with self._lock:
+            if self._writer is None:
+                return
+            writer, pending = self._writer, self._queue
+            self._writer = self._queue = None
+        pending.put(None)
+        writer.join(timeout)
+
+    def _drain(self):
+        pending = self._queue
+        while True:
+            batch = pending.get()
+            if batch is None:
+                return
+            try:
+                write_events(batch)
+            except Exception:  # noqa: BLE001 - keep the writer alive
+                logger.exception("Failed to write %s scheduling event(s).", len(batch))
+            finally:
+                close_old_connections()
+
+    def _events(self):
+        if not hasattr(self._local, "events"):
+            self._local.events = []
+        return self._local.events
+
+    def _depth(self):
+        return getattr(self._local, "depth", 0)
+
+
+def write_events(batch):
+    for name, actor_id, extra in batch:
+        log_event(name, actor_id=actor_id, extra=extra)
+
+
+scheduling_events = SchedulingEventSink()
+
+
+def deferred_events():
+    return scheduling_events.deferred()
@@ -1,14 +1,39 @@
+"""
+Availability health report for the staff dashboard.
+
+Expected counts and availability rows are read with a handful of grouped
+``.values()`` queries per resource kind and matched in memory. Labels are
+only resolved, in one query per kind, for rows that end up in the report.
+"""
+
 from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from enrollment.cache_keys import (
+    availability_status_cache_key,
+    availability_status_version,
+)
+from enrollment.counters import COUNTER_FIELDS, live_held, remaining_seats
 
-from enrollment.models.attendee_class import AttendeeClassEnrollment
 from enrollment.models.availability import (
-    FacilityClassAvailability,
     FacultyQuartersAvailability,
     QuartersWeekAvailability,
 )
 from enrollment.models.faction import FactionEnrollment
+from enrollment.models.facility import FacilityEnrollment
 from enrollment.models.facility_class import FacilityClassEnrollment
 from enrollment.models.faculty import FacultyEnrollment
+from facility.models.quarters import Quarters
+
+SNAPSHOT_FIELDS = COUNTER_FIELDS
+# Snapshots are keyed by version, so the TTL only bounds how long an unused
+# one lingers in the cache.
+STATUS_SNAPSHOT_TTL = 600
 
 
 @dataclass
@@ -20,14 +45,93 @@ class AvailabilityIssue:
     actual: str
 
 
-def build_availability_status():
+@dataclass
+class AvailabilitySnapshot:
+    """The counter columns of an availability row, read via ``.values()``."""
+
+    pk: int
+    capacity: int
+    reserved: int
+    on_hold: int
+    held: int
+    next_hold_expiry: Optional[datetime]
+    next_hold_amount: int
+
+    @property
+    def live_held(self):
+        return live_held(self.held, self.next_hold_expiry, self.next_hold_amount)
+
+    @property
+    def remaining(self):
+        return remaining_seats(
+            **{field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+        )
+
+
+@dataclass
+class AvailabilityStatusSnapshot:
+    """A cached ``build_availability_status`` result and the version it reflects."""
+
+    version: int
+    built_at: datetime
+    status: dict
+
+
+def peek_availability_status(
+    version, facility_enrollment_id=None, organization_enrollment_id=None
+):
+    """Return the cached snapshot for ``version`` and scope, or None."""
+    return cache.get(
+        availability_status_cache_key(
+            version, facility_enrollment_id, organization_enrollment_id
+        )
+    )
+
+
+def cached_availability_status(facility_enrollment=None, organization_enrollment=None):
+    """
+    Return an ``AvailabilityStatusSnapshot`` for the scope, building and
+    caching it when the current version has none yet. Availability writes and
+    ``SchedulingService`` bump the version on commit, which retires every
+    snapshot at once.
+    """
+    version = availability_status_version()
+    key = availability_status_cache_key(
+        version,
+        getattr(facility_enrollment, "pk", facility_enrollment),
+        getattr(organization_enrollment, "pk", organization_enrollment),
+    )
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = AvailabilityStatusSnapshot(
+            version=version,
+            built_at=timezone.now(),
+            status=build_availability_status(
+                facility_enrollment=facility_enrollment,
+                organization_enrollment=organization_enrollment,
+            ),
+        )
+        cache.set(key, snapshot, STATUS_SNAPSHOT_TTL)
+    return snapshot
+
+
+def build_availability_status(facility_enrollment=None, organization_enrollment=None):
     issues = []
     holds = []
     full = []
 
-    _collect_faction_quarters(issues, holds, full)
-    _collect_faculty_quarters(issues, holds, full)
-    _collect_class_availability(issues, holds, full)
+    scope = {}
+    class_scope = {}
+    if facility_enrollment is not None:
+        scope["facility_enrollment"] = facility_enrollment
+        class_scope["facility_class__facility_enrollment"] = facility_enrollment
+    if organization_enrollment is not None:
+        scope["facility_enrollment__organization_enrollment"] = organization_enrollment
+        class_scope["organization_enrollment"] = organization_enrollment
+
+    _collect_faction_quarters(issues, holds, full, scope)
+    _collect_faculty_quarters(issues, holds, full, scope)
+    _collect_class_availability(issues, holds, full, class_scope)
 
     return {
         "issues": issues,
@@ -41,35 +145,75 @@ def build_availability_status():
     }
 
 
-def _collect_faction_quarters(issues, holds, full):
-    expected = {
-        (
-            enrollment.facility_enrollment_id,
-            enrollment.week_id,
-            enrollment.quarters_id,
-        ): enrollment
-        for enrollment in FactionEnrollment.objects.select_related(
-            "facility_enrollment__facility", "week", "quarters", "faction"
+def iter_availability_status(facility_enrollment=None, organization_enrollment=None):
+    """
+    Yield the report one facility enrollment at a time, in pk order.
+
+    Each batch has the shape returned by ``build_availability_status`` for a
+    single facility enrollment, so streaming exports hold one facility's rows
+    in memory at a time and can send their first bytes before any query runs.
+    """
+    if facility_enrollment is not None:
+        yield build_availability_status(
+            facility_enrollment=facility_enrollment,
+            organization_enrollment=organization_enrollment,
         )
-    }
-    for key, enrollment in expected.items():
-        label = (
-            f"{enrollment.faction} / {enrollment.week} / {enrollment.quarters}"
+        return
+    facility_enrollments = FacilityEnrollment.objects.order_by("pk")
+    if organization_enrollment is not None:
+        facility_enrollments = facility_enrollments.filter(
+            organization_enrollment=organization_enrollment
         )
-        try:
-            availability = QuartersWeekAvailability.objects.get(
-                facility_enrollment_id=key[0],
-                week_id=key[1],
-                quarters_id=key[2],
-            )
-        except QuartersWeekAvailability.DoesNotExist:
+    for facility_enrollment_id in list(
+        facility_enrollments.values_list("pk", flat=True)
+    ):
+        yield build_availability_status(
+            facility_enrollment=facility_enrollment_id,
+            organization_enrollment=organization_enrollment,
+        )
+
+
+def _collect_faction_quarters(issues, holds, full, scope):
+    pending = {}
+    expected = {}
+    enrollments = (
+        FactionEnrollment.objects.filter(**scope)
+        .values_list(
+            "id",
+            "facility_enrollment_id",
+            "week_id",
+            "quarters_id",
+            "quarters__capacity",
+        )
+        .order_by("id")
+    )
+    for enrollment_id, facility_enrollment_id, week_id, quarters_id, capacity in (
+        enrollments.iterator()
+    ):
+        expected[(facility_enrollment_id, week_id, quarters_id)] = (
+            enrollment_id,
+            capacity,
+        )
+    rows = _availability_rows(
+        QuartersWeekAvailability.objects.filter(**scope),
+        ("facility_enrollment_id", "week_id", "quarters_id"),
+    )
+
+    for key, (enrollment_id, capacity) in expected.items():
+        ref = ("enrollment", enrollment_id)
+        availability = rows.get(key)
+        if availability is None:
             issues.append(
-                AvailabilityIssue(
-                    "faction_quarters",
-                    label,
-                    "critical",
-                    f"reserved={enrollment.quarters.capacity}",
-                    "missing availability row",
+                _label_later(
+                    pending,
+                    ref,
+                    AvailabilityIssue(
+                        "faction_quarters",
+                        "",
+                        "critical",
+                        f"reserved={capacity}",
+                        "missing availability row",
+                    ),
                 )
             )
             continue
@@ -77,59 +221,77 @@ def _collect_faction_quarters(issues, holds, full):
             issues,
             holds,
             full,
+            pending,
             "faction_quarters",
-            label,
+            ref,
             availability,
-            expected_reserved=enrollment.quarters.capacity,
-            expected_capacity=enrollment.quarters.capacity,
+            expected_reserved=capacity,
+            expected_capacity=capacity,
         )
 
-    for availability in QuartersWeekAvailability.objects.exclude(reserved=0):
-        key = (
-            availability.facility_enrollment_id,
-            availability.week_id,
-            availability.quarters_id,
-        )
-        if key not in expected:
+    for key, availability in rows.items():
+        if availability.reserved and key not in expected:
             issues.append(
-                AvailabilityIssue(
-                    "faction_quarters",
-                    str(availability.quarters),
-                    "warning",
-                    "reserved=0",
-                    f"reserved={availability.reserved}",
+                _label_later(
+                    pending,
+                    ("quarters", key[2]),
+                    AvailabilityIssue(
+                        "faction_quarters",
+                        "",
+                        "warning",
+                        "reserved=0",
+                        f"reserved={availability.reserved}",
+                    ),
                 )
             )
 
-
-def _collect_faculty_quarters(issues, holds, full):
-    expected = {}
     labels = {}
-    for enrollment in FacultyEnrollment.objects.select_related(
-        "facility_enrollment__facility", "quarters", "faculty__user"
-    ):
-        key = (enrollment.facility_enrollment_id, enrollment.quarters_id)
-        expected.setdefault(
-            key,
-            {"reserved": 0, "capacity": enrollment.quarters.capacity or 1},
+    enrollment_ids = [ref[1] for ref in pending if ref[0] == "enrollment"]
+    for enrollment in FactionEnrollment.objects.filter(
+        pk__in=enrollment_ids
+    ).select_related("week", "quarters", "faction"):
+        labels[("enrollment", enrollment.pk)] = (
+            f"{enrollment.faction} / {enrollment.week} / {enrollment.quarters}"
         )
-        expected[key]["reserved"] += 1
-        labels[key] = f"{enrollment.facility_enrollment.facility} / {enrollment.quarters}"
+    labels.update(_quarters_labels(pending))
+    _apply_labels(pending, labels)
+
+
+def _collect_faculty_quarters(issues, holds, full, scope):
+    pending = {}
+    expected = {}
+    grouped = (
+        FacultyEnrollment.objects.filter(**scope)
+        .values("facility_enrollment_id", "quarters_id", "quarters__capacity")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for row in grouped.iterator():
+        key = (row["facility_enrollment_id"], row["quarters_id"])
+        expected[key] = {
+            "reserved": row["total"],
+            "capacity": row["quarters__capacity"] or 1,
+        }
+    rows = _availability_rows(
+        FacultyQuartersAvailability.objects.filter(**scope),
+        ("facility_enrollment_id", "quarters_id"),
+    )
 
     for key, values in expected.items():
-        try:
-            availability = FacultyQuartersAvailability.objects.get(
-                facility_enrollment_id=key[0],
-                quarters_id=key[1],
-            )
-        except FacultyQuartersAvailability.DoesNotExist:
+        ref = ("faculty", key)
+        availability = rows.get(key)
+        if availability is None:
             issues.append(
-                AvailabilityIssue(
-                    "faculty_quarters",
-                    labels[key],
-                    "critical",
-                    str(values),
-                    "missing availability row",
+                _label_later(
+                    pending,
+                    ref,
+                    AvailabilityIssue(
+                        "faculty_quarters",
+                        "",
+                        "critical",
+                        str(values),
+                        "missing availability row",
+                    ),
                 )
             )
             continue
@@ -137,69 +299,120 @@ def _collect_faculty_quarters(issues, holds, full):
             issues,
             holds,
             full,
+            pending,
             "faculty_quarters",
-            labels[key],
+            ref,
             availability,
             expected_reserved=values["reserved"],
             expected_capacity=values["capacity"],
         )
 
-    for availability in FacultyQuartersAvailability.objects.exclude(reserved=0):
-        key = (availability.facility_enrollment_id, availability.quarters_id)
-        if key not in expected:
+    for key, availability in rows.items():
+        if availability.reserved and key not in expected:
             issues.append(
-                AvailabilityIssue(
-                    "faculty_quarters",
-                    str(availability.quarters),
-                    "warning",
-                    "reserved=0",
-                    f"reserved={availability.reserved}",
+                _label_later(
+                    pending,
+                    ("quarters", key[1]),
+                    AvailabilityIssue(
+                        "faculty_quarters",
+                        "",
+                        "warning",
+                        "reserved=0",
+                        f"reserved={availability.reserved}",
+                    ),
                 )
             )
 
+    faculty_keys = [ref[1] for ref in pending if ref[0] == "faculty"]
+    facility_enrollments = FacilityEnrollment.objects.select_related(
+        "facility"
+    ).in_bulk({key[0] for key in faculty_keys})
+    quarters = Quarters.objects.in_bulk({key[1] for key in faculty_keys})
+    labels = {
+        ("faculty", key): (
+            f"{facility_enrollments[key[0]].facility} / {quarters[key[1]]}"
+        )
+        for key in faculty_keys
+        if key[0] in facility_enrollments and key[1] in quarters
+    }
+    labels.update(_quarters_labels(pending))
+    _apply_labels(pending, labels)
+
 
-def _collect_class_availability(issues, holds, full):
-    schedules = FacilityClassEnrollment.objects.select_related(
-        "facility_class", "period", "department"
+def _collect_class_availability(issues, holds, full, scope):
+    pending = {}
+    offerings = (
+        FacilityClassEnrollment.objects.filter(**scope)
+        .values(
+            "id",
+            "max_enrollment",
+            "availability__id",
+            *(f"availability__{field}" for field in SNAPSHOT_FIELDS),
+        )
+        .annotate(expected_reserved=Count("attendee_class_enrollments"))
+        .order_by("id")
     )
-    for schedule in schedules:
-        label = str(schedule)
-        expected_reserved = AttendeeClassEnrollment.objects.filter(
-            facility_class_enrollment=schedule
-        ).count()
-        try:
-            availability = FacilityClassAvailability.objects.get(
-                facility_class_enrollment=schedule
-            )
-        except FacilityClassAvailability.DoesNotExist:
+    for row in offerings.iterator():
+        ref = ("offering", row["id"])
+        expected_reserved = row["expected_reserved"]
+        if row["availability__id"] is None:
             issues.append(
-                AvailabilityIssue(
-                    "class",
-                    label,
-                    "critical",
-                    f"reserved={expected_reserved}, capacity={schedule.max_enrollment}",
-                    "missing availability row",
+                _label_later(
+                    pending,
+                    ref,
+                    AvailabilityIssue(
+                        "class",
+                        "",
+                        "critical",
+                        f"reserved={expected_reserved}, "
+                        f"capacity={row['max_enrollment']}",
+                        "missing availability row",
+                    ),
                 )
             )
             continue
+        availability = AvailabilitySnapshot(
+            pk=row["availability__id"],
+            **{field: row[f"availability__{field}"] for field in SNAPSHOT_FIELDS},
+        )
         _track_common(
             issues,
             holds,
             full,
+            pending,
             "class",
-            label,
+            ref,
             availability,
             expected_reserved=expected_reserved,
-            expected_capacity=schedule.max_enrollment,
+            expected_capacity=row["max_enrollment"],
         )
 
+    labels = {
+        ("offering", offering.pk): str(offering)
+        for offering in FacilityClassEnrollment.objects.filter(
+            pk__in=[ref[1] for ref in pending]
+        ).select_related("facility_class", "period", "department")
+    }
+    _apply_labels(pending, labels)
+
+
+def _availability_rows(queryset, key_fields):
+    rows = {}
+    for row in queryset.values("pk", *key_fields, *SNAPSHOT_FIELDS).iterator():
+        key = tuple(row[field] for field in key_fields)
+        rows[key] = AvailabilitySnapshot(
+            pk=row["pk"], **{field: row[field] for field in SNAPSHOT_FIELDS}
+        )
+    return rows
+
 
 def _track_common(
     issues,
     holds,
     full,
+    pending,
     kind,
-    label,
+    ref,
     availability,
     *,
     expected_reserved,
@@ -207,15 +420,54 @@ def _track_common(
 ):
     if availability.reserved != expected_reserved or availability.capacity != expected_capacity:
         issues.append(
-            AvailabilityIssue(
-                kind,
-                label,
-                "warning",
-                f"reserved={expected_reserved}, capacity={expected_capacity}",
-                f"reserved={availability.reserved}, capacity={availability.capacity}",
+            _label_later(
+                pending,
+                ref,
+                AvailabilityIssue(
+                    kind,
+                    "",
+                    "warning",
+                    f"reserved={expected_reserved}, capacity={expected_capacity}",
+                    f"reserved={availability.reserved}, capacity={availability.capacity}",
+                ),
+            )
+        )
+    if availability.on_hold or availability.live_held:
+        holds.append(
+            _label_later(
+                pending,
+                ref,
+                {"kind": kind, "label": "", "availability": availability},
             )
         )
-    if availability.on_hold:
-        holds.append({"kind": kind, "label": label, "availability": availability})
     if availability.remaining <= 0:
-        full.append({"kind": kind, "label": label, "availability": availability})
+        full.append(
+            _label_later(
+                pending,
+                ref,
+                {"kind": kind, "label": "", "availability": availability},
+            )
+        )
+
+
+def _label_later(pending, ref, target):
+    pending.setdefault(ref, []).append(target)
+    return target
+
+
+def _quarters_labels(pending):
+    quarters_ids = [ref[1] for ref in pending if ref[0] == "quarters"]
+    return {
+        ("quarters", pk): str(quarters)
+        for pk, quarters in Quarters.objects.in_bulk(quarters_ids).items()
+    }
+
+
+def _apply_labels(pending, labels):
+    for ref, targets in pending.items():
+        label = labels.get(ref, "")
+        for target in targets:
+            if isinstance(target, AvailabilityIssue):
+                target.label = label
+            else:
+                target["label"] = label
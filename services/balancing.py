@@ -0,0 +1,271 @@
+"""
+In-memory class balancing for attendee class assignments.
+
+Offerings of the same facility class and period are interchangeable seats, so
+balancing a group is a transportation problem with unit move costs: surplus
+offerings ship attendees to deficit offerings. With uniform costs the minimum
+cost flow is reached by computing capacity-proportional targets and pairing
+surpluses with deficits greedily, which is what ``plan_class_balance`` does.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from enrollment.cache_keys import invalidate_attendee_periods_cache
+from enrollment.models.attendee_class import AttendeeClassEnrollment
+from enrollment.models.availability import FacilityClassAvailability
+from enrollment.models.facility_class import FacilityClassEnrollment
+
+
+@dataclass
+class ClassMove:
+    assignment_id: int
+    attendee_id: int
+    from_offering_id: int
+    to_offering_id: int
+
+
+@dataclass
+class OfferingBalance:
+    offering_id: int
+    label: str
+    capacity: int
+    current: int
+    target: int
+
+
+@dataclass
+class ClassBalancePlan:
+    groups: Dict[Tuple[int, int], List[OfferingBalance]] = field(default_factory=dict)
+    moves: List[ClassMove] = field(default_factory=list)
+
+    def diff(self):
+        for offerings in self.groups.values():
+            for offering in offerings:
+                if offering.current != offering.target:
+                    yield offering
+
+
+def plan_class_balance(offerings=None) -> ClassBalancePlan:
+    """
+    Build a balance plan for the given ``FacilityClassEnrollment`` queryset.
+    Effective capacity is the availability row's capacity minus holds, falling
+    back to ``max_enrollment`` when no availability row exists yet.
+    """
+    if offerings is None:
+        offerings = FacilityClassEnrollment.objects.all()
+    rows = offerings.values(
+        "id",
+        "facility_class_id",
+        "period_id",
+        "max_enrollment",
+        "facility_class__name",
+        "period__name",
+        "department__name",
+        "availability__capacity",
+        "availability__on_hold",
+        "availability__held",
+    ).order_by("facility_class_id", "period_id", "id")
+
+    plan = ClassBalancePlan()
+    offering_group = {}
+    for row in rows:
+        capacity = row["availability__capacity"]
+        if capacity is None:
+            capacity = row["max_enrollment"]
+        capacity -= row["availability__on_hold"] or 0
+        capacity = max(capacity - (row["availability__held"] or 0), 0)
+        key = (row["facility_class_id"], row["period_id"])
+        plan.groups.setdefault(key, []).append(
+            OfferingBalance(
+                offering_id=row["id"],
+                label=(
+                    f"{row['facility_class__name']} / {row['period__name']} / "
+                    f"{row['department__name']}"
+                ),
+                capacity=capacity,
+                current=0,
+                target=0,
+            )
+        )
+        offering_group[row["id"]] = key
+    # Offerings that cannot be rebalanced are dropped before loading attendees.
+    plan.groups = {key: group for key, group in plan.groups.items() if len(group) > 1}
+    offering_group = {
+        offering_id: key
+        for offering_id, key in offering_group.items()
+        if key in plan.groups
+    }
+    if not offering_group:
+        return plan
+
+    seats = {}
+    attendee_offerings = {}
+    assignments = (
+        AttendeeClassEnrollment.objects.filter(
+            facility_class_enrollment_id__in=offering_group.keys()
+        )
+        .values_list("id", "attendee_id", "facility_class_enrollment_id")
+        .order_by("id")
+    )
+    for assignment_id, attendee_id, offering_id in assignments:
+        seats.setdefault(offering_id, []).append((assignment_id, attendee_id))
+        attendee_offerings.setdefault(attendee_id, set()).add(offering_id)
+
+    for group in plan.groups.values():
+        for offering in group:
+            offering.current = len(seats.get(offering.offering_id, []))
+        _assign_targets(group)
+        plan.moves.extend(_plan_moves(group, seats, attendee_offerings))
+    return plan
+
+
+def _assign_targets(group) -> None:
+    total = sum(offering.current for offering in group)
+    capacity = sum(offering.capacity for offering in group)
+    if capacity <= 0:
+        for offering in group:
+            offering.target = offering.current
+        return
+    shares = []
+    for offering in group:
+        whole, remainder = divmod(offering.capacity * total, capacity)
+        offering.target = whole
+        shares.append((remainder, offering.current, offering))
+    leftover = total - sum(offering.target for offering in group)
+    # Largest remainder first; ties go to fuller offerings so fewer rows move.
+    shares.sort(key=lambda share: (share[0], share[1]), reverse=True)
+    for _, _, offering in shares[:leftover]:
+        offering.target += 1
+
+
+def _plan_moves(group, seats, attendee_offerings) -> List[ClassMove]:
+    deficits = [
+        [offering.offering_id, offering.target - offering.current]
+        for offering in group
+        if offering.target > offering.current
+    ]
+    moves = []
+    for offering in group:
+        surplus = offering.current - offering.target
+        if surplus <= 0:
+            continue
+        # Move the most recent assignments first.
+        candidates = list(reversed(seats.get(offering.offering_id, [])))
+        for assignment_id, attendee_id in candidates:
+            if surplus <= 0:
+                break
+            booked = attendee_offerings[attendee_id]
+            for deficit in deficits:
+                if deficit[1] <= 0 or deficit[0] in booked:
+                    continue
+                moves.append(
+                    ClassMove(
+                        assignment_id=assignment_id,
+                        attendee_id=attendee_id,
+                        from_offering_id=offering.offering_id,
+                        to_offering_id=deficit[0],
+                    )
+                )
+                booked.discard(offering.offering_id)
+                booked.add(deficit[0])
+                deficit[1] -= 1
+                surplus -= 1
+                break
+    return moves
+
+
+def _provision_missing_rows(offering_ids) -> None:
+    """
+    Create the availability rows the plan fell back to ``max_enrollment``
+    for, seeded with each offering's current assignments, so every move is
+    checked against a locked row.
+    """
+    missing = (
+        FacilityClassEnrollment.objects.filter(
+            pk__in=offering_ids, availability__isnull=True
+        )
+        .annotate(total=Count("attendee_class_enrollments"))
+        .values_list("pk", "max_enrollment", "total")
+    )
+    FacilityClassAvailability.objects.bulk_create(
+        [
+            FacilityClassAvailability(
+                facility_class_enrollment_id=offering_id,
+                capacity=capacity,
+                reserved=total,
+            )
+            for offering_id, capacity, total in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def apply_class_balance(plan: ClassBalancePlan) -> int:
+    """
+    Apply ``plan.moves`` with one bulk update for assignments and one for the
+    affected availability counters, provisioning missing counters first.
+    Raises ``ValidationError`` and applies nothing when the data changed
+    since the plan was built.
+    """
+    if not plan.moves:
+        return 0
+    deltas = {}
+    for move in plan.moves:
+        deltas[move.from_offering_id] = deltas.get(move.from_offering_id, 0) - 1
+        deltas[move.to_offering_id] = deltas.get(move.to_offering_id, 0) + 1
+
+    with transaction.atomic():
+        _provision_missing_rows(deltas.keys())
+        availability_rows = list(
+            FacilityClassAvailability.objects.select_for_update()
+            .filter(facility_class_enrollment_id__in=deltas.keys())
+            .order_by("pk")
+        )
+        if len(availability_rows) != len(deltas):
+            raise ValidationError(
+                "Class offerings changed while balancing; re-run the plan."
+            )
+        assignments = AttendeeClassEnrollment.objects.select_for_update().in_bulk(
+            [move.assignment_id for move in plan.moves]
+        )
+        for move in plan.moves:
+            assignment = assignments.get(move.assignment_id)
+            if (
+                assignment is None
+                or assignment.facility_class_enrollment_id != move.from_offering_id
+            ):
+                raise ValidationError(
+                    "Class assignments changed while balancing; re-run the plan."
+                )
+            assignment.facility_class_enrollment_id = move.to_offering_id
+
+        now = timezone.now()
+        for availability in availability_rows:
+            delta = deltas[availability.facility_class_enrollment_id]
+            reserved = max(availability.reserved + delta, 0)
+            if delta > 0 and reserved > availability.capacity - (
+                availability.on_hold + availability.held
+            ):
+                raise ValidationError(
+                    "Class capacity changed while balancing; re-run the plan."
+                )
+            availability.reserved = reserved
+            availability.updated_at = now
+
+        AttendeeClassEnrollment.objects.bulk_update(
+            assignments.values(), ["facility_class_enrollment"], batch_size=500
+        )
+        FacilityClassAvailability.objects.bulk_update(
+            availability_rows, ["reserved", "updated_at"]
+        )
+    FacilityClassAvailability.invalidate_cache(
+        [availability.pk for availability in availability_rows]
+    )
+    invalidate_attendee_periods_cache(*{move.attendee_id for move in plan.moves})
+    return len(plan.moves)
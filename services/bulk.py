@@ -0,0 +1,176 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from uuid import uuid4
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from enrollment.cache_keys import FACTION_ENROLLMENT, bump_generation
+from enrollment.models.attendee import AttendeeEnrollment
+from enrollment.models.occupancy import FactionQuartersOccupancy
+
+CONFLICT_MESSAGE = "This enrollment conflicts with an existing assignment."
+
+
+@dataclass
+class BulkScheduleResult:
+    index: int
+    enrollment: Optional[AttendeeEnrollment] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkAttendeeSchedulingMixin:
+    def schedule_attendee_enrollments_bulk(
+        self, rows: Iterable[dict]
+    ) -> List[BulkScheduleResult]:
+        """
+        Schedule many attendees at once.
+
+        Each row is a dict with ``attendee``, ``faction_enrollment`` and optional
+        ``quarters``/``role``. Capacity is checked per (faction_enrollment,
+        quarters) scope against the occupancy counters, each scope's counter is
+        claimed with one conditional update, valid rows are inserted with a
+        single ``bulk_create`` and one result is returned per input row.
+        """
+        rows = list(rows)
+        results = [BulkScheduleResult(index=index) for index in range(len(rows))]
+        pending = []
+        for result, row in zip(results, rows):
+            faction_enrollment = row.get("faction_enrollment")
+            quarters = row.get("quarters") or getattr(
+                faction_enrollment, "quarters", None
+            )
+            if not row.get("attendee") or not faction_enrollment:
+                result.error = "Attendee enrollments require faction and quarters."
+                continue
+            if not quarters:
+                result.error = "Quarters are required for attendee enrollment."
+                continue
+            pending.append((result, row, faction_enrollment, quarters))
+
+        if not pending:
+            return results
+
+        scopes = {
+            (faction_enrollment.pk, quarters.pk): quarters
+            for _, _, faction_enrollment, quarters in pending
+        }
+        occupancy = self._bulk_quarters_occupancy(scopes)
+        existing = self._existing_attendee_assignments(pending)
+
+        to_create = []
+        seen = set()
+        for result, row, faction_enrollment, quarters in pending:
+            scope = (faction_enrollment.pk, quarters.pk)
+            identity = (row["attendee"].pk,) + scope
+            if identity in existing or identity in seen:
+                result.error = CONFLICT_MESSAGE
+                continue
+            capacity = quarters.capacity or 0
+            if capacity > 0 and occupancy[scope] >= capacity:
+                result.error = "Selected quarters are already full."
+                continue
+            occupancy[scope] += 1
+            seen.add(identity)
+            result.enrollment = self._build_bulk_attendee_enrollment(
+                row, faction_enrollment, quarters
+            )
+            to_create.append(result)
+
+        if to_create:
+            try:
+                with transaction.atomic():
+                    to_create = self._claim_bulk_occupancy(to_create, scopes)
+                    AttendeeEnrollment.objects.bulk_create(
+                        [result.enrollment for result in to_create]
+                    )
+            except IntegrityError:
+                for result in to_create:
+                    result.enrollment = None
+                    result.error = CONFLICT_MESSAGE
+                to_create = []
+
+        bump_generation(
+            FACTION_ENROLLMENT,
+            *{result.enrollment.faction_enrollment_id for result in to_create},
+        )
+        self._log(
+            "attendee.bulk_schedule",
+            created=len(to_create),
+            failed=sum(1 for result in results if not result.ok),
+        )
+        return results
+
+    def _bulk_quarters_occupancy(self, scopes) -> Counter:
+        occupancy = Counter()
+        rows = FactionQuartersOccupancy.objects.filter(
+            faction_enrollment_id__in={scope[0] for scope in scopes},
+            quarters_id__in={scope[1] for scope in scopes},
+        ).values_list("faction_enrollment_id", "quarters_id", "occupied")
+        for faction_enrollment_id, quarters_id, occupied in rows:
+            scope = (faction_enrollment_id, quarters_id)
+            if scope in scopes:
+                occupancy[scope] = occupied
+        for scope in scopes:
+            if scope not in occupancy:
+                occupancy[scope] = FactionQuartersOccupancy.peek(*scope)
+        return occupancy
+
+    def _claim_bulk_occupancy(self, to_create, scopes):
+        """
+        Increment each scope's occupancy counter once for all of its rows. A
+        scope that filled up concurrently fails as a whole.
+        """
+        by_scope = {}
+        for result in to_create:
+            scope = (
+                result.enrollment.faction_enrollment_id,
+                result.enrollment.quarters_id,
+            )
+            by_scope.setdefault(scope, []).append(result)
+        claimed = []
+        for scope, scope_results in by_scope.items():
+            try:
+                FactionQuartersOccupancy.increment(
+                    *scope,
+                    capacity=scopes[scope].capacity or 0,
+                    amount=len(scope_results),
+                )
+            except ValidationError as exc:
+                for result in scope_results:
+                    result.enrollment = None
+                    result.error = exc.messages[0]
+                continue
+            claimed.extend(scope_results)
+        return claimed
+
+    def _existing_attendee_assignments(self, pending) -> set:
+        attendee_ids = {row["attendee"].pk for _, row, _, _ in pending}
+        faction_enrollment_ids = {fe.pk for _, _, fe, _ in pending}
+        return set(
+            AttendeeEnrollment.objects.filter(
+                attendee_id__in=attendee_ids,
+                faction_enrollment_id__in=faction_enrollment_ids,
+            ).values_list("attendee_id", "faction_enrollment_id", "quarters_id")
+        )
+
+    def _build_bulk_attendee_enrollment(self, row, faction_enrollment, quarters):
+        attendee = row["attendee"]
+        name = self._attendee_enrollment_name(attendee, faction_enrollment)
+        # bulk_create skips save(), so mirror the defaults it would apply.
+        return AttendeeEnrollment(
+            attendee=attendee,
+            faction_enrollment=faction_enrollment,
+            quarters=quarters,
+            role=row.get("role"),
+            name=name,
+            slug=f"{slugify(name)[:200]}-{uuid4().hex[:12]}",
+            start=faction_enrollment.start,
+            end=faction_enrollment.end,
+        )
@@ -1,11 +1,14 @@
-from typing import Optional
+from typing import Iterable, List, Optional
 
+from django.core.exceptions import ValidationError
 from django.db import transaction
 
 from enrollment.models.attendee_class import AttendeeClassEnrollment
 from enrollment.models.facility_class import FacilityClassEnrollment
 from enrollment.models.faculty_class import FacultyClassEnrollment as FacultyClassAssignment
-from enrollment.validators import ensure_class_capacity
+from enrollment.cache_keys import invalidate_attendee_periods_cache
+from enrollment.conflicts import find_overlap
+from enrollment.validators import ensure_class_capacity, ensure_no_period_conflict
 
 
 class ClassAssignmentSchedulingMixin:
@@ -16,9 +19,13 @@ class ClassAssignmentSchedulingMixin:
         facility_class_enrollment: FacilityClassEnrollment,
         attendee_enrollment=None,
         attendee_class_enrollment: Optional[AttendeeClassEnrollment] = None,
+        hold=None,
     ) -> AttendeeClassEnrollment:
         ensure_class_capacity(
-            facility_class_enrollment, exclude=attendee_class_enrollment
+            facility_class_enrollment, exclude=attendee_class_enrollment, hold=hold
+        )
+        ensure_no_period_conflict(
+            attendee, facility_class_enrollment, exclude=attendee_class_enrollment
         )
         enrollment = attendee_class_enrollment or AttendeeClassEnrollment()
         previous_class_id = getattr(enrollment, "facility_class_enrollment_id", None)
@@ -31,8 +38,12 @@ class ClassAssignmentSchedulingMixin:
         with transaction.atomic():
             enrollment = self._persist(enrollment)
             if reservation_changed:
-                self._reserve_attendee_class(enrollment)
-                self._release_attendee_class_by_id(previous_class_id)
+                self._move_attendee_classes(
+                    [facility_class_enrollment],
+                    previous_ids=[previous_class_id],
+                    holds=[hold] if hold is not None else (),
+                )
+            invalidate_attendee_periods_cache(getattr(attendee, "id", None))
         self._log(
             "attendee.assign_class",
             attendee_id=getattr(attendee, "id", None),
@@ -40,6 +51,49 @@ class ClassAssignmentSchedulingMixin:
         )
         return enrollment
 
+    def assign_attendee_to_classes(
+        self,
+        *,
+        attendee,
+        facility_class_enrollments: Iterable[FacilityClassEnrollment],
+        attendee_enrollment=None,
+    ) -> List[AttendeeClassEnrollment]:
+        """
+        Assign an attendee to several classes at once. Seats for every offering
+        are reserved together, so either all assignments are made or none are.
+        """
+        offerings = list(facility_class_enrollments)
+        if len({offering.pk for offering in offerings}) != len(offerings):
+            raise ValidationError("Each class may only be selected once.")
+        booked = {}
+        for offering in offerings:
+            ensure_class_capacity(offering)
+            ensure_no_period_conflict(attendee, offering)
+            period = offering.period
+            intervals = booked.setdefault(period.week_id, [])
+            if find_overlap(intervals, period.start, period.end) is not None:
+                raise ValidationError("The selected classes overlap each other.")
+            intervals.append((period.start, period.end, offering.pk))
+            intervals.sort()
+
+        enrollments = []
+        with transaction.atomic():
+            for offering in offerings:
+                enrollment = AttendeeClassEnrollment(
+                    attendee=attendee,
+                    attendee_enrollment=attendee_enrollment,
+                    facility_class_enrollment=offering,
+                )
+                enrollments.append(self._persist(enrollment))
+            self._move_attendee_classes(offerings)
+            invalidate_attendee_periods_cache(getattr(attendee, "id", None))
+        self._log(
+            "attendee.assign_classes",
+            attendee_id=getattr(attendee, "id", None),
+            facility_class_enrollment_ids=[offering.pk for offering in offerings],
+        )
+        return enrollments
+
     def drop_attendee_from_class(
         self, *, attendee_class_enrollment: AttendeeClassEnrollment
     ) -> None:
@@ -52,6 +106,7 @@ class ClassAssignmentSchedulingMixin:
         with transaction.atomic():
             self._release_attendee_class_by_id(class_id)
             attendee_class_enrollment.delete()
+            invalidate_attendee_periods_cache(attendee_class_enrollment.attendee_id)
         self._log("attendee.drop_class", attendee_class_enrollment_id=enrollment_id)
 
     def swap_attendee_class(
@@ -0,0 +1,150 @@
+"""
+Batched helpers for CSV attendee imports.
+"""
+
+from itertools import islice
+
+from django.db import transaction
+
+from enrollment.models.faction import FactionEnrollment
+from faction.models.attendee import AttendeeProfile
+from facility.models.quarters import Quarters
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def partition_by_faction_enrollment(numbered_rows, buckets):
+    """
+    Split ``(line_number, row)`` pairs into at most ``buckets`` lists so that
+    every row for a faction enrollment lands in the same list. Capacity scopes
+    never span faction enrollments, so buckets can be imported independently.
+    """
+    groups = {}
+    for line_number, row in numbered_rows:
+        key = (row.get("faction_enrollment") or "").strip()
+        groups.setdefault(key, []).append((line_number, row))
+    partitions = [[] for _ in range(max(min(buckets, len(groups)), 1))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(partitions, key=len).extend(group)
+    return [sorted(partition) for partition in partitions if partition]
+
+
+def error_line_number(error):
+    try:
+        return int(error.split(":", 1)[0].replace("line", ""))
+    except ValueError:
+        return 0
+
+
+def _as_pk(value):
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+class AttendeeImportResolver:
+    """
+    Resolve CSV references with one query per model per chunk and remember the
+    results so later chunks only fetch values they have not seen yet.
+    """
+
+    def __init__(self):
+        self.attendees = {}
+        self.faction_enrollments = {}
+        self.quarters = {}
+
+    def prime(self, rows) -> None:
+        self._prime_attendees({row["attendee"].strip() for row in rows})
+        self._prime_by_pk(
+            self.faction_enrollments,
+            FactionEnrollment.objects.select_related("week", "quarters"),
+            {row["faction_enrollment"] for row in rows},
+        )
+        self._prime_by_pk(
+            self.quarters,
+            Quarters.objects.all(),
+            {row["quarters"] for row in rows},
+        )
+
+    def _prime_attendees(self, values) -> None:
+        missing = values - self.attendees.keys()
+        if not missing:
+            return
+        queryset = AttendeeProfile.objects.select_related("user")
+        pks = {value: int(value) for value in missing if value.isdigit()}
+        by_pk = queryset.in_bulk(set(pks.values()))
+        for value, pk in pks.items():
+            self.attendees[value] = by_pk.get(pk)
+        usernames = missing - pks.keys()
+        if usernames:
+            by_username = {
+                profile.user.username: profile
+                for profile in queryset.filter(user__username__in=usernames)
+            }
+            for value in usernames:
+                self.attendees[value] = by_username.get(value)
+
+    def _prime_by_pk(self, store, queryset, values) -> None:
+        missing = {value for value in values if value not in store}
+        if not missing:
+            return
+        pks = {value: _as_pk(value) for value in missing}
+        found = queryset.in_bulk({pk for pk in pks.values() if pk is not None})
+        for value, pk in pks.items():
+            store[value] = found.get(pk)
+
+    def resolve(self, row):
+        """
+        Return ``(payload, error)`` for a CSV row using the primed lookups.
+        """
+        attendee = self.attendees.get(row["attendee"].strip())
+        if attendee is None:
+            return None, f"Attendee {row['attendee']!r} does not exist."
+        faction_enrollment = self.faction_enrollments.get(row["faction_enrollment"])
+        if faction_enrollment is None:
+            return None, (
+                f"Faction enrollment {row['faction_enrollment']!r} does not exist."
+            )
+        quarters = self.quarters.get(row["quarters"])
+        if quarters is None:
+            return None, f"Quarters {row['quarters']!r} do not exist."
+        return {
+            "attendee": attendee,
+            "faction_enrollment": faction_enrollment,
+            "quarters": quarters,
+            "role": row.get("role") or None,
+        }, None
+
+
+def import_attendee_chunk(service, resolver, chunk):
+    """
+    Validate and insert one chunk of ``(line_number, row)`` pairs inside a
+    savepoint. Returns ``(created, errors)``.
+    """
+    resolver.prime([row for _, row in chunk])
+    errors = []
+    payloads = []
+    lines = []
+    for line_number, row in chunk:
+        payload, error = resolver.resolve(row)
+        if error:
+            errors.append(f"line {line_number}: {error}")
+            continue
+        payloads.append(payload)
+        lines.append(line_number)
+
+    created = 0
+    with transaction.atomic():
+        results = service.schedule_attendee_enrollments_bulk(payloads)
+        for line_number, result in zip(lines, results):
+            if result.ok:
+                created += 1
+            else:
+                errors.append(f"line {line_number}: {result.error}")
+    return created, errors
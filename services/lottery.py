@@ -0,0 +1,206 @@
+"""
+Batch class lottery driven by ranked attendee preferences.
+
+Instead of every attendee racing ``assign_attendee_to_class`` for the same
+availability rows, preferences are collected ahead of time and the lottery
+assigns a whole period in one transaction: seats are tracked in compact
+per-offering arrays, each rank is resolved as one round in lottery order, and
+results are written with one ``bulk_create`` plus one counter update per
+offering.
+"""
+
+import random
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from enrollment.cache_keys import invalidate_attendee_periods_cache
+from enrollment.models.attendee_class import AttendeeClassEnrollment
+from enrollment.models.availability import FacilityClassAvailability
+from enrollment.models.facility_class import FacilityClassEnrollment
+from enrollment.models.preference import ClassPreference
+from enrollment.models.temporal import Period
+
+
+@dataclass
+class LotteryResult:
+    period_id: int
+    assigned: Dict[int, int] = field(default_factory=dict)
+    unassigned: List[int] = field(default_factory=list)
+    attendee_enrollments: Dict[int, Optional[int]] = field(default_factory=dict)
+
+    @property
+    def seats_by_offering(self) -> Dict[int, int]:
+        counts = {}
+        for offering_id in self.assigned.values():
+            counts[offering_id] = counts.get(offering_id, 0) + 1
+        return counts
+
+
+@transaction.atomic
+def submit_class_preferences(
+    *, attendee, period, facility_class_enrollments, attendee_enrollment=None
+) -> List[ClassPreference]:
+    """
+    Replace an attendee's ranked preferences for a period. The first offering
+    in ``facility_class_enrollments`` is rank 1.
+    """
+    offerings = list(facility_class_enrollments)
+    if len({offering.pk for offering in offerings}) != len(offerings):
+        raise ValidationError("Each class may only be ranked once.")
+    for offering in offerings:
+        if offering.period_id != period.pk:
+            raise ValidationError("Preferred classes must belong to the period.")
+    ClassPreference.objects.filter(attendee=attendee, period=period).delete()
+    return ClassPreference.objects.bulk_create(
+        [
+            ClassPreference(
+                attendee=attendee,
+                attendee_enrollment=attendee_enrollment,
+                period=period,
+                facility_class_enrollment=offering,
+                rank=rank,
+            )
+            for rank, offering in enumerate(offerings, start=1)
+        ]
+    )
+
+
+def run_class_lottery(period, *, seed=None, commit=True) -> LotteryResult:
+    """
+    Assign every attendee with preferences for ``period`` in a single pass.
+    Attendees who already hold a class in the period are skipped. With
+    ``commit=False`` the draw is computed but nothing is written.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        slots, capacity = _lock_period_capacity(period)
+        if not slots:
+            return LotteryResult(period_id=period.pk)
+        result = _draw(period, slots, capacity, rng)
+        if commit and result.assigned:
+            _write_results(result)
+        if not commit:
+            transaction.set_rollback(True)
+    return result
+
+
+def _lock_period_capacity(period):
+    offerings = dict(
+        FacilityClassEnrollment.objects.filter(period=period).values_list(
+            "id", "max_enrollment"
+        )
+    )
+    if not offerings:
+        return {}, array("l")
+    FacilityClassAvailability.objects.bulk_create(
+        [
+            FacilityClassAvailability(
+                facility_class_enrollment_id=offering_id, capacity=max_enrollment
+            )
+            for offering_id, max_enrollment in offerings.items()
+        ],
+        ignore_conflicts=True,
+    )
+    rows = (
+        FacilityClassAvailability.objects.select_for_update()
+        .filter(facility_class_enrollment_id__in=offerings.keys())
+        .order_by("pk")
+        .values_list(
+            "facility_class_enrollment_id", "capacity", "reserved", "on_hold", "held"
+        )
+    )
+    # Offerings map to dense slot indexes so seat counts live in one array.
+    slots = {}
+    capacity = array("l")
+    for offering_id, total, reserved, on_hold, held in rows:
+        slots[offering_id] = len(capacity)
+        capacity.append(max(total - reserved - on_hold - held, 0))
+    return slots, capacity
+
+
+def _draw(period, slots, capacity, rng) -> LotteryResult:
+    result = LotteryResult(period_id=period.pk)
+    already_placed = set(
+        AttendeeClassEnrollment.objects.filter(
+            facility_class_enrollment__period=period
+        ).values_list("attendee_id", flat=True)
+    )
+    choices = {}
+    enrollments = {}
+    preferences = (
+        ClassPreference.objects.filter(period=period)
+        .order_by("attendee_id", "rank")
+        .values_list(
+            "attendee_id", "attendee_enrollment_id", "facility_class_enrollment_id"
+        )
+    )
+    for attendee_id, attendee_enrollment_id, offering_id in preferences:
+        if attendee_id in already_placed or offering_id not in slots:
+            continue
+        choices.setdefault(attendee_id, array("l")).append(slots[offering_id])
+        enrollments[attendee_id] = attendee_enrollment_id
+
+    order = sorted(choices)
+    rng.shuffle(order)
+    offering_ids = [None] * len(capacity)
+    for offering_id, slot in slots.items():
+        offering_ids[slot] = offering_id
+
+    placed = {}
+    rounds = max((len(ranked) for ranked in choices.values()), default=0)
+    for rank in range(rounds):
+        for attendee_id in order:
+            if attendee_id in placed:
+                continue
+            ranked = choices[attendee_id]
+            if rank >= len(ranked):
+                continue
+            slot = ranked[rank]
+            if capacity[slot] > 0:
+                capacity[slot] -= 1
+                placed[attendee_id] = slot
+
+    for attendee_id in order:
+        slot = placed.get(attendee_id)
+        if slot is None:
+            result.unassigned.append(attendee_id)
+        else:
+            result.assigned[attendee_id] = offering_ids[slot]
+        result.attendee_enrollments[attendee_id] = enrollments[attendee_id]
+    return result
+
+
+def _write_results(result: LotteryResult) -> None:
+    AttendeeClassEnrollment.objects.bulk_create(
+        [
+            AttendeeClassEnrollment(
+                attendee_id=attendee_id,
+                attendee_enrollment_id=result.attendee_enrollments.get(attendee_id),
+                facility_class_enrollment_id=offering_id,
+            )
+            for attendee_id, offering_id in result.assigned.items()
+        ]
+    )
+    now = timezone.now()
+    for offering_id, seats in result.seats_by_offering.items():
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment_id=offering_id
+        ).update(reserved=F("reserved") + seats, updated_at=now)
+    availability_ids = FacilityClassAvailability.objects.filter(
+        facility_class_enrollment_id__in=result.seats_by_offering.keys()
+    ).values_list("pk", flat=True)
+    FacilityClassAvailability.invalidate_cache(availability_ids)
+    invalidate_attendee_periods_cache(*result.assigned.keys())
+
+
+def lottery_periods(facility_enrollment, period_id: Optional[int] = None):
+    periods = Period.objects.filter(week__facility_enrollment=facility_enrollment)
+    if period_id:
+        periods = periods.filter(pk=period_id)
+    return periods.order_by("week__start", "start")
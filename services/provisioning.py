@@ -0,0 +1,44 @@
+"""
+Ahead-of-time creation of availability rows for a facility enrollment.
+
+Rows are otherwise created on first use, which puts a ``get_or_create`` (and
+its unique-index contention) on the signup hot path. Provisioning computes
+the missing rows with one query per model and inserts them with
+``bulk_create(ignore_conflicts=True)``, so it is safe to re-run at any time.
+"""
+
+from dataclasses import dataclass
+
+from enrollment.models.availability import (
+    FacilityClassAvailability,
+    QuartersWeekAvailability,
+)
+from enrollment.models.facility_class import FacilityClassEnrollment
+from enrollment.models.temporal import Week
+
+
+@dataclass
+class ProvisioningResult:
+    quarters_rows: int = 0
+    class_rows: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.quarters_rows + self.class_rows
+
+
+def provision_facility_enrollment(facility_enrollment) -> ProvisioningResult:
+    """
+    Create every missing (week x faction quarters) and offering availability
+    row for ``facility_enrollment``.
+    """
+    weeks = Week.objects.filter(facility_enrollment=facility_enrollment).only(
+        "id", "facility_enrollment_id"
+    )
+    offerings = FacilityClassEnrollment.objects.filter(
+        facility_class__facility_enrollment=facility_enrollment
+    ).only("id", "max_enrollment")
+    return ProvisioningResult(
+        quarters_rows=QuartersWeekAvailability.provision_weeks(weeks),
+        class_rows=FacilityClassAvailability.provision(offerings),
+    )
@@ -6,6 +6,7 @@ from django.db import IntegrityError, transaction
 
 from enrollment.models.attendee import AttendeeEnrollment
 from enrollment.models.availability import (
+    CapacityExceeded,
     FacilityClassAvailability,
     FacultyQuartersAvailability,
     QuartersWeekAvailability,
@@ -13,7 +14,13 @@ from enrollment.models.availability import (
 from enrollment.models.faction import FactionEnrollment
 from enrollment.models.faculty import FacultyEnrollment
 from enrollment.models.leader import LeaderEnrollment
-from enrollment.cache_keys import invalidate_quarters_usage_cache
+from enrollment.cache_keys import (
+    bump_availability_status_version,
+    invalidate_quarters_usage_cache,
+    merge_on_commit,
+)
+from enrollment.services.audit import scheduling_events
+from enrollment.services.bulk import BulkAttendeeSchedulingMixin
 from enrollment.services.class_assignments import ClassAssignmentSchedulingMixin
 from enrollment.validators import (
     ensure_attendee_capacity,
@@ -21,12 +28,11 @@ from enrollment.validators import (
     ensure_leader_capacity,
     ensure_quarters_available,
 )
-from core.logging import log_event
 
 logger = logging.getLogger(__name__)
 
 
-class SchedulingService(ClassAssignmentSchedulingMixin):
+class SchedulingService(ClassAssignmentSchedulingMixin, BulkAttendeeSchedulingMixin):
     """
     Centralized operations for faction and attendee scheduling so availability
     checks and error handling stay consistent across forms, APIs, and views.
@@ -37,7 +43,9 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
 
     def _log(self, action: str, **payload) -> None:
         actor_id = getattr(self.user, "id", None)
-        log_event(f"scheduling.{action}", actor_id=actor_id, extra=payload)
+        scheduling_events.record(
+            f"scheduling.{action}", actor_id=actor_id, extra=payload
+        )
 
     def schedule_faction_enrollment(
         self,
@@ -71,8 +79,7 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
         with transaction.atomic():
             enrollment = self._persist(enrollment)
             if reservation_changed:
-                self._reserve_faction_quarters(enrollment)
-                self._release_faction_quarters_by_key(previous)
+                self._move_faction_quarters(enrollment, previous)
             self._invalidate_faction_usage(enrollment.pk, enrollment.quarters_id)
             if previous:
                 self._invalidate_faction_usage(previous[3], previous[2])
@@ -119,15 +126,8 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
         if role is not None:
             enrollment.role = role
         if not enrollment.name:
-            attendee_name = getattr(attendee, "user", None)
-            attendee_name = (
-                attendee_name.get_full_name().strip()
-                if attendee_name
-                else str(attendee)
-            )
-            week_label = getattr(faction_enrollment.week, "name", "")
-            enrollment.name = (
-                f"{attendee_name} ({week_label})" if week_label else attendee_name
+            enrollment.name = self._attendee_enrollment_name(
+                attendee, faction_enrollment
             )
         with transaction.atomic():
             enrollment = self._persist(enrollment)
@@ -175,8 +175,7 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
         with transaction.atomic():
             enrollment = self._persist(enrollment)
             if reservation_changed:
-                self._reserve_faculty_quarters(enrollment)
-                self._release_faculty_quarters_by_key(previous)
+                self._move_faculty_quarters(enrollment, previous)
         self._log(
             "faculty.schedule",
             faculty_id=getattr(faculty, "id", None),
@@ -233,6 +232,14 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
         )
         return enrollment
 
+    def _attendee_enrollment_name(self, attendee, faction_enrollment) -> str:
+        attendee_name = getattr(attendee, "user", None)
+        attendee_name = (
+            attendee_name.get_full_name().strip() if attendee_name else str(attendee)
+        )
+        week_label = getattr(faction_enrollment.week, "name", "")
+        return f"{attendee_name} ({week_label})" if week_label else attendee_name
+
     @transaction.atomic
     def _persist(self, enrollment):
         enrollment.full_clean()
@@ -242,6 +249,7 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
             raise ValidationError(
                 "This enrollment conflicts with an existing assignment."
             ) from exc
+        merge_on_commit(bump_availability_status_version)
         return enrollment
 
     def _reservation_key(self, facility_enrollment, week, quarters):
@@ -280,14 +288,36 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
             enrollment.pk,
         )
 
-    def _reserve_faction_quarters(self, enrollment):
+    def _move_faction_quarters(self, enrollment, previous):
+        """
+        Book the enrollment's quarters for its week and free the previously
+        booked week, in one ``reserve_many`` call.
+        """
         availability, _ = QuartersWeekAvailability.objects.get_or_create(
             facility_enrollment=enrollment.facility_enrollment,
             week=enrollment.week,
             quarters=enrollment.quarters,
             defaults={"capacity": enrollment.quarters.capacity},
         )
-        availability.reserve_full()
+        release = {}
+        if previous:
+            facility_enrollment_id, week_id, quarters_id, _ = previous
+            release = dict(
+                QuartersWeekAvailability.objects.filter(
+                    facility_enrollment_id=facility_enrollment_id,
+                    week_id=week_id,
+                    quarters_id=quarters_id,
+                ).values_list("pk", "capacity")
+            )
+        message = "These quarters are already reserved for the selected week."
+        if availability.capacity <= 0:
+            raise ValidationError(message)
+        try:
+            QuartersWeekAvailability.reserve_many(
+                {}, release=release, whole=[availability.pk]
+            )
+        except CapacityExceeded as exc:
+            raise ValidationError(message) from exc
 
     def _release_faction_quarters_by_key(self, key):
         if not key:
@@ -303,13 +333,28 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
             return
         availability.release_full()
 
-    def _reserve_faculty_quarters(self, enrollment):
+    def _move_faculty_quarters(self, enrollment, previous):
         availability, _ = FacultyQuartersAvailability.objects.get_or_create(
             facility_enrollment=enrollment.facility_enrollment,
             quarters=enrollment.quarters,
             defaults={"capacity": enrollment.quarters.capacity or 1},
         )
-        availability.reserve_slot()
+        release = {}
+        if previous:
+            facility_enrollment_id, _, quarters_id, _ = previous
+            release = {
+                pk: 1
+                for pk in FacultyQuartersAvailability.objects.filter(
+                    facility_enrollment_id=facility_enrollment_id,
+                    quarters_id=quarters_id,
+                ).values_list("pk", flat=True)
+            }
+        try:
+            FacultyQuartersAvailability.reserve_many(
+                {availability.pk: 1}, release=release
+            )
+        except CapacityExceeded as exc:
+            raise ValidationError("Faculty quarters are already at capacity.") from exc
 
     def _release_faculty_quarters_by_key(self, key):
         if not key:
@@ -324,13 +369,50 @@ class SchedulingService(ClassAssignmentSchedulingMixin):
             return
         availability.release_slot()
 
-    def _reserve_attendee_class(self, enrollment):
-        if not enrollment.facility_class_enrollment_id:
-            return
-        availability = FacilityClassAvailability.for_enrollment(
-            enrollment.facility_class_enrollment
-        )
-        availability.reserve()
+    def _move_attendee_classes(
+        self, facility_class_enrollments, previous_ids=(), holds=()
+    ):
+        """
+        Reserve a seat in each offering and release one in each previous
+        offering with a single ``reserve_many`` call. Offerings covered by one
+        of ``holds`` convert the hold instead.
+        """
+        held = {hold.availability_id: hold for hold in holds}
+        reserve = {}
+        for facility_class_enrollment in facility_class_enrollments:
+            availability = FacilityClassAvailability.for_enrollment(
+                facility_class_enrollment
+            )
+            hold = held.pop(availability.pk, None)
+            if hold is not None:
+                availability.convert_hold(hold)
+                continue
+            reserve[availability.pk] = reserve.get(availability.pk, 0) + 1
+        release = {}
+        previous_ids = [class_id for class_id in previous_ids if class_id]
+        if previous_ids:
+            for pk in FacilityClassAvailability.objects.filter(
+                facility_class_enrollment_id__in=previous_ids
+            ).values_list("pk", flat=True):
+                release[pk] = release.get(pk, 0) + 1
+        try:
+            FacilityClassAvailability.reserve_many(reserve, release=release)
+        except CapacityExceeded as exc:
+            if len(reserve) == 1:
+                raise ValidationError("This class is already at capacity.") from exc
+            full = FacilityClassAvailability.objects.filter(
+                pk__in=exc.failed.keys()
+            ).select_related(
+                "facility_class_enrollment__facility_class",
+                "facility_class_enrollment__period",
+                "facility_class_enrollment__department",
+            )
+            labels = ", ".join(
+                str(availability.facility_class_enrollment) for availability in full
+            )
+            raise ValidationError(
+                f"These classes are already at capacity: {labels}."
+            ) from exc
 
     def _release_attendee_class_by_id(self, facility_class_enrollment_id):
         if not facility_class_enrollment_id:
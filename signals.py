@@ -0,0 +1,107 @@
+"""
+Signal receivers that keep availability rows provisioned ahead of signups,
+and that mark counters as changed when the rows they count are written
+without going through them.
+
+``reconcile_availability --incremental`` only revisits counters whose
+``updated_at`` moved, so deletes (including cascades) and direct class
+assignment writes touch the counters of the scope they leave. Queryset
+``update`` and ``bulk_*`` calls send no signals; paths that use them keep
+the counters in step themselves.
+
+Writes to what the cached faction booking choices list also start a new
+generation for the facility enrollment they belong to.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from enrollment.cache_keys import FACILITY_ENROLLMENT, bump_generation
+from enrollment.models.availability import (
+    FACTION_QUARTERS_TYPE,
+    FacilityClassAvailability,
+    FacultyQuartersAvailability,
+    QuartersWeekAvailability,
+)
+from enrollment.models.facility import FacilityEnrollment
+from enrollment.models.occupancy import FactionQuartersOccupancy
+
+
+def _touch(model, **lookup):
+    if all(lookup.values()):
+        model.objects.filter(**lookup).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender="facility.Quarters")
+def provision_quarters_availability(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        QuartersWeekAvailability.provision_quarters(instance)
+
+
+@receiver(post_save, sender="facility.Quarters")
+@receiver(post_delete, sender="facility.Quarters")
+def bump_quarters_booking_choices(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    if getattr(instance.type, "slug", None) != FACTION_QUARTERS_TYPE:
+        return
+    bump_generation(
+        FACILITY_ENROLLMENT,
+        *FacilityEnrollment.objects.filter(
+            facility_id=instance.facility_id
+        ).values_list("pk", flat=True),
+    )
+
+
+@receiver(post_save, sender="enrollment.FactionEnrollment")
+@receiver(post_delete, sender="enrollment.FactionEnrollment")
+def bump_faction_booking_choices(sender, instance, **kwargs):
+    if not kwargs.get("raw"):
+        bump_generation(FACILITY_ENROLLMENT, instance.facility_enrollment_id)
+
+
+@receiver(post_delete, sender="enrollment.FactionEnrollment")
+def touch_faction_quarters_availability(sender, instance, **kwargs):
+    _touch(
+        QuartersWeekAvailability,
+        facility_enrollment_id=instance.facility_enrollment_id,
+        week_id=instance.week_id,
+        quarters_id=instance.quarters_id,
+    )
+
+
+@receiver(post_delete, sender="enrollment.FacultyEnrollment")
+def touch_faculty_quarters_availability(sender, instance, **kwargs):
+    _touch(
+        FacultyQuartersAvailability,
+        facility_enrollment_id=instance.facility_enrollment_id,
+        quarters_id=instance.quarters_id,
+    )
+
+
+@receiver(post_delete, sender="enrollment.AttendeeEnrollment")
+@receiver(post_delete, sender="enrollment.LeaderEnrollment")
+def touch_faction_occupancy(sender, instance, **kwargs):
+    _touch(
+        FactionQuartersOccupancy,
+        faction_enrollment_id=instance.faction_enrollment_id,
+        quarters_id=instance.quarters_id,
+    )
+
+
+@receiver(post_save, sender="enrollment.AttendeeClassEnrollment")
+@receiver(post_delete, sender="enrollment.AttendeeClassEnrollment")
+def touch_class_availability(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    offering_ids = {
+        instance.facility_class_enrollment_id,
+        getattr(instance, "_original_offering_id", None),
+    }
+    offering_ids.discard(None)
+    if offering_ids:
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment_id__in=offering_ids
+        ).update(updated_at=timezone.now())
+    instance._original_offering_id = instance.facility_class_enrollment_id
@@ -0,0 +1,65 @@
+// Lazy choice lists for select[data-autocomplete-url]: options are fetched
+// by prefix as the user types instead of being rendered with the page.
+(function () {
+    const DELAY = 200;
+
+    function params(select, term) {
+        const query = new URLSearchParams(select.dataset.autocompleteScope || "");
+        query.set("q", term);
+        const forward = (select.dataset.autocompleteForward || "").split(",");
+        forward.filter(Boolean).forEach((name) => {
+            const source = select.form && select.form.elements[name];
+            if (source && source.value) query.set(name, source.value);
+        });
+        return query;
+    }
+
+    function replaceOptions(select, results) {
+        const keep = new Set(["", select.value]);
+        Array.from(select.options).forEach((option) => {
+            if (!keep.has(option.value)) option.remove();
+        });
+        results.forEach((result) => {
+            if (String(result.id) === select.value) return;
+            const option = document.createElement("option");
+            option.value = result.id;
+            option.textContent = result.text;
+            select.appendChild(option);
+        });
+    }
+
+    function attach(select) {
+        const search = document.createElement("input");
+        search.type = "search";
+        search.className = "form-control form-control-sm mb-1";
+        search.placeholder = "Type to search…";
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        let controller = null;
+        async function lookup() {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const url = `${select.dataset.autocompleteUrl}?${params(select, search.value)}`;
+            try {
+                const resp = await fetch(url, { signal: controller.signal });
+                if (!resp.ok) return;
+                const data = await resp.json();
+                replaceOptions(select, data.results);
+            } catch (err) {
+                if (err.name !== "AbortError") throw err;
+            }
+        }
+        search.addEventListener("input", () => {
+            clearTimeout(timer);
+            timer = setTimeout(lookup, DELAY);
+        });
+        select.addEventListener("focus", () => {
+            if (select.options.length <= 2) lookup();
+        }, { once: true });
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        document.querySelectorAll("select[data-autocomplete-url]").forEach(attach);
+    });
+})();
@@ -1,22 +1,27 @@
 import csv
+import json
+from concurrent.futures import Future
 from datetime import timedelta, time
 from io import StringIO
 from tempfile import NamedTemporaryFile
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db import IntegrityError, transaction
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from core.tests import BaseDomainTestCase, mute_profile_signals
 from enrollment.models.availability import (
+    CapacityExceeded,
     FacilityClassAvailability,
     FacultyQuartersAvailability,
     QuartersWeekAvailability,
@@ -31,17 +36,61 @@ from facility.models.department import Department
 from facility.models.quarters import Quarters, QuartersType
 from facility.models.faculty import FacultyProfile
 from faction.models.attendee import AttendeeProfile
+from faction.models.faction import Faction
 from faction.models.leader import LeaderProfile
 from enrollment.models.faculty import FacultyEnrollment
 from enrollment.models.faculty_class import FacultyClassEnrollment
 from enrollment.models.leader import LeaderEnrollment
+from enrollment.models.occupancy import FactionQuartersOccupancy
+from enrollment.models.reconcile import ReconcileWatermark
 from course.models.facility_class import FacilityClass
+from enrollment.forms.attendee import AttendeeClassEnrollmentForm, AttendeeEnrollmentForm
+from enrollment.management.commands.reconcile_availability import (
+    Command as ReconcileCommand,
+)
 from enrollment.serializers import (
     AttendeeEnrollmentSerializer,
     LeaderEnrollmentSerializer,
 )
 from enrollment.services import SchedulingService
-from enrollment.cache_keys import quarters_usage_cache_key
+from enrollment.services.audit import deferred_events, scheduling_events
+from enrollment.services.imports import partition_by_faction_enrollment
+from enrollment.services.availability import (
+    AvailabilitySnapshot,
+    build_availability_status,
+    iter_availability_status,
+)
+from enrollment.services.balancing import apply_class_balance, plan_class_balance
+from enrollment.services.lottery import run_class_lottery, submit_class_preferences
+from enrollment.cache_keys import (
+    attendee_periods_cache_key,
+    bump_availability_status_version,
+    cached_unless_pending,
+    class_availability_id_cache_key,
+    invalidate_on_commit,
+    is_invalidation_pending,
+    quarters_usage_cache_key,
+    recompute_lock_key,
+)
+from enrollment.conflicts import (
+    conflicting_offering,
+    find_overlap,
+    find_period_conflicts,
+)
+from enrollment.counters import COUNTER_FIELDS
+from enrollment.feed import broker, change_payload, publish_availability
+from enrollment.local_cache import local_cache
+from enrollment.validators import (
+    _calculate_quarters_usage,
+    _raw_quarters_usage,
+    ensure_class_capacity,
+    ensure_quarters_available,
+    probe_class_remaining,
+)
+from enrollment.views.availability import (
+    AvailabilityDashboardView,
+    AvailabilityFeedView,
+)
 from enrollment.views.leader import LeaderEnrollmentViewSet
 from enrollment.views.facility import FacilityEnrollmentManageView
 from enrollment.views.facility_class import ManageView as FacilityClassManageView
@@ -84,6 +133,80 @@ class EnrollmentRouteNamingTests(TestCase):
         self.assertEqual(leader_response.headers["Location"], reverse("resources"))
 
 
+class AttendeeImportPartitionTests(TestCase):
+    def test_rows_for_one_faction_enrollment_share_a_partition(self):
+        rows = [
+            (line, {"faction_enrollment": str(faction_enrollment_id)})
+            for line, faction_enrollment_id in enumerate([1, 2, 1, 3, 2, 1], start=2)
+        ]
+        partitions = partition_by_faction_enrollment(rows, 2)
+
+        self.assertEqual(len(partitions), 2)
+        self.assertEqual(sum(len(partition) for partition in partitions), len(rows))
+        for partition in partitions:
+            self.assertEqual(partition, sorted(partition, key=lambda item: item[0]))
+        owners = {
+            row["faction_enrollment"]: index
+            for index, partition in enumerate(partitions)
+            for _, row in partition
+        }
+        for index, partition in enumerate(partitions):
+            for _, row in partition:
+                self.assertEqual(owners[row["faction_enrollment"]], index)
+
+
+class CacheInvalidationTransactionTests(TransactionTestCase):
+    def test_invalidations_from_rolled_back_transactions_are_forgotten(self):
+        key = attendee_periods_cache_key(0)
+        with transaction.atomic():
+            invalidate_on_commit([key])
+            self.assertTrue(is_invalidation_pending(key))
+            transaction.set_rollback(True)
+
+        cache.set(key, "cached", 60)
+        with transaction.atomic():
+            self.assertFalse(is_invalidation_pending(key))
+            self.assertEqual(
+                cached_unless_pending(key, 60, producer=lambda: "fresh"), "cached"
+            )
+
+    def test_reused_atomic_decorator_starts_a_fresh_transaction(self):
+        key = attendee_periods_cache_key(0)
+
+        @transaction.atomic
+        def pending_after(invalidate):
+            if invalidate:
+                invalidate_on_commit([key])
+                transaction.set_rollback(True)
+            return is_invalidation_pending(key)
+
+        self.assertTrue(pending_after(True))
+        self.assertFalse(pending_after(False))
+
+    def test_committed_invalidations_are_deleted_once(self):
+        key = attendee_periods_cache_key(0)
+        cache.set(key, "cached", 60)
+        with patch.object(cache, "delete_many", wraps=cache.delete_many) as delete:
+            with transaction.atomic():
+                invalidate_on_commit([key])
+                invalidate_on_commit([key])
+                self.assertEqual(cache.get(key), "cached")
+        delete.assert_called_once_with([key])
+        self.assertIsNone(cache.get(key))
+
+    def test_availability_hooks_run_once_per_transaction(self):
+        module = "enrollment.models.availability"
+        with patch(f"{module}.publish_availability") as publish, patch(
+            f"{module}.bump_availability_status_version"
+        ) as bump:
+            with transaction.atomic():
+                FacilityClassAvailability.invalidate_cache([1, 2])
+                FacilityClassAvailability.invalidate_cache([2, 3])
+                publish.assert_not_called()
+        bump.assert_called_once_with()
+        publish.assert_called_once_with(FacilityClassAvailability, {1, 2, 3})
+
+
 class EnrollmentScenarioBase(BaseDomainTestCase):
     def setUp(self):
         super().setUp()
@@ -375,11 +498,52 @@ class FacultyPermissionTests(EnrollmentScenarioBase):
             {"format": "json"},
         )
         self.assertEqual(response.status_code, 200)
-        payload = response.json()
+        self.assertTrue(response.streaming)
+        payload = json.loads(b"".join(response.streaming_content))
         self.assertIn("summary", payload)
         self.assertIn("issues", payload)
         self.assertIn("holds", payload)
 
+    def test_availability_dashboard_conditional_get(self):
+        self.client.force_login(self.admin_user)
+        url = reverse("enrollments:availability")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_faction_enrollment(name="Conditional Week")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_availability_dashboard_shows_messages_despite_matching_etag(self):
+        self.client.force_login(self.admin_user)
+        availability = FacilityClassAvailability.for_enrollment(
+            self._build_facility_class_enrollment()
+        )
+        url = reverse("enrollments:availability")
+        etag = self.client.get(url)["ETag"]
+
+        self.client.post(
+            reverse(
+                "enrollments:availability_hold",
+                kwargs={"kind": availability.kind, "pk": availability.pk},
+            ),
+            {"on_hold": "many"},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ["Hold amount must be a non-negative number."],
+        )
+        self.assertNotIn("ETag", response)
+
     def _create_attendee_profile(self, username):
         with mute_profile_signals():
             user = User.objects.create_user(
@@ -432,6 +596,25 @@ class FacultyPermissionTests(EnrollmentScenarioBase):
             faction=self.faction,
         )
 
+
+class InlineExecutor:
+    """Runs import partitions in-process, inside the test's transaction."""
+
+    def __init__(self, max_workers=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
 class AvailabilityTrackingTests(EnrollmentScenarioBase):
     def test_faction_enrollment_reserves_quarters(self):
         self._create_faction_enrollment(name="Eagle Week One")
@@ -444,6 +627,20 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         with self.assertRaises(ValidationError):
             self._create_faction_enrollment(name="Eagle Week One Retry")
 
+    def test_faction_enrollment_books_quarters_with_partial_staff_hold(self):
+        availability, _ = QuartersWeekAvailability.objects.get_or_create(
+            facility_enrollment=self.facility_enrollment,
+            week=self.week,
+            quarters=self.quarters,
+            defaults={"capacity": self.quarters.capacity},
+        )
+        QuartersWeekAvailability.objects.filter(pk=availability.pk).update(on_hold=2)
+
+        self._create_faction_enrollment(name="Staff Hold Week")
+
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, availability.capacity)
+
     def test_class_enrollment_updates_availability(self):
         facility_class_enrollment = self._build_facility_class_enrollment()
         availability = FacilityClassAvailability.for_enrollment(
@@ -484,6 +681,43 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         availability.refresh_from_db()
         self.assertEqual(availability.reserved, 1)
 
+    def test_availability_reserve_uses_single_statement(self):
+        facility_class_enrollment = self._build_facility_class_enrollment(
+            max_enrollment=1
+        )
+        availability = FacilityClassAvailability.for_enrollment(
+            facility_class_enrollment
+        )
+        if not availability._supports_update_returning():
+            self.skipTest("Backend has no UPDATE ... RETURNING support.")
+
+        with self.assertNumQueries(1):
+            availability.reserve(1)
+        self.assertEqual(availability.reserved, 1)
+        with self.assertRaises(ValidationError):
+            availability.reserve(1)
+        with self.assertNumQueries(1):
+            availability.release(1)
+        self.assertEqual(availability.reserved, 0)
+
+    def test_availability_locking_fallback_matches_returning_path(self):
+        facility_class_enrollment = self._build_facility_class_enrollment(
+            max_enrollment=1
+        )
+        availability = FacilityClassAvailability.for_enrollment(
+            facility_class_enrollment
+        )
+        availability.use_update_returning = False
+
+        with patch.object(FacilityClassAvailability, "_update_returning") as returning:
+            availability.reserve(1)
+            self.assertEqual(availability.reserved, 1)
+            with self.assertRaises(ValidationError):
+                availability.reserve(1)
+            availability.release(5)
+            self.assertEqual(availability.reserved, 0)
+        returning.assert_not_called()
+
     def test_scheduling_service_prevents_overbooking(self):
         facility_class_enrollment = self._build_facility_class_enrollment(
             max_enrollment=1
@@ -661,6 +895,113 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         self.assertEqual(availability.reserved, self.quarters.capacity)
         self.assertIn("Repaired", output.getvalue())
 
+    def test_reconcile_availability_keeps_writes_made_during_the_run(self):
+        self._create_faction_enrollment(name="Racing Week")
+        availability = QuartersWeekAvailability.objects.get(
+            week=self.week,
+            quarters=self.quarters,
+        )
+        availability.reserved = 0
+        availability.save(update_fields=["reserved", "updated_at"])
+        apply = ReconcileCommand._apply
+
+        def apply_after_release(command, model, to_create, to_update):
+            # A concurrent release lands between the scan and the repair.
+            QuartersWeekAvailability.objects.filter(pk=availability.pk).update(
+                reserved=1
+            )
+            return apply(command, model, to_create, to_update)
+
+        output = StringIO()
+        with patch.object(ReconcileCommand, "_apply", apply_after_release):
+            call_command("reconcile_availability", "--fix", stdout=output)
+
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, 1)
+        self.assertIn("Skipped 1 row(s) that changed during the run", output.getvalue())
+
+    def test_reconcile_availability_scopes_and_since_filter(self):
+        self._create_faction_enrollment(name="Scoped Drift Week")
+        availability = QuartersWeekAvailability.objects.get(
+            week=self.week,
+            quarters=self.quarters,
+        )
+        availability.reserved = 0
+        availability.save(update_fields=["reserved", "updated_at"])
+
+        output = StringIO()
+        future = (timezone.now() + timedelta(days=1)).isoformat()
+        call_command(
+            "reconcile_availability", "--fix", "--since", future, stdout=output
+        )
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, 0)
+        self.assertIn("Availability is reconciled.", output.getvalue())
+
+        output = StringIO()
+        call_command(
+            "reconcile_availability",
+            "--fix",
+            "-fe",
+            str(self.facility_enrollment.pk),
+            stdout=output,
+        )
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, self.quarters.capacity)
+        self.assertIn("rows/sec", output.getvalue())
+
+    def test_reconcile_availability_incremental_revisits_changed_scopes(self):
+        faction_enrollment = self._create_faction_enrollment(name="Incremental Week")
+        call_command(
+            "reconcile_availability", "--fix", "--incremental", stdout=StringIO()
+        )
+        self.assertTrue(ReconcileWatermark.objects.filter(scope="all").exists())
+
+        availability = QuartersWeekAvailability.objects.get(
+            week=self.week,
+            quarters=self.quarters,
+        )
+        yesterday = timezone.now() - timedelta(days=1)
+        FactionEnrollment.objects.filter(pk=faction_enrollment.pk).update(
+            updated_at=yesterday
+        )
+        QuartersWeekAvailability.objects.filter(pk=availability.pk).update(
+            reserved=0, updated_at=yesterday
+        )
+        output = StringIO()
+        call_command(
+            "reconcile_availability", "--fix", "--incremental", stdout=output
+        )
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, 0)
+        self.assertIn("Revisiting changes since", output.getvalue())
+
+        availability.save(update_fields=["reserved", "updated_at"])
+        call_command(
+            "reconcile_availability", "--fix", "--incremental", stdout=StringIO()
+        )
+        availability.refresh_from_db()
+        self.assertEqual(availability.reserved, self.quarters.capacity)
+
+    def test_reconcile_availability_incremental_sees_hard_deletes(self):
+        faction_enrollment = self._create_faction_enrollment(name="Deleted Week")
+        call_command(
+            "reconcile_availability", "--fix", "--incremental", stdout=StringIO()
+        )
+
+        # A queryset delete skips the service that would release the week.
+        FactionEnrollment.objects.filter(pk=faction_enrollment.pk).delete()
+        output = StringIO()
+        call_command(
+            "reconcile_availability", "--fix", "--incremental", stdout=output
+        )
+
+        availability = QuartersWeekAvailability.objects.get(
+            week=self.week, quarters=self.quarters
+        )
+        self.assertEqual(availability.reserved, 0)
+        self.assertIn("Stale faction quarters reservation", output.getvalue())
+
     def test_attendee_import_dry_run_does_not_commit(self):
         faction_enrollment = self._create_faction_enrollment(name="Import Week")
         attendee = self._create_attendee_profile("attendee.import")
@@ -685,6 +1026,116 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         self.assertFalse(attendee.attendee_enrollments.exists())
         self.assertIn("Validated 1 attendee enrollment", output.getvalue())
 
+    def test_attendee_import_streaming_dry_run_does_not_commit(self):
+        faction_enrollment = self._create_faction_enrollment(name="Stream Week")
+        attendees = [
+            self._create_attendee_profile(f"attendee.stream.{index}")
+            for index in range(3)
+        ]
+        with NamedTemporaryFile("w", newline="", suffix=".csv") as csv_file:
+            writer = csv.DictWriter(
+                csv_file,
+                fieldnames=["attendee", "faction_enrollment", "quarters", "role"],
+            )
+            writer.writeheader()
+            for index, attendee in enumerate(attendees):
+                writer.writerow(
+                    {
+                        "attendee": attendee.pk if index else attendee.user.username,
+                        "faction_enrollment": faction_enrollment.pk,
+                        "quarters": self.quarters.pk,
+                        "role": "Camper",
+                    }
+                )
+            csv_file.flush()
+            output = StringIO()
+            call_command(
+                "import_attendee_enrollments",
+                csv_file.name,
+                "--stream",
+                "--chunk-size",
+                "2",
+                stdout=output,
+            )
+
+        self.assertFalse(
+            AttendeeEnrollment.objects.filter(
+                faction_enrollment=faction_enrollment
+            ).exists()
+        )
+        self.assertIn("rows/sec", output.getvalue())
+        self.assertIn("Validated 3 attendee enrollment", output.getvalue())
+
+    def _import_with_workers(self, rows, output, *args):
+        command = "enrollment.management.commands.import_attendee_enrollments"
+        with NamedTemporaryFile("w", newline="", suffix=".csv") as csv_file:
+            writer = csv.DictWriter(
+                csv_file,
+                fieldnames=["attendee", "faction_enrollment", "quarters", "role"],
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+            csv_file.flush()
+            with patch(f"{command}.ProcessPoolExecutor", InlineExecutor), patch(
+                f"{command}.connections"
+            ):
+                call_command(
+                    "import_attendee_enrollments",
+                    csv_file.name,
+                    "--workers",
+                    "2",
+                    *args,
+                    stdout=output,
+                )
+
+    def _worker_import_rows(self, name):
+        faction_enrollment = self._create_faction_enrollment(name=name)
+        return faction_enrollment, [
+            {
+                "attendee": self._create_attendee_profile(f"{name}.{index}").pk,
+                "faction_enrollment": faction_enrollment.pk,
+                "quarters": self.quarters.pk,
+                "role": "Camper",
+            }
+            for index in range(2)
+        ]
+
+    def test_attendee_import_with_workers_commits_partitions(self):
+        faction_enrollment, rows = self._worker_import_rows("workers.commit")
+
+        output = StringIO()
+        self._import_with_workers(rows, output, "--commit")
+
+        self.assertEqual(
+            AttendeeEnrollment.objects.filter(
+                faction_enrollment=faction_enrollment
+            ).count(),
+            2,
+        )
+        self.assertIn("Imported 2 attendee enrollment", output.getvalue())
+
+    def test_attendee_import_with_workers_reports_commit_errors_once(self):
+        _, rows = self._worker_import_rows("workers.failure")
+
+        calls = []
+
+        def fail_on_commit(partition, chunk_size, commit):
+            calls.append(commit)
+            return 0, ["line 2: Selected quarters are already full."]
+
+        output = StringIO()
+        with patch(
+            "enrollment.management.commands.import_attendee_enrollments"
+            ".import_partition",
+            fail_on_commit,
+        ), self.assertRaisesMessage(
+            CommandError, "Partitions without errors were committed."
+        ):
+            self._import_with_workers(rows, output, "--commit")
+        self.assertEqual(output.getvalue().count("Import failed with 1 error(s)"), 1)
+        # One validate-and-insert pass per partition.
+        self.assertEqual(calls, [True])
+
     def test_faculty_enrollment_update_does_not_reserve_again(self):
         staff_quarters = Quarters.objects.create(
             name="Staff Stable Cabin",
@@ -765,7 +1216,14 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         cache.set(old_key, 1, 60)
 
         enrollment.quarters = second_quarters
-        enrollment.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
+            # Invalidation waits for the commit, and this transaction reads
+            # through the cache meanwhile.
+            self.assertEqual(cache.get(old_key), 1)
+            self.assertEqual(
+                _calculate_quarters_usage(faction_enrollment, first_quarters), 0
+            )
 
         self.assertIsNone(cache.get(old_key))
 
@@ -796,7 +1254,8 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
         cache.set(old_key, 1, 60)
 
         enrollment.quarters = second_quarters
-        enrollment.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
 
         self.assertIsNone(cache.get(old_key))
 
@@ -892,6 +1351,97 @@ class AvailabilityTrackingTests(EnrollmentScenarioBase):
             )
 
 
+class QuartersOccupancyTests(EnrollmentScenarioBase):
+    def test_occupancy_counter_tracks_attendee_and_leader_changes(self):
+        faction_enrollment = self._create_faction_enrollment("Occupancy Week")
+        service = SchedulingService()
+        attendee_enrollment = service.schedule_attendee_enrollment(
+            attendee=self._create_attendee_profile("attendee.occupancy"),
+            faction_enrollment=faction_enrollment,
+        )
+        service.schedule_leader_enrollment(
+            leader=self._create_leader_profile("leader.occupancy"),
+            faction_enrollment=faction_enrollment,
+        )
+        occupancy = FactionQuartersOccupancy.objects.get(
+            faction_enrollment=faction_enrollment, quarters=self.quarters
+        )
+        self.assertEqual(occupancy.occupied, 2)
+
+        attendee_enrollment.delete()
+        occupancy.refresh_from_db()
+        self.assertEqual(occupancy.occupied, 1)
+
+    def test_occupancy_counter_blocks_save_beyond_capacity(self):
+        limited = Quarters.objects.create(
+            name="Counter Hut",
+            capacity=1,
+            type=self.quarters_type,
+            facility=self.facility,
+        )
+        faction_enrollment = self._create_faction_enrollment(
+            "Counter Week", quarters=limited
+        )
+        AttendeeEnrollment.objects.create(
+            name="First",
+            attendee=self._create_attendee_profile("attendee.counter.one"),
+            faction_enrollment=faction_enrollment,
+            quarters=limited,
+        )
+        with self.assertRaisesMessage(
+            ValidationError, "Selected quarters are already full."
+        ):
+            AttendeeEnrollment.objects.create(
+                name="Second",
+                attendee=self._create_attendee_profile("attendee.counter.two"),
+                faction_enrollment=faction_enrollment,
+                quarters=limited,
+            )
+
+    def test_first_save_into_unseeded_scope_counts_once(self):
+        limited = Quarters.objects.create(
+            name="Seed Hut",
+            capacity=1,
+            type=self.quarters_type,
+            facility=self.facility,
+        )
+        faction_enrollment = self._create_faction_enrollment(
+            "Seed Week", quarters=limited
+        )
+        scope = {"faction_enrollment": faction_enrollment, "quarters": limited}
+        self.assertFalse(FactionQuartersOccupancy.objects.filter(**scope).exists())
+
+        AttendeeEnrollment.objects.create(
+            name="Only",
+            attendee=self._create_attendee_profile("attendee.seed.only"),
+            **scope,
+        )
+
+        self.assertEqual(FactionQuartersOccupancy.objects.get(**scope).occupied, 1)
+
+    def test_service_saves_after_peek_only_checks_count_once(self):
+        cabin = Quarters.objects.create(
+            name="Peek Hut",
+            capacity=2,
+            type=self.quarters_type,
+            facility=self.facility,
+        )
+        faction_enrollment = self._create_faction_enrollment(
+            "Peek Week", quarters=cabin
+        )
+        scope = {"faction_enrollment": faction_enrollment, "quarters": cabin}
+        service = SchedulingService()
+        for index in range(2):
+            service.schedule_attendee_enrollment(
+                attendee=self._create_attendee_profile(f"attendee.peek.{index}"),
+                faction_enrollment=faction_enrollment,
+                quarters=cabin,
+            )
+
+        self.assertEqual(FactionQuartersOccupancy.objects.get(**scope).occupied, 2)
+        self.assertEqual(_raw_quarters_usage(faction_enrollment, cabin), 2)
+
+
 class SchedulingServiceUpdateTests(EnrollmentScenarioBase):
     def test_attendee_enrollment_update_does_not_block_self(self):
         tight_quarters = Quarters.objects.create(
@@ -968,6 +1518,907 @@ class SchedulingServiceUpdateTests(EnrollmentScenarioBase):
             )
         self.assertEqual(updated.pk, assignment.pk)
 
+    def test_scheduling_events_flush_once_and_skip_rolled_back_work(self):
+        service = SchedulingService()
+        faction_enrollment = self._create_faction_enrollment(name="Audit Week")
+        kept = self._create_attendee_profile("attendee.audit.kept")
+        dropped = self._create_attendee_profile("attendee.audit.dropped")
+        with patch("enrollment.services.audit.log_event") as log_event:
+            with self.captureOnCommitCallbacks(execute=True):
+                with deferred_events():
+                    with transaction.atomic():
+                        service.schedule_attendee_enrollment(
+                            attendee=kept,
+                            faction_enrollment=faction_enrollment,
+                            quarters=self.quarters,
+                        )
+                    with transaction.atomic():
+                        service.schedule_attendee_enrollment(
+                            attendee=dropped,
+                            faction_enrollment=faction_enrollment,
+                            quarters=self.quarters,
+                        )
+                        transaction.set_rollback(True)
+                    log_event.assert_not_called()
+
+        self.assertEqual(log_event.call_count, 1)
+        self.assertEqual(log_event.call_args.args, ("scheduling.attendee.schedule",))
+        self.assertEqual(log_event.call_args.kwargs["extra"]["attendee_id"], kept.pk)
+
+    def test_scheduling_events_register_one_hook_per_transaction(self):
+        with patch("enrollment.services.audit.log_event") as log_event:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for index in range(3):
+                        scheduling_events.record("scheduling.test", extra={"n": index})
+                    log_event.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            [call.kwargs["extra"]["n"] for call in log_event.call_args_list], [0, 1, 2]
+        )
+
+
+class BulkSchedulingTests(EnrollmentScenarioBase):
+    def test_bulk_attendee_scheduling_reports_per_row(self):
+        limited = Quarters.objects.create(
+            name="Bulk Cabin",
+            capacity=2,
+            type=self.quarters_type,
+            facility=self.facility,
+        )
+        faction_enrollment = self._create_faction_enrollment(
+            "Bulk Week", quarters=limited
+        )
+        attendees = [
+            self._create_attendee_profile(f"attendee.bulk.{index}")
+            for index in range(3)
+        ]
+        results = SchedulingService().schedule_attendee_enrollments_bulk(
+            [
+                {"attendee": attendee, "faction_enrollment": faction_enrollment}
+                for attendee in attendees
+            ]
+        )
+
+        self.assertEqual([result.ok for result in results], [True, True, False])
+        self.assertEqual(results[2].error, "Selected quarters are already full.")
+        self.assertEqual(
+            AttendeeEnrollment.objects.filter(
+                faction_enrollment=faction_enrollment
+            ).count(),
+            2,
+        )
+
+    def test_bulk_attendee_scheduling_rejects_duplicates(self):
+        faction_enrollment = self._create_faction_enrollment("Bulk Duplicate Week")
+        attendee = self._create_attendee_profile("attendee.bulk.duplicate")
+        row = {"attendee": attendee, "faction_enrollment": faction_enrollment}
+        results = SchedulingService().schedule_attendee_enrollments_bulk([row, row])
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(
+            results[1].error,
+            "This enrollment conflicts with an existing assignment.",
+        )
+
+    def test_bulk_attendee_scheduling_bumps_faction_enrollment_generation(self):
+        faction_enrollment = self._create_faction_enrollment("Bulk Generation Week")
+        old_key = quarters_usage_cache_key(faction_enrollment.pk, self.quarters.pk)
+        cache.set(old_key, 0, 60)
+        attendee = self._create_attendee_profile("attendee.bulk.generation")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SchedulingService().schedule_attendee_enrollments_bulk(
+                [{"attendee": attendee, "faction_enrollment": faction_enrollment}]
+            )
+
+        new_key = quarters_usage_cache_key(faction_enrollment.pk, self.quarters.pk)
+        self.assertNotEqual(new_key, old_key)
+        self.assertIsNone(cache.get(new_key))
+
+
+class ClassBalancingTests(EnrollmentScenarioBase):
+    def test_balance_classes_moves_attendees_between_offerings(self):
+        crowded = self._build_facility_class_enrollment(max_enrollment=4)
+        other_department = Department.objects.create(
+            name="Aquatics",
+            abbreviation="AQU",
+            facility=self.facility,
+        )
+        empty = FacilityClassEnrollment.objects.create(
+            facility_class=crowded.facility_class,
+            period=crowded.period,
+            department=other_department,
+            organization_enrollment=self.org_enrollment,
+            max_enrollment=4,
+        )
+        service = SchedulingService()
+        for index in range(4):
+            service.assign_attendee_to_class(
+                attendee=self._create_attendee_profile(f"attendee.balance.{index}"),
+                facility_class_enrollment=crowded,
+            )
+
+        output = StringIO()
+        call_command("balance_classes", stdout=output)
+        self.assertIn("Dry run: 2 attendee(s) would move", output.getvalue())
+        self.assertEqual(empty.attendee_class_enrollments.count(), 0)
+
+        call_command("balance_classes", "--apply", stdout=StringIO())
+        self.assertEqual(crowded.attendee_class_enrollments.count(), 2)
+        self.assertEqual(empty.attendee_class_enrollments.count(), 2)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=empty
+        )
+        self.assertEqual(availability.reserved, 2)
+
+    def test_balance_checks_capacity_of_offerings_without_rows(self):
+        crowded = self._build_facility_class_enrollment(max_enrollment=4)
+        empty = FacilityClassEnrollment.objects.create(
+            facility_class=crowded.facility_class,
+            period=crowded.period,
+            department=Department.objects.create(
+                name="Aquatics", abbreviation="AQU", facility=self.facility
+            ),
+            organization_enrollment=self.org_enrollment,
+            max_enrollment=4,
+        )
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=empty
+        ).delete()
+        service = SchedulingService()
+        for index in range(4):
+            service.assign_attendee_to_class(
+                attendee=self._create_attendee_profile(f"attendee.unrowed.{index}"),
+                facility_class_enrollment=crowded,
+            )
+        plan = plan_class_balance()
+        self.assertEqual(len(plan.moves), 2)
+
+        # Signups that bypass the counters fill the offering after planning.
+        for index in range(3):
+            AttendeeClassEnrollment.objects.create(
+                attendee=self._create_attendee_profile(f"attendee.late.{index}"),
+                facility_class_enrollment=empty,
+            )
+        with self.assertRaisesMessage(ValidationError, "Class capacity changed"):
+            apply_class_balance(plan)
+        self.assertEqual(crowded.attendee_class_enrollments.count(), 4)
+
+
+class ClassLotteryTests(EnrollmentScenarioBase):
+    def test_lottery_assigns_by_rank_within_capacity(self):
+        popular = self._build_facility_class_enrollment(max_enrollment=1)
+        backup = FacilityClassEnrollment.objects.create(
+            facility_class=popular.facility_class,
+            period=popular.period,
+            department=Department.objects.create(
+                name="Nature",
+                abbreviation="NAT",
+                facility=self.facility,
+            ),
+            organization_enrollment=self.org_enrollment,
+            max_enrollment=1,
+        )
+        attendees = [
+            self._create_attendee_profile(f"attendee.lottery.{index}")
+            for index in range(3)
+        ]
+        for attendee in attendees:
+            submit_class_preferences(
+                attendee=attendee,
+                period=popular.period,
+                facility_class_enrollments=[popular, backup],
+            )
+
+        result = run_class_lottery(popular.period, seed=7)
+
+        self.assertEqual(len(result.assigned), 2)
+        self.assertEqual(len(result.unassigned), 1)
+        self.assertEqual(popular.attendee_class_enrollments.count(), 1)
+        self.assertEqual(backup.attendee_class_enrollments.count(), 1)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=popular
+        )
+        self.assertEqual(availability.reserved, 1)
+
+
+class PeriodConflictTests(EnrollmentScenarioBase):
+    def _build_overlapping_offering(self, offering, start, end):
+        period = Period.objects.create(
+            name=f"Overlap {start}",
+            start=start,
+            end=end,
+            week=offering.period.week,
+        )
+        return FacilityClassEnrollment.objects.create(
+            facility_class=offering.facility_class,
+            period=period,
+            department=offering.department,
+            organization_enrollment=self.org_enrollment,
+            max_enrollment=10,
+        )
+
+    def test_assign_rejects_overlapping_period(self):
+        morning = self._build_facility_class_enrollment()
+        overlapping = self._build_overlapping_offering(
+            morning, time(8, 30), time(9, 30)
+        )
+        later = self._build_overlapping_offering(morning, time(9, 0), time(10, 0))
+        attendee = self._create_attendee_profile("attendee.overlap")
+        service = SchedulingService()
+        service.assign_attendee_to_class(
+            attendee=attendee, facility_class_enrollment=morning
+        )
+
+        with self.assertRaisesMessage(ValidationError, "overlaps another class"):
+            service.assign_attendee_to_class(
+                attendee=attendee, facility_class_enrollment=overlapping
+            )
+        service.assign_attendee_to_class(
+            attendee=attendee, facility_class_enrollment=later
+        )
+        self.assertEqual(attendee.class_enrollments.count(), 2)
+
+    def test_conflict_report_lists_overlapping_bookings(self):
+        morning = self._build_facility_class_enrollment()
+        overlapping = self._build_overlapping_offering(
+            morning, time(8, 30), time(9, 30)
+        )
+        attendee = self._create_attendee_profile("attendee.overlap.report")
+        AttendeeClassEnrollment.objects.create(
+            attendee=attendee, facility_class_enrollment=morning
+        )
+        AttendeeClassEnrollment.objects.create(
+            attendee=attendee, facility_class_enrollment=overlapping
+        )
+
+        conflicts = find_period_conflicts(self.facility_enrollment)
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0].attendee_id, attendee.pk)
+
+    def test_overlap_seen_past_a_nested_booking(self):
+        intervals = [(time(8, 0), time(17, 0), 1), (time(9, 0), time(10, 0), 2)]
+
+        self.assertEqual(find_overlap(intervals, time(11, 0), time(12, 0)), 1)
+        self.assertIsNone(
+            find_overlap(intervals, time(11, 0), time(12, 0), ignore={1})
+        )
+
+    def test_period_time_edit_retires_cached_indexes(self):
+        morning = self._build_facility_class_enrollment()
+        later = self._build_overlapping_offering(morning, time(10, 0), time(11, 0))
+        attendee = self._create_attendee_profile("attendee.period.edit")
+        AttendeeClassEnrollment.objects.create(
+            attendee=attendee, facility_class_enrollment=morning
+        )
+        self.assertIsNone(conflicting_offering(attendee.pk, later.period))
+
+        period = Period.objects.get(pk=morning.period_id)
+        period.end = time(10, 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            period.save()
+
+        self.assertEqual(conflicting_offering(attendee.pk, later.period), morning.pk)
+
+
+class AvailabilityStatusTests(EnrollmentScenarioBase):
+    def test_status_reports_drift_and_full_rows_with_labels(self):
+        faction_enrollment = self._create_faction_enrollment("Status Week")
+        offering = self._build_facility_class_enrollment(max_enrollment=2)
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=offering
+        ).update(reserved=1)
+
+        status = build_availability_status(
+            facility_enrollment=self.facility_enrollment
+        )
+
+        class_issue = next(issue for issue in status["issues"] if issue.kind == "class")
+        self.assertEqual(class_issue.label, str(offering))
+        self.assertEqual(class_issue.expected, "reserved=0, capacity=2")
+        quarters_full = next(
+            item for item in status["full"] if item["kind"] == "faction_quarters"
+        )
+        self.assertIn(str(faction_enrollment.quarters), quarters_full["label"])
+        self.assertEqual(quarters_full["availability"].remaining, 0)
+
+    def test_streamed_json_export_matches_status(self):
+        self._create_faction_enrollment("Streamed Week")
+        offering = self._build_facility_class_enrollment(max_enrollment=2)
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=offering
+        ).update(reserved=1, on_hold=1)
+
+        status = build_availability_status()
+        chunks = AvailabilityDashboardView()._json_chunks(iter_availability_status())
+        self.assertEqual(next(chunks), '{"issues":[')
+        payload = json.loads("".join(chunks))
+
+        self.assertEqual(payload["summary"], status["summary"])
+        self.assertEqual(len(payload["holds"]), len(status["holds"]))
+        self.assertEqual(
+            {item["kind"] for item in payload["full"]},
+            {item["kind"] for item in status["full"]},
+        )
+
+
+class AvailabilityProbeTests(EnrollmentScenarioBase):
+    def test_class_capacity_check_does_not_write(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=offering
+        ).delete()
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            ensure_class_capacity(offering)
+        ensure_quarters_available(self.facility_enrollment, self.week, self.quarters)
+
+        self.assertFalse(
+            FacilityClassAvailability.objects.filter(
+                facility_class_enrollment=offering
+            ).exists()
+        )
+        self.assertFalse(QuartersWeekAvailability.objects.exists())
+
+    def test_missing_class_row_is_not_cached(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=offering
+        ).delete()
+        cache.clear()
+
+        self.assertEqual(probe_class_remaining(offering), 3)
+        self.assertIsNone(cache.get(class_availability_id_cache_key(offering.pk)))
+
+        availability = FacilityClassAvailability.objects.create(
+            facility_class_enrollment=offering, capacity=3, reserved=1
+        )
+        self.assertEqual(probe_class_remaining(offering), 2)
+        self.assertEqual(
+            cache.get(class_availability_id_cache_key(offering.pk)), availability.pk
+        )
+
+    def test_local_cache_tier_serves_repeat_checks_until_invalidated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        local_cache.configure(max_entries=100, ttl=30, version_ttl=30)
+        self.addCleanup(local_cache.configure)
+        cache.clear()
+
+        self.assertEqual(probe_class_remaining(offering), 3)
+        # Writes elsewhere bump the status version; this row's copy survives.
+        bump_availability_status_version()
+        with patch("enrollment.cache_keys.cache") as shared, patch(
+            "enrollment.validators.cache"
+        ) as shared_ids:
+            with self.assertNumQueries(0):
+                self.assertEqual(probe_class_remaining(offering), 3)
+        self.assertEqual(shared.mock_calls + shared_ids.mock_calls, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.reserve(1)
+        self.assertEqual(probe_class_remaining(offering), 2)
+
+        stats = local_cache.stats()
+        self.assertEqual(
+            (stats["local_hits"], stats["shared_hits"], stats["misses"]), (1, 0, 2)
+        )
+        self.assertEqual(stats["local_hit_rate"], 1 / 3)
+
+    def test_class_remaining_recompute_is_single_flight(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        key = availability.cache_key()
+        cache.clear()
+        self.assertEqual(probe_class_remaining(offering), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.reserve(1)
+        self.assertIsNone(cache.get(key))
+
+        # Another worker is recomputing: serve the previous value, no query.
+        cache.add(recompute_lock_key(key), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(probe_class_remaining(offering), 3)
+
+        cache.delete(recompute_lock_key(key))
+        self.assertEqual(probe_class_remaining(offering), 2)
+        self.assertIsNotNone(cache.get(key))
+
+    def test_stale_full_class_is_recomputed_not_served(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            offering = self._build_facility_class_enrollment(max_enrollment=1)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        key = availability.cache_key()
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.reserve(1)
+        cache.clear()
+        self.assertEqual(probe_class_remaining(offering), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            availability.release(1)
+        cache.add(recompute_lock_key(key), 1)
+
+        # The stale copy says "full", which would wrongly turn the caller away.
+        with patch("enrollment.cache_keys.RECOMPUTE_WAIT", 0):
+            with self.assertNumQueries(1):
+                self.assertEqual(probe_class_remaining(offering), 1)
+
+    def test_faction_quarters_are_provisioned_for_weeks(self):
+        faction_type = QuartersType.objects.create(
+            name="Faction Cabins", slug="faction", organization=self.organization
+        )
+        cabin = Quarters.objects.create(
+            name="Faction Cabin",
+            capacity=8,
+            type=faction_type,
+            facility=self.facility,
+        )
+        week_two = Week.objects.create(
+            name="Week 2",
+            start=self.week.end + timedelta(days=1),
+            end=self.week.end + timedelta(days=7),
+            facility_enrollment=self.facility_enrollment,
+        )
+
+        provisioned = QuartersWeekAvailability.objects.filter(quarters=cabin)
+        self.assertEqual(
+            set(provisioned.values_list("week_id", flat=True)),
+            {self.week.pk, week_two.pk},
+        )
+        self.assertEqual(provisioned.first().capacity, 8)
+
+
+class AvailabilityProvisioningTests(EnrollmentScenarioBase):
+    def test_bulk_created_weeks_get_quarters_rows(self):
+        faction_type = QuartersType.objects.create(
+            name="Faction Lodges", slug="faction", organization=self.organization
+        )
+        lodge = Quarters.objects.create(
+            name="Lodge", capacity=6, type=faction_type, facility=self.facility
+        )
+        weeks = Week.objects.bulk_create(
+            [
+                Week(
+                    name=f"Bulk Week {offset}",
+                    slug=f"bulk-week-{offset}",
+                    start=self.week.end + timedelta(days=7 * offset),
+                    end=self.week.end + timedelta(days=7 * offset + 6),
+                    facility_enrollment=self.facility_enrollment,
+                )
+                for offset in (1, 2)
+            ]
+        )
+
+        for week in weeks:
+            self.assertTrue(
+                QuartersWeekAvailability.objects.filter(
+                    week=week, quarters=lodge
+                ).exists()
+            )
+
+    def test_bulk_created_weeks_without_pks_get_quarters_rows(self):
+        faction_type = QuartersType.objects.create(
+            name="Faction Lodges", slug="faction", organization=self.organization
+        )
+        lodge = Quarters.objects.create(
+            name="Lodge", capacity=6, type=faction_type, facility=self.facility
+        )
+        # Rows inserted with ignore_conflicts come back without pks.
+        weeks = Week.objects.bulk_create(
+            [
+                Week(
+                    name="Ignored Conflicts Week",
+                    slug="ignored-conflicts-week",
+                    start=self.week.end + timedelta(days=7),
+                    end=self.week.end + timedelta(days=13),
+                    facility_enrollment=self.facility_enrollment,
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+        self.assertIsNone(weeks[0].pk)
+        self.assertTrue(
+            QuartersWeekAvailability.objects.filter(
+                week__name="Ignored Conflicts Week", quarters=lodge
+            ).exists()
+        )
+
+    def test_command_creates_missing_class_rows(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=4)
+        FacilityClassAvailability.objects.filter(
+            facility_class_enrollment=offering
+        ).delete()
+        out = StringIO()
+
+        call_command(
+            "provision_availability",
+            facility_enrollment=self.facility_enrollment.pk,
+            stdout=out,
+        )
+        call_command(
+            "provision_availability",
+            facility_enrollment=self.facility_enrollment.pk,
+            stdout=out,
+        )
+
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        self.assertEqual(availability.capacity, 4)
+        self.assertIn("Provisioned 0 quarters row(s) and 0 class row(s).", out.getvalue())
+
+
+class FactionBookingChoicesTests(EnrollmentScenarioBase):
+    def test_choices_list_open_quarters_per_week_and_revalidate(self):
+        faction_type = QuartersType.objects.create(
+            name="Faction Sites", slug="faction", organization=self.organization
+        )
+        booked, open_site = (
+            Quarters.objects.create(
+                name=name, capacity=8, type=faction_type, facility=self.facility
+            )
+            for name in ("Site A", "Site B")
+        )
+        self._create_faction_enrollment("Booked Week", quarters=booked)
+        url = reverse("ajax_load_booking_choices")
+        params = {"facility_enrollment": self.facility_enrollment.pk}
+
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        week = response.json()["weeks"][0]
+        self.assertEqual(week["id"], self.week.pk)
+        self.assertEqual(
+            week["quarters"],
+            [{"id": open_site.pk, "name": "Site B", "capacity": 8, "remaining": 8}],
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, params, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_choices_go_stale_only_with_their_facility_enrollment(self):
+        faction_type = QuartersType.objects.create(
+            name="Faction Sites", slug="faction", organization=self.organization
+        )
+        site = Quarters.objects.create(
+            name="Site A", capacity=8, type=faction_type, facility=self.facility
+        )
+        url = reverse("ajax_load_booking_choices")
+        params = {"facility_enrollment": self.facility_enrollment.pk}
+        etag = self.client.get(url, params)["ETag"]
+
+        bump_availability_status_version()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_faction_enrollment("Booked Week", quarters=site)
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["weeks"][0]["quarters"], [])
+
+
+class AutocompleteTests(EnrollmentScenarioBase):
+    def test_attendee_search_is_prefix_matched_and_scoped(self):
+        match = self._create_attendee_profile("campbell.ann")
+        self._create_attendee_profile("carter.bo")
+        self.client.force_login(match.user)
+        url = reverse("enrollments:autocomplete", kwargs={"source": "attendees"})
+
+        response = self.client.get(url, {"q": "camp", "faction": self.faction.pk})
+        self.assertEqual(
+            [result["id"] for result in response.json()["results"]], [match.pk]
+        )
+        self.assertEqual(self.client.get(url, {"q": "camp"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(url, {"q": "camp", "unknown": "1"}).status_code, 400
+        )
+
+    def test_non_staff_cannot_search_outside_their_faction(self):
+        leader = self._create_leader_profile("scope.leader")
+        self.client.force_login(leader.user)
+        other_faction = Faction.objects.order_by("-pk").first().pk + 1
+
+        for source, param, value in (
+            ("attendees", "faction", other_faction),
+            ("faction-enrollments", "faction", other_faction),
+            ("class-offerings", "facility", self.facility.pk),
+        ):
+            url = reverse("enrollments:autocomplete", kwargs={"source": source})
+            response = self.client.get(url, {"q": "", param: value})
+            self.assertEqual(response.status_code, 403, source)
+        url = reverse("enrollments:autocomplete", kwargs={"source": "class-offerings"})
+        self.assertEqual(self.client.get(url, {"q": ""}).status_code, 400)
+
+    def test_lazy_widget_renders_only_the_selection(self):
+        attendees = [
+            self._create_attendee_profile(f"lazy.attendee{index}") for index in range(3)
+        ]
+        form = AttendeeEnrollmentForm(initial={"attendee": attendees[0].pk})
+
+        rendered = form["attendee"].as_widget()
+        self.assertEqual(rendered.count("<option"), 2)
+        self.assertIn(f'value="{attendees[0].pk}"', rendered)
+        self.assertIn("data-autocomplete-url", rendered)
+
+    def test_blank_class_enrollment_form_lookups_are_scoped_to_faction(self):
+        leader = self._create_leader_profile("class.form.leader")
+        self.client.force_login(leader.user)
+        form = AttendeeClassEnrollmentForm(user=leader.user)
+
+        for name, source in (
+            ("attendee", "attendees"),
+            ("attendee_enrollment", "attendee-enrollments"),
+        ):
+            rendered = form[name].as_widget()
+            self.assertIn(
+                f'data-autocomplete-scope="faction={self.faction.pk}"', rendered
+            )
+            url = reverse("enrollments:autocomplete", kwargs={"source": source})
+            response = self.client.get(url, {"q": "", "faction": self.faction.pk})
+            self.assertEqual(response.status_code, 200)
+
+
+class AvailabilityHoldTests(EnrollmentScenarioBase):
+    def test_hold_blocks_others_and_converts_to_reservation(self):
+        availability = FacilityClassAvailability.for_enrollment(
+            self._build_facility_class_enrollment(max_enrollment=1)
+        )
+        hold = availability.place_hold()
+        self.assertEqual((availability.held, availability.remaining), (1, 0))
+        with self.assertRaises(ValidationError):
+            availability.reserve()
+
+        availability.convert_hold(hold)
+
+        self.assertEqual((availability.reserved, availability.held), (1, 0))
+        self.assertIsNone(availability.next_hold_expiry)
+        self.assertFalse(availability.holds.exists())
+
+    def test_expired_holds_do_not_block_capacity_checks(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=1)
+        availability = FacilityClassAvailability.for_enrollment(offering)
+        # An explicit zero TTL is honoured rather than replaced by HOLD_TTL.
+        availability.place_hold(ttl=timedelta(0))
+
+        self.assertEqual((availability.held, availability.remaining), (1, 1))
+        ensure_class_capacity(offering)
+
+    def test_only_expired_holds_stop_counting(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=4)
+        availability = FacilityClassAvailability.for_enrollment(offering)
+        availability.place_hold(ttl=timedelta(minutes=5))
+        availability.place_hold(2, ttl=timedelta(0))
+
+        self.assertEqual(availability.next_hold_amount, 2)
+        self.assertEqual((availability.held, availability.remaining), (3, 3))
+        cache.clear()
+        self.assertEqual(probe_class_remaining(offering), 3)
+
+        availability.expire_holds(pks=[availability.pk])
+        availability.refresh_from_db()
+        self.assertEqual(
+            (availability.held, availability.next_hold_amount, availability.remaining),
+            (1, 1, 3),
+        )
+
+    def test_reports_share_the_model_remaining_rule(self):
+        availability = FacilityClassAvailability.for_enrollment(
+            self._build_facility_class_enrollment(max_enrollment=4)
+        )
+        availability.place_hold(ttl=timedelta(minutes=5))
+        availability.place_hold(2, ttl=timedelta(0))
+        row = FacilityClassAvailability.objects.values("pk", *COUNTER_FIELDS).get(
+            pk=availability.pk
+        )
+
+        self.assertEqual(availability.remaining, 3)
+        self.assertEqual(AvailabilitySnapshot(**row).remaining, 3)
+        self.assertEqual(change_payload("class", row)["remaining"], 3)
+
+    def test_expired_holds_are_swept_lazily_and_by_command(self):
+        availability = FacilityClassAvailability.for_enrollment(
+            self._build_facility_class_enrollment(max_enrollment=2)
+        )
+        availability.place_hold(ttl=timedelta(seconds=-1))
+        availability.place_hold(ttl=timedelta(seconds=-1))
+
+        availability.reserve()
+        availability.refresh_from_db()
+        self.assertEqual((availability.reserved, availability.held), (1, 0))
+
+        availability.place_hold(ttl=timedelta(seconds=-1))
+        out = StringIO()
+        call_command("expire_availability_holds", stdout=out)
+        availability.refresh_from_db()
+        self.assertEqual(availability.held, 0)
+        self.assertIn("Expired 1 hold(s).", out.getvalue())
+
+    def test_assign_attendee_to_class_converts_hold(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=1)
+        availability = FacilityClassAvailability.for_enrollment(offering)
+        attendee = self._create_attendee_profile("attendee.hold")
+        hold = availability.place_hold()
+
+        SchedulingService().assign_attendee_to_class(
+            attendee=attendee, facility_class_enrollment=offering, hold=hold
+        )
+
+        availability.refresh_from_db()
+        self.assertEqual((availability.reserved, availability.held), (1, 0))
+
+
+def broker_sequence():
+    return int(broker.cursor.rpartition(".")[2])
+
+
+class AvailabilityFeedTests(EnrollmentScenarioBase):
+    def test_committed_reserve_is_published_to_listeners(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        keys = {("class", availability.pk)}
+        cursor = broker.cursor
+        with broker.listening():
+            with self.captureOnCommitCallbacks(execute=True):
+                availability.reserve()
+            changes, cursor, complete = broker.changes_since(cursor, keys)
+
+        self.assertTrue(complete)
+        self.assertEqual(changes[-1]["remaining"], 2)
+        self.assertEqual(cursor, broker.cursor)
+
+    def test_feed_returns_counters_then_long_polls_changes(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        self.client.force_login(self._create_attendee_profile("feed.viewer").user)
+        url = reverse("enrollments:availability_feed")
+        watch = {"watch": f"class:{availability.pk}"}
+
+        payload = self.client.get(url, watch).json()
+        self.assertEqual(payload["changes"][0]["remaining"], 3)
+
+        change = {"kind": "class", "id": availability.pk, "remaining": 1}
+        broker.publish([change])
+        payload = self.client.get(url, {**watch, "cursor": payload["cursor"]}).json()
+        self.assertFalse(payload["reset"])
+        self.assertEqual(payload["changes"], [change])
+
+        response = self.client.get(url, {"watch": "unknown:1"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_from_another_broker_or_the_future_forces_reset(self):
+        keys = {("class", 1)}
+        for cursor in (f"{broker.epoch}.{broker_sequence() + 100}", "gone.1", "12"):
+            changes, latest, complete = broker.changes_since(cursor, keys)
+            self.assertEqual((changes, latest, complete), ([], broker.cursor, False))
+
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        self.client.force_login(self._create_attendee_profile("feed.resync").user)
+        payload = self.client.get(
+            reverse("enrollments:availability_feed"),
+            {"watch": f"class:{availability.pk}"},
+            HTTP_LAST_EVENT_ID="gone.7",
+        ).json()
+        self.assertTrue(payload["reset"])
+        self.assertEqual(payload["changes"][0]["remaining"], 3)
+
+    def test_unpublished_write_forces_reset_for_older_cursors(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        keys = {("class", availability.pk)}
+        cursor = broker.cursor
+
+        with patch("enrollment.feed.SUBSCRIBER_GRACE", 0):
+            publish_availability(FacilityClassAvailability, [availability.pk])
+
+        changes, latest, complete = broker.changes_since(cursor, keys)
+        self.assertEqual((changes, complete), ([], False))
+        self.assertNotEqual(latest, cursor)
+        self.assertTrue(broker.changes_since(latest, keys)[2])
+
+    def test_stream_resyncs_writes_from_other_workers(self):
+        offering = self._build_facility_class_enrollment(max_enrollment=3)
+        availability = FacilityClassAvailability.objects.get(
+            facility_class_enrollment=offering
+        )
+        view = AvailabilityFeedView()
+        with patch("enrollment.views.availability.FEED_HEARTBEAT", 0), patch(
+            "enrollment.views.availability.FEED_RESYNC_HEARTBEATS", 1
+        ):
+            stream = view._event_stream({("class", availability.pk)}, broker.cursor)
+            next(stream)
+            # Committed by another worker, so never published to this broker.
+            FacilityClassAvailability.objects.filter(pk=availability.pk).update(
+                reserved=2
+            )
+            event = next(stream)
+            stream.close()
+        self.assertIn('"remaining":1', event)
+
+
+class MultiRowReservationTests(EnrollmentScenarioBase):
+    def _build_offering(self, offering, start, end, max_enrollment=10):
+        period = Period.objects.create(
+            name=f"Block {start}",
+            start=start,
+            end=end,
+            week=offering.period.week,
+        )
+        return FacilityClassEnrollment.objects.create(
+            facility_class=offering.facility_class,
+            period=period,
+            department=offering.department,
+            organization_enrollment=self.org_enrollment,
+            max_enrollment=max_enrollment,
+        )
+
+    def test_reserve_many_applies_nothing_and_reports_full_rows(self):
+        morning = self._build_facility_class_enrollment(max_enrollment=2)
+        afternoon = self._build_offering(
+            morning, time(13, 0), time(14, 0), max_enrollment=1
+        )
+        first = FacilityClassAvailability.for_enrollment(morning)
+        second = FacilityClassAvailability.for_enrollment(afternoon)
+
+        with self.assertRaises(CapacityExceeded) as raised:
+            FacilityClassAvailability.reserve_many({first.pk: 1, second.pk: 2})
+        self.assertEqual(raised.exception.failed, {second.pk: 1})
+        first.refresh_from_db()
+        self.assertEqual(first.reserved, 0)
+
+        FacilityClassAvailability.reserve_many({first.pk: 2, second.pk: 1})
+        FacilityClassAvailability.reserve_many({second.pk: 0}, release={first.pk: 5})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.reserved, second.reserved), (0, 1))
+
+    def test_assign_attendee_to_classes_is_all_or_nothing(self):
+        morning = self._build_facility_class_enrollment()
+        afternoon = self._build_offering(
+            morning, time(13, 0), time(14, 0), max_enrollment=1
+        )
+        FacilityClassAvailability.for_enrollment(afternoon).reserve()
+        attendee = self._create_attendee_profile("attendee.multi.class")
+        service = SchedulingService()
+
+        with self.assertRaisesMessage(ValidationError, "already at capacity"):
+            service.assign_attendee_to_classes(
+                attendee=attendee,
+                facility_class_enrollments=[morning, afternoon],
+            )
+        self.assertFalse(attendee.class_enrollments.exists())
+
+        evening = self._build_offering(morning, time(18, 0), time(19, 0))
+        enrollments = service.assign_attendee_to_classes(
+            attendee=attendee, facility_class_enrollments=[morning, evening]
+        )
+        self.assertEqual(len(enrollments), 2)
+        self.assertEqual(FacilityClassAvailability.for_enrollment(evening).reserved, 1)
+
 
 class SerializerSchedulingTests(EnrollmentScenarioBase):
     def setUp(self):
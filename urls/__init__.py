@@ -2,8 +2,13 @@
 
 from django.urls import path, include
 from django.views.generic import RedirectView
-from ..views.temporal import load_weeks, load_quarters
-from enrollment.views.availability import AvailabilityDashboardView, AvailabilityHoldView
+from ..views.temporal import load_booking_choices, load_weeks, load_quarters
+from enrollment.views.availability import (
+    AvailabilityDashboardView,
+    AvailabilityFeedView,
+    AvailabilityHoldView,
+)
+from enrollment.views.autocomplete import AutocompleteView
 from enrollment.views.enrollment import MyScheduleView
 
 app_name = "enrollments"
@@ -14,11 +19,21 @@ urlpatterns = [
         AvailabilityDashboardView.as_view(),
         name="availability",
     ),
+    path(
+        "enrollments/availability/feed/",
+        AvailabilityFeedView.as_view(),
+        name="availability_feed",
+    ),
     path(
         "enrollments/availability/<str:kind>/<int:pk>/hold/",
         AvailabilityHoldView.as_view(),
         name="availability_hold",
     ),
+    path(
+        "enrollments/autocomplete/<slug:source>/",
+        AutocompleteView.as_view(),
+        name="autocomplete",
+    ),
     path("enrollments/my-schedule/", MyScheduleView.as_view(), name="my_schedule"),
     path(
         "enrollments/facilities/",
@@ -64,4 +79,9 @@ urlpatterns = [
     path("periods/", include("enrollment.urls.period", namespace="period")),
     path('ajax/load-weeks/', load_weeks, name='ajax_load_weeks'),
     path('ajax/load-quarters/', load_quarters, name='ajax_load_quarters'),
+    path(
+        'ajax/booking-choices/',
+        load_booking_choices,
+        name='ajax_load_booking_choices',
+    ),
 ]
@@ -3,6 +3,7 @@ Validation helpers for enrollment flows to keep business rules centralized.
 """
 
 from typing import Optional
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
 from enrollment.models.availability import (
@@ -11,48 +12,136 @@ from enrollment.models.availability import (
 )
 from enrollment.models.attendee import AttendeeEnrollment
 from enrollment.models.leader import LeaderEnrollment
+from enrollment.models.occupancy import FactionQuartersOccupancy
 from enrollment.models.faculty import FacultyEnrollment
-from core.cache import cached
+from enrollment.conflicts import conflicting_offering
+from enrollment.counters import COUNTER_FIELDS, remaining_seats
 from enrollment.cache_keys import (
+    FACTION_ENROLLMENT,
+    cached_unless_pending,
+    class_availability_id_cache_key,
     quarters_usage_cache_key,
     invalidate_quarters_usage_cache,
+    row_version_key,
 )
+from enrollment.local_cache import local_cache
 
 
-def ensure_quarters_available(facility_enrollment, week, quarters) -> None:
+def probe_quarters_reserved(week, quarters) -> bool:
     """
-    Ensure quarters are free for a given week and facility enrollment.
+    Report whether quarters are booked for a week without creating the
+    availability row. A missing row means nothing has been booked yet.
     """
-    availability, _ = QuartersWeekAvailability.objects.get_or_create(
-        facility_enrollment=facility_enrollment,
-        week=week,
-        quarters=quarters,
-        defaults={"capacity": quarters.capacity},
+    row = (
+        QuartersWeekAvailability.objects.filter(week=week, quarters=quarters)
+        .values_list("reserved", "capacity")
+        .first()
     )
-    if availability.is_reserved:
-        raise ValidationError("Selected quarters are already reserved for this week.")
+    reserved, capacity = row if row else (0, quarters.capacity or 0)
+    return reserved >= capacity
 
 
-def ensure_class_capacity(facility_class_enrollment, exclude=None) -> None:
+def probe_class_remaining(facility_class_enrollment) -> int:
     """
-    Ensure class availability respects capacity, allowing an excluded enrollment.
+    Return the seats left in an offering from the cache or one indexed
+    SELECT, without creating or resizing its availability row.
     """
-    availability = FacilityClassAvailability.for_enrollment(facility_class_enrollment)
-    remaining = cached(
-        availability.cache_key(),
+    availability_id = _class_availability_id(facility_class_enrollment)
+    if availability_id is None:
+        return facility_class_enrollment.max_enrollment
+    # The counters are cached rather than ``remaining`` itself, so holds that
+    # expire while the entry is cached stop counting straight away.
+    key = FacilityClassAvailability(pk=availability_id).cache_key()
+    counters = cached_unless_pending(
+        key,
         ttl=60,
-        producer=lambda: availability.remaining,
+        producer=lambda: FacilityClassAvailability.objects.filter(pk=availability_id)
+        .values_list(*COUNTER_FIELDS)
+        .get(),
+        version_key=row_version_key(key),
+        accept_stale=lambda stale: _class_remaining(stale) > 0,
     )
+    return _class_remaining(counters)
+
+
+def _class_availability_id(facility_class_enrollment):
+    key = class_availability_id_cache_key(facility_class_enrollment.id)
+
+    def load():
+        availability_id = cache.get(key)
+        if availability_id is None:
+            availability_id = (
+                FacilityClassAvailability.objects.filter(
+                    facility_class_enrollment=facility_class_enrollment
+                )
+                .values_list("pk", flat=True)
+                .first()
+            )
+            # A missing row is not cached, so the id is picked up as soon
+            # as the row is provisioned.
+            if availability_id is not None:
+                cache.set(key, availability_id, 3600)
+        return availability_id
+
+    if not local_cache.enabled:
+        return load()
+    return local_cache.constant(key, load)
+
+
+def _class_remaining(counters) -> int:
+    return remaining_seats(*counters)
+
+
+def ensure_quarters_available(facility_enrollment, week, quarters) -> None:
+    """
+    Ensure quarters are free for a given week and facility enrollment.
+    """
+    if probe_quarters_reserved(week, quarters):
+        raise ValidationError("Selected quarters are already reserved for this week.")
+
+
+def ensure_class_capacity(facility_class_enrollment, exclude=None, hold=None) -> None:
+    """
+    Ensure class availability respects capacity, allowing an excluded enrollment
+    and counting the caller's own live hold as available.
+    """
+    remaining = probe_class_remaining(facility_class_enrollment)
     if (
         exclude
         and getattr(exclude, "facility_class_enrollment_id", None)
         == facility_class_enrollment.id
     ):
         remaining += 1
+    if (
+        hold is not None
+        and hold.availability.facility_class_enrollment_id
+        == facility_class_enrollment.id
+        and hold.is_live
+    ):
+        remaining += hold.amount
     if remaining <= 0:
         raise ValidationError("This class is already at capacity.")
 
 
+def ensure_no_period_conflict(
+    attendee, facility_class_enrollment, exclude=None
+) -> None:
+    """
+    Ensure the class period does not overlap another class the attendee holds
+    that week, ignoring the assignment being replaced.
+    """
+    ignore = {facility_class_enrollment.id}
+    previous_class_id = getattr(exclude, "facility_class_enrollment_id", None)
+    if previous_class_id:
+        ignore.add(previous_class_id)
+    if conflicting_offering(
+        attendee.pk, facility_class_enrollment.period, ignore=ignore
+    ):
+        raise ValidationError(
+            "This class overlaps another class the attendee is already taking."
+        )
+
+
 def ensure_faction_quarters_capacity(
     faction_enrollment,
     quarters,
@@ -122,28 +211,35 @@ def _calculate_quarters_usage(
     """
     Compute occupied quarters count with optional exclusions.
     """
-    key = quarters_usage_cache_key(
-        getattr(faction_enrollment, "id", None), getattr(quarters, "id", None)
-    )
-    base_count = cached(
+    faction_enrollment_id = getattr(faction_enrollment, "id", None)
+    quarters_id = getattr(quarters, "id", None)
+    capacity = getattr(quarters, "capacity", 0) or 0
+    key = quarters_usage_cache_key(faction_enrollment_id, quarters_id)
+    base_count = cached_unless_pending(
         key,
         ttl=60,
         producer=lambda: _raw_quarters_usage(faction_enrollment, quarters),
+        scopes=[(FACTION_ENROLLMENT, faction_enrollment_id)],
+        # Quarters without a capacity are never full.
+        accept_stale=lambda stale: capacity <= 0 or stale < capacity,
     )
 
     # Adjust for exclusions without blowing cache.
-    if exclude_attendee is not None and getattr(exclude_attendee, "pk", None):
-        base_count -= 1
-    if exclude_leader is not None and getattr(exclude_leader, "pk", None):
-        base_count -= 1
+    scope = (faction_enrollment_id, quarters_id)
+    for excluded in (exclude_attendee, exclude_leader):
+        if excluded is not None and _counted_in_scope(excluded, scope):
+            base_count -= 1
     return max(base_count, 0)
 
 
+def _counted_in_scope(enrollment, scope) -> bool:
+    if not getattr(enrollment, "pk", None):
+        return False
+    loaded_scope = getattr(enrollment, "_original_scope", None)
+    return loaded_scope is None or loaded_scope == scope
+
+
 def _raw_quarters_usage(faction_enrollment, quarters) -> int:
-    attendee_qs = AttendeeEnrollment.objects.filter(
-        faction_enrollment=faction_enrollment, quarters=quarters
-    ).count()
-    leader_qs = LeaderEnrollment.objects.filter(
-        faction_enrollment=faction_enrollment, quarters=quarters
-    ).count()
-    return attendee_qs + leader_qs
+    return FactionQuartersOccupancy.peek(
+        getattr(faction_enrollment, "id", None), getattr(quarters, "id", None)
+    )
@@ -0,0 +1,45 @@
+from django.http import Http404, JsonResponse
+from django.views import View
+
+from core.mixins.views import LoginRequiredMixin
+from enrollment.autocomplete import SOURCES, denied_scope
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    ``GET enrollments/autocomplete/<source>/?q=<prefix>&<scope>=<id>``
+
+    Returns ``{"results": [{"id": ..., "text": ...}]}`` for the lazy choice
+    widgets. Unknown or non-numeric scope parameters are rejected rather
+    than ignored, so a typo cannot widen the search, and scopes outside the
+    user's factions and facilities are refused.
+    """
+
+    def get(self, request, *args, **kwargs):
+        source = SOURCES.get(kwargs["source"])
+        if source is None:
+            raise Http404("Unknown autocomplete source.")
+        scope = {}
+        for param, value in request.GET.items():
+            if param == "q" or value == "":
+                continue
+            if param not in source.scopes or not value.isdigit():
+                return JsonResponse(
+                    {"error": f"Unsupported filter {param!r}."}, status=400
+                )
+            scope[param] = int(value)
+        if source.requires_scope and not scope and not request.user.is_staff:
+            filters = ", ".join(sorted(source.scopes))
+            return JsonResponse(
+                {"error": f"Narrow the search with one of: {filters}."}, status=400
+            )
+        denied = denied_scope(request.user, scope)
+        if denied:
+            return JsonResponse(
+                {"error": f"You may not search by {denied!r}."}, status=403
+            )
+        results = [
+            {"id": obj.pk, "text": str(obj)}
+            for obj in source.search(request.GET.get("q", ""), scope)
+        ]
+        return JsonResponse({"results": results})
@@ -1,7 +1,20 @@
 import csv
+import json
+import time
+from functools import partial
+from tempfile import SpooledTemporaryFile
+
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse, JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
 from django.shortcuts import get_object_or_404, redirect
 from django.views import View
 from django.views.generic import TemplateView
@@ -12,94 +25,244 @@ from enrollment.models.availability import (
     FacultyQuartersAvailability,
     QuartersWeekAvailability,
 )
-from enrollment.services.availability import build_availability_status
+from enrollment.models.facility import FacilityEnrollment
+from enrollment.models.organization import OrganizationEnrollment
+from enrollment.cache_keys import availability_status_version
+from enrollment.counters import COUNTER_FIELDS
+from enrollment.feed import broker, change_payload
+from enrollment.services.availability import (
+    cached_availability_status,
+    iter_availability_status,
+    peek_availability_status,
+)
 
 
 AVAILABILITY_MODELS = {
-    "class": FacilityClassAvailability,
-    "faculty_quarters": FacultyQuartersAvailability,
-    "faction_quarters": QuartersWeekAvailability,
+    model.kind: model
+    for model in (
+        FacilityClassAvailability,
+        FacultyQuartersAvailability,
+        QuartersWeekAvailability,
+    )
 }
+# Hold/full entries stay in memory up to this many characters before the
+# JSON export spools them to a temporary file.
+JSON_SPOOL_SIZE = 1024 * 1024
+JSON_CHUNK_SIZE = 64 * 1024
+# Change feed limits: long-poll wait, SSE keepalive interval and lifetime (s).
+FEED_POLL_TIMEOUT = 25
+FEED_HEARTBEAT = 15
+FEED_STREAM_DURATION = 300
+FEED_MAX_KEYS = 200
+# Streams re-read the watched rows every this many heartbeats, to pick up
+# writes committed by other workers.
+FEED_RESYNC_HEARTBEATS = 4
+
+
+class Echo:
+    """A file-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
 
 
 class AvailabilityDashboardView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
     template_name = "availability/dashboard.html"
 
     def get(self, request, *args, **kwargs):
-        if request.GET.get("format") == "csv":
-            return self._csv_response()
-        if request.GET.get("format") == "json":
-            return self._json_response()
-        return super().get(request, *args, **kwargs)
+        """
+        Answer conditional refreshes from the status version alone: a
+        matching ``If-None-Match`` gets a 304 without touching the database.
+        A page with pending messages is always rendered and never validated,
+        since the messages are not part of the version.
+        """
+        export = request.GET.get("format")
+        if export not in ("csv", "json"):
+            export = "html"
+        scope_ids = self._scope_ids()
+        version = availability_status_version()
+        self.snapshot = peek_availability_status(version, *scope_ids)
+        # len() loads the messages without marking them as shown.
+        conditional = export != "html" or not len(messages.get_messages(request))
+        etag = self._etag(version, scope_ids, export)
+        last_modified = self.snapshot.built_at if self.snapshot else None
+        if conditional:
+            not_modified = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=(
+                    int(last_modified.timestamp()) if last_modified else None
+                ),
+            )
+            if not_modified is not None:
+                return not_modified
+
+        if export == "csv":
+            response = self._csv_response()
+        elif export == "json":
+            response = self._json_response()
+        else:
+            response = super().get(request, *args, **kwargs)
+        if self.snapshot is not None:
+            etag = self._etag(self.snapshot.version, scope_ids, export)
+            last_modified = self.snapshot.built_at
+        if conditional:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(
+                (last_modified or timezone.now()).timestamp()
+            )
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Cookie"])
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context.update(build_availability_status())
+        context.update(self._status())
         return context
 
+    def _etag(self, version, scope_ids, export):
+        facility_enrollment_id, organization_enrollment_id = scope_ids
+        return quote_etag(
+            f"availability-{version}-{facility_enrollment_id or 0}-"
+            f"{organization_enrollment_id or 0}-{export}-{self.request.user.pk}"
+        )
+
+    def _status(self):
+        """
+        Build the report, scoped by ``?facility_enrollment=`` or
+        ``?organization_enrollment=`` when given, reusing the cached snapshot
+        for the current version.
+        """
+        if getattr(self, "snapshot", None) is None:
+            self.snapshot = cached_availability_status(**self._scope())
+        return self.snapshot.status
+
+    def _status_batches(self):
+        if getattr(self, "snapshot", None) is not None:
+            return [self.snapshot.status]
+        # Resolve the scope eagerly so unknown ids still 404 before streaming.
+        return iter_availability_status(**self._scope())
+
+    def _scope_ids(self):
+        ids = []
+        for param in ("facility_enrollment", "organization_enrollment"):
+            value = self.request.GET.get(param)
+            if value and not value.isdigit():
+                raise Http404(f"Unknown {param.replace('_', ' ')}.")
+            ids.append(int(value) if value else None)
+        return tuple(ids)
+
+    def _scope(self):
+        scope = {}
+        for (param, model), pk in zip(
+            (
+                ("facility_enrollment", FacilityEnrollment),
+                ("organization_enrollment", OrganizationEnrollment),
+            ),
+            self._scope_ids(),
+        ):
+            if pk is not None:
+                scope[param] = get_object_or_404(model, pk=pk)
+        return scope
+
     def _csv_response(self):
-        status = build_availability_status()
-        response = HttpResponse(content_type="text/csv")
+        response = StreamingHttpResponse(
+            self._csv_rows(self._status_batches()), content_type="text/csv"
+        )
         response["Content-Disposition"] = (
             'attachment; filename="availability-health.csv"'
         )
-        writer = csv.writer(response)
-        writer.writerow(["section", "kind", "label", "expected", "actual"])
-        for issue in status["issues"]:
-            writer.writerow(
-                ["issue", issue.kind, issue.label, issue.expected, issue.actual]
-            )
-        for hold in status["holds"]:
-            availability = hold["availability"]
-            writer.writerow(
-                [
-                    "hold",
-                    hold["kind"],
-                    hold["label"],
-                    f"capacity={availability.capacity}",
-                    f"on_hold={availability.on_hold}",
-                ]
-            )
-        for item in status["full"]:
-            availability = item["availability"]
-            writer.writerow(
-                [
-                    "full",
-                    item["kind"],
-                    item["label"],
-                    f"capacity={availability.capacity}",
-                    f"reserved={availability.reserved}, on_hold={availability.on_hold}",
-                ]
-            )
         return response
 
+    def _csv_rows(self, batches):
+        writer = csv.writer(Echo())
+        yield writer.writerow(["section", "kind", "label", "expected", "actual"])
+        for status in batches:
+            for issue in status["issues"]:
+                yield writer.writerow(
+                    ["issue", issue.kind, issue.label, issue.expected, issue.actual]
+                )
+            for hold in status["holds"]:
+                availability = hold["availability"]
+                yield writer.writerow(
+                    [
+                        "hold",
+                        hold["kind"],
+                        hold["label"],
+                        f"capacity={availability.capacity}",
+                        f"on_hold={availability.on_hold}, held={availability.held}",
+                    ]
+                )
+            for item in status["full"]:
+                availability = item["availability"]
+                yield writer.writerow(
+                    [
+                        "full",
+                        item["kind"],
+                        item["label"],
+                        f"capacity={availability.capacity}",
+                        f"reserved={availability.reserved}, "
+                        f"on_hold={availability.on_hold}",
+                    ]
+                )
+
     def _json_response(self):
-        status = build_availability_status()
-        return JsonResponse(
-            {
-                "summary": status["summary"],
-                "issues": [
-                    {
-                        "kind": issue.kind,
-                        "label": issue.label,
-                        "severity": issue.severity,
-                        "expected": issue.expected,
-                        "actual": issue.actual,
-                    }
-                    for issue in status["issues"]
-                ],
-                "holds": [
-                    self._availability_payload(hold["kind"], hold["label"], hold["availability"])
-                    for hold in status["holds"]
-                ],
-                "full": [
-                    self._availability_payload(item["kind"], item["label"], item["availability"])
-                    for item in status["full"]
-                ],
-            },
-            json_dumps_params={"indent": 2},
+        indent = 2 if self.request.GET.get("pretty") else None
+        return StreamingHttpResponse(
+            self._json_chunks(self._status_batches(), indent),
+            content_type="application/json",
         )
 
+    def _json_chunks(self, batches, indent=None):
+        """
+        Stream ``{"issues": [...], "holds": [...], "full": [...], "summary": {...}}``.
+
+        Issues are written as each batch arrives; hold and full entries are
+        serialized into spooled buffers, which only go to disk past
+        ``JSON_SPOOL_SIZE``, and copied out once every batch has been read.
+        """
+        dumps = partial(json.dumps, cls=DjangoJSONEncoder, indent=indent)
+        if indent is None:
+            dumps = partial(dumps, separators=(",", ":"))
+        summary = {"issues": 0, "holds": 0, "full": 0}
+        with SpooledTemporaryFile(
+            max_size=JSON_SPOOL_SIZE, mode="w+"
+        ) as holds, SpooledTemporaryFile(max_size=JSON_SPOOL_SIZE, mode="w+") as full:
+            yield '{"issues":['
+            for status in batches:
+                for issue in status["issues"]:
+                    yield ("," if summary["issues"] else "") + dumps(
+                        {
+                            "kind": issue.kind,
+                            "label": issue.label,
+                            "severity": issue.severity,
+                            "expected": issue.expected,
+                            "actual": issue.actual,
+                        }
+                    )
+                    summary["issues"] += 1
+                for section, buffer in (("holds", holds), ("full", full)):
+                    for item in status[section]:
+                        if summary[section]:
+                            buffer.write(",")
+                        buffer.write(
+                            dumps(
+                                self._availability_payload(
+                                    item["kind"], item["label"], item["availability"]
+                                )
+                            )
+                        )
+                        summary[section] += 1
+            for section, buffer in (("holds", holds), ("full", full)):
+                yield f'],"{section}":['
+                buffer.seek(0)
+                while True:
+                    chunk = buffer.read(JSON_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield '],"summary":' + dumps(summary) + "}"
+
     def _availability_payload(self, kind, label, availability):
         return {
             "kind": kind,
@@ -108,6 +271,7 @@ class AvailabilityDashboardView(LoginRequiredMixin, StaffRequiredMixin, Template
             "capacity": availability.capacity,
             "reserved": availability.reserved,
             "on_hold": availability.on_hold,
+            "held": availability.held,
             "remaining": availability.remaining,
         }
 
@@ -129,3 +293,95 @@ class AvailabilityHoldView(LoginRequiredMixin, StaffRequiredMixin, View):
         availability.save(update_fields=["on_hold", "updated_at"])
         messages.success(request, "Availability hold updated.")
         return redirect("enrollments:availability")
+
+
+class AvailabilityFeedView(LoginRequiredMixin, View):
+    """
+    Push ``remaining`` changes for ``?watch=class:12,faction_quarters:3``.
+
+    Without ``cursor`` the current counters are returned along with a cursor.
+    Passing that cursor back long-polls for up to ``FEED_POLL_TIMEOUT`` seconds.
+    Clients that send ``Accept: text/event-stream`` get server-sent events
+    instead. The stream resumes from ``Last-Event-ID`` and closes after
+    ``FEED_STREAM_DURATION`` seconds so the browser reconnects. The broker
+    only knows this worker's writes, so streams also re-read the watched rows
+    every ``FEED_RESYNC_HEARTBEATS`` heartbeats.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            keys = self._watched_keys(request.GET.get("watch", ""))
+            cursor = (
+                request.headers.get("Last-Event-ID") or request.GET.get("cursor") or None
+            )
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+        if "text/event-stream" in request.headers.get("Accept", ""):
+            response = StreamingHttpResponse(
+                self._event_stream(keys, cursor), content_type="text/event-stream"
+            )
+            response["X-Accel-Buffering"] = "no"
+        elif cursor is None:
+            cursor = broker.cursor
+            response = JsonResponse(
+                {"cursor": cursor, "reset": True, "changes": self._current(keys)}
+            )
+        else:
+            with broker.listening():
+                changes, cursor, complete = broker.wait(
+                    cursor, keys, FEED_POLL_TIMEOUT
+                )
+            if not complete:
+                changes = self._current(keys)
+            response = JsonResponse(
+                {"cursor": cursor, "reset": not complete, "changes": changes}
+            )
+        patch_cache_control(response, no_store=True)
+        return response
+
+    def _watched_keys(self, value):
+        keys = set()
+        for item in filter(None, value.split(",")):
+            kind, _, pk = item.partition(":")
+            if kind not in AVAILABILITY_MODELS or not pk.isdigit():
+                raise ValueError(f"Unknown availability {item!r}.")
+            keys.add((kind, int(pk)))
+        if not keys:
+            raise ValueError("Pass the availability rows to watch as ?watch=kind:id.")
+        if len(keys) > FEED_MAX_KEYS:
+            raise ValueError(f"Watch at most {FEED_MAX_KEYS} availability rows.")
+        return keys
+
+    def _current(self, keys):
+        changes = []
+        for kind, model in AVAILABILITY_MODELS.items():
+            pks = [pk for key_kind, pk in keys if key_kind == kind]
+            if pks:
+                rows = model.objects.filter(pk__in=pks).values("pk", *COUNTER_FIELDS)
+                changes.extend(change_payload(kind, row) for row in rows)
+        return changes
+
+    def _event_stream(self, keys, cursor):
+        deadline = time.monotonic() + FEED_STREAM_DURATION
+        yield "retry: 3000\n\n"
+        with broker.listening():
+            if cursor is None:
+                cursor = broker.cursor
+                yield self._event(cursor, self._current(keys))
+            heartbeats = 0
+            while time.monotonic() < deadline:
+                changes, cursor, complete = broker.wait(
+                    cursor, keys, FEED_HEARTBEAT
+                )
+                heartbeats += 1
+                if not complete or heartbeats % FEED_RESYNC_HEARTBEATS == 0:
+                    changes = self._current(keys)
+                if changes:
+                    yield self._event(cursor, changes)
+                else:
+                    yield ": keepalive\n\n"
+
+    def _event(self, cursor, changes):
+        data = json.dumps(changes, separators=(",", ":"))
+        return f"id: {cursor}\nevent: availability\ndata: {data}\n\n"
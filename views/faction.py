@@ -232,6 +232,11 @@ class AttendeeEnrollmentCreateView(
     service_class = SchedulingService
     service_method = "schedule_attendee_enrollment"
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
 
 class AttendeeEnrollmentUpdateView(
     LoginRequiredMixin, SchedulingServiceFormMixin, UpdateView
@@ -242,6 +247,11 @@ class AttendeeEnrollmentUpdateView(
     success_url = reverse_lazy("enrollments:attendee:index")
     service_method = "schedule_attendee_enrollment"
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         self.object = self.get_object()
         return super().form_valid(form)
@@ -280,6 +290,11 @@ class AttendeeClassEnrollmentCreateView(
     service_class = SchedulingService
     service_method = "assign_attendee_to_class"
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
 
 class AttendeeClassEnrollmentUpdateView(
     LoginRequiredMixin, SchedulingServiceFormMixin, UpdateView
@@ -290,6 +305,11 @@ class AttendeeClassEnrollmentUpdateView(
     success_url = reverse_lazy("enrollments:attendee_class:index")
     service_method = "assign_attendee_to_class"
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         self.object = self.get_object()
         return super().form_valid(form)
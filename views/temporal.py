@@ -2,7 +2,9 @@
 
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 from core.views.base import (
     BaseManageView,
@@ -22,8 +24,10 @@ from ..models.facility import FacilityEnrollment
 from ..tables.week import WeekTable
 from ..tables.period import PeriodTable
 from ..forms.period import PeriodForm
+from ..cache_keys import FACILITY_ENROLLMENT, generation
 from ..selectors import (
     available_faction_quarters_for_week,
+    cached_faction_booking_choices,
     period_index_queryset,
     week_detail_tables_config,
     week_manage_tables_config,
@@ -52,6 +56,29 @@ def load_quarters(request):
     return JsonResponse(list(available_quarters.values("id", "name")), safe=False)
 
 
+def load_booking_choices(request):
+    """
+    Weeks plus each week's open faction quarters for a facility enrollment,
+    replacing the ``load_weeks``/``load_quarters`` round trips. Revalidation
+    is answered from the facility enrollment's version alone.
+    """
+    facility_enrollment_id = request.GET.get("facility_enrollment", "")
+    if not facility_enrollment_id.isdigit():
+        raise Http404("Unknown facility enrollment.")
+    version = generation(FACILITY_ENROLLMENT, facility_enrollment_id)
+    etag = quote_etag(f"booking-{version}-{facility_enrollment_id}")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        version, choices = cached_faction_booking_choices(int(facility_enrollment_id))
+        if choices is None:
+            raise Http404("Unknown facility enrollment.")
+        response = JsonResponse(choices)
+        etag = quote_etag(f"booking-{version}-{facility_enrollment_id}")
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class WeekManageView(LoginRequiredMixin, PortalPermissionMixin, BaseManageView):
     template_name = "week/manage.html"
     enrollment = None